@@ -1,11 +1,16 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from django.http import HttpResponseRedirect
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.http import HttpRequest, HttpResponseRedirect, QueryDict, StreamingHttpResponse
+from django.utils import timezone
 from django.contrib import messages
 from django.shortcuts import render, redirect
 from django import forms
-from .models import Dossier, EtatDossier, RapportAnalyse, ConsistanceAcademique, DossierTraite, Candidat, StructureEvaluationGlobale
+from django.db.models import Count, Q
+from .models import Dossier, EtatDossier, RapportAnalyse, ConsistanceAcademique, DossierTraite, Reunion, ReunionDossier, Candidat, StructureEvaluationGlobale, ChargeProfesseur, Tache, FichierImporte
+from . import recherche
+from .notation import rescorer_consistances
 
 @admin.register(Dossier)
 class DossierAdmin(admin.ModelAdmin):
@@ -14,6 +19,25 @@ class DossierAdmin(admin.ModelAdmin):
     search_fields = ['titre', 'description']
     readonly_fields = ['date_reception']
 
+@admin.register(ChargeProfesseur)
+class ChargeProfesseurAdmin(admin.ModelAdmin):
+    list_display = ['professeur', 'dossiers_assignes', 'dossiers_en_cours', 'dossiers_traites', 'taux_traitement', 'date_mise_a_jour']
+    search_fields = ['professeur__username']
+    readonly_fields = ['professeur', 'dossiers_assignes', 'dossiers_en_cours', 'dossiers_traites', 'taux_traitement', 'date_mise_a_jour']
+
+@admin.register(Tache)
+class TacheAdmin(admin.ModelAdmin):
+    list_display = ['id', 'type_tache', 'statut', 'progression', 'total', 'cree_par', 'date_creation', 'date_fin']
+    list_filter = ['type_tache', 'statut']
+    readonly_fields = ['date_creation', 'date_debut', 'date_fin']
+
+@admin.register(FichierImporte)
+class FichierImporteAdmin(admin.ModelAdmin):
+    list_display = ['chemin', 'taille', 'date_premier_import', 'date_synchronisation']
+    search_fields = ['chemin']
+    readonly_fields = ['empreinte', 'date_premier_import', 'date_synchronisation']
+    exclude = ['lignes']
+
 @admin.register(RapportAnalyse)
 class RapportAnalyseAdmin(admin.ModelAdmin):
     list_display = ['dossier', 'titre', 'type_rapport', 'date_rapport']
@@ -34,10 +58,41 @@ class EtatDossierAdmin(admin.ModelAdmin):
 
 @admin.register(ConsistanceAcademique)
 class ConsistanceAcademiqueAdmin(admin.ModelAdmin):
-    list_display = ['candidat', 'note_totale', 'date_creation']
-    list_filter = ['date_creation']
+    list_display = ['candidat', 'score_total', 'niveau_interpretation', 'criteres_obligatoires_acquis', 'date_creation']
+    list_filter = ['niveau_interpretation', 'criteres_obligatoires_acquis', 'date_creation']
+    list_select_related = ['candidat']
     search_fields = ['candidat__nom']
-    readonly_fields = ['note_totale']
+    readonly_fields = ['score_total', 'niveau_interpretation', 'criteres_obligatoires_acquis', 'criteres_non_acquis']
+    actions = ['simuler_recalcul_notes', 'recalculer_notes']
+
+    def _rapport_recalcul(self, request, changements, limite=20):
+        niveaux = dict(ConsistanceAcademique.NIVEAUX_INTERPRETATION)
+        for changement in changements[:limite]:
+            self.message_user(
+                request,
+                f"{changement.candidat} : {changement.ancien_score:g} -> {changement.nouveau_score:g}, "
+                f"{niveaux.get(changement.ancien_niveau, changement.ancien_niveau)} -> {niveaux[changement.nouveau_niveau]}",
+                messages.INFO
+            )
+        if len(changements) > limite:
+            self.message_user(request, f"... et {len(changements) - limite} autre(s) changement(s) de niveau", messages.INFO)
+
+    @admin.action(description="Simuler le recalcul des notes (barème actuel)")
+    def simuler_recalcul_notes(self, request, queryset):
+        nombre, _, _, changements = rescorer_consistances(queryset, simulation=True)
+        self._rapport_recalcul(request, changements)
+        self.message_user(request, f"Simulation : {nombre} consistance(s) évaluée(s), {len(changements)} changement(s) de niveau, rien n'a été enregistré", messages.WARNING)
+
+    @admin.action(description="Recalculer les notes (barème actuel)")
+    def recalculer_notes(self, request, queryset):
+        nombre, modifiees, decisions, changements = rescorer_consistances(queryset)
+        self._rapport_recalcul(request, changements)
+        self.message_user(
+            request,
+            f"{nombre} consistance(s) évaluée(s) : {modifiees} mise(s) à jour, {decisions} note(s) de décision corrigée(s), "
+            f"{len(changements)} changement(s) de niveau",
+            messages.SUCCESS
+        )
 
 class DossierTraiteAdmin(admin.ModelAdmin):
     list_display = [
@@ -54,12 +109,13 @@ class DossierTraiteAdmin(admin.ModelAdmin):
         'universite', 'pays', 'avis_commission'
     ]
     readonly_fields = ['nombre_reunions', 'derniere_reunion']
+    raw_id_fields = ['dossier']
     ordering = ['-date_reception']
     list_per_page = 50
     
     fieldsets = (
         ('Informations de base', {
-            'fields': ('numero', 'demandeur_candidat', 'reference')
+            'fields': ('numero', 'demandeur_candidat', 'reference', 'dossier')
         }),
         ('Dates et réception', {
             'fields': ('date_envoi', 'reference_reception', 'date_reception')
@@ -70,12 +126,20 @@ class DossierTraiteAdmin(admin.ModelAdmin):
         ('Décision de la commission', {
             'fields': ('date_avis', 'avis_commission')
         }),
+        ('Notes de l\'évaluation', {
+            'fields': ('score_total',) + tuple(DossierTraite.CHAMPS_NOTES),
+            'classes': ('collapse',)
+        }),
         ('Réunions', {
-            'fields': ('reunions', 'nombre_reunions', 'derniere_reunion'),
+            'fields': ('nombre_reunions', 'derniere_reunion'),
             'classes': ('collapse',)
         }),
     )
     
+    def get_queryset(self, request):
+        # Nombre de réunions de chaque ligne en sous-requête (pas une requête par dossier affiché)
+        return super().get_queryset(request).annotate(nombre_reunions_total=ReunionDossier.nombre_par_dossier())
+    
     def nombre_reunions(self, obj):
         return obj.get_nombre_reunions()
     nombre_reunions.short_description = 'Nombre de réunions'
@@ -83,7 +147,7 @@ class DossierTraiteAdmin(admin.ModelAdmin):
     def derniere_reunion(self, obj):
         derniere = obj.get_derniere_reunion()
         if derniere:
-            return f"{derniere['date']} - {derniere['participants']}"
+            return f"{derniere.date} - {derniere.participants}"
         return "Aucune réunion"
     derniere_reunion.short_description = 'Dernière réunion'
     
@@ -112,7 +176,15 @@ class DossierTraiteAdmin(admin.ModelAdmin):
     def changelist_view(self, request, extra_context=None):
         extra_context = extra_context or {}
         extra_context['show_import_export'] = True
-        return super().changelist_view(request, extra_context)
+        response = super().changelist_view(request, extra_context)
+        
+        # Compteurs du bandeau, sur la liste filtrée, en une seule requête
+        if hasattr(response, 'context_data') and 'cl' in response.context_data:
+            response.context_data.update(response.context_data['cl'].queryset.aggregate(
+                nombre_avec_avis=Count('id', filter=~Q(avis_commission='')),
+                nombre_sans_avis=Count('id', filter=Q(avis_commission='')),
+            ))
+        return response
     
     def import_excel_view(self, request):
         if request.method == 'POST':
@@ -128,59 +200,58 @@ class DossierTraiteAdmin(admin.ModelAdmin):
         }
         return render(request, 'admin/dossiers/dossiertraite/import_excel.html', context)
     
+    def queryset_export(self, request):
+        """Dossiers de la liste courante : mêmes filtres, recherche et tri que la page d'administration"""
+        return self.get_changelist_instance(request).get_queryset(request)
+    
     def export_excel_view(self, request):
-        import pandas as pd
-        from django.http import HttpResponse
-        from datetime import datetime
-        
-        # Récupérer tous les dossiers traités
-        dossiers = DossierTraite.objects.all()
+        from .exportation import flux_csv
+        from .taches import mettre_en_file
         
-        # Créer un DataFrame
-        data = []
-        for dossier in dossiers:
-            data.append({
-                'Numéro': dossier.numero,
-                'Demandeur': dossier.demandeur,
-                'Référence': dossier.reference,
-                'Date envoi': dossier.date_envoi,
-                'Référence réception': dossier.reference_reception,
-                'Date réception': dossier.date_reception,
-                'Diplôme': dossier.diplome,
-                'Université': dossier.universite,
-                'Pays': dossier.pays,
-                'Date avis': dossier.date_avis,
-                'Avis commission': dossier.avis_commission,
-                'Nombre réunions': dossier.get_nombre_reunions(),
-            })
-        
-        df = pd.DataFrame(data)
+        # Les paramètres de la liste (filtres, recherche, tri) sont transmis tels quels par les liens d'export
+        request.GET = request.GET.copy()
+        format_export = request.GET.pop('format', ['xlsx'])[-1]
+        try:
+            queryset = self.queryset_export(request)
+        except IncorrectLookupParameters:
+            messages.error(request, "Filtres invalides pour l'export.")
+            return HttpResponseRedirect(reverse('admin:dossiers_dossiertraite_changelist'))
         
-        # Créer la réponse HTTP
-        response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = f'attachment; filename="dossiers_traites_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx"'
+        if format_export == 'csv':
+            # CSV envoyé en flux, sans construire le fichier en mémoire
+            reponse = StreamingHttpResponse(flux_csv(queryset), content_type='text/csv; charset=utf-8')
+            reponse['Content-Disposition'] = f'attachment; filename="dossiers_traites_{timezone.now():%Y%m%d_%H%M%S}.csv"'
+            return reponse
         
-        df.to_excel(response, index=False)
-        return response
+        # Export Excel exécuté en arrière-plan ; le fichier est téléchargeable depuis la page de suivi
+        tache = mettre_en_file('export_excel', request.user, parametres={'filtres': request.GET.urlencode()})
+        messages.success(request, "Export Excel lancé en arrière-plan.")
+        return HttpResponseRedirect(reverse('dossiers:suivi_tache', args=[tache.id]))
     
     def bulk_edit_view(self, request):
         if request.method == 'POST':
-            selected_ids = request.POST.getlist('_selected_action')
+            selected_ids = [int(i) for i in request.POST.getlist('_selected_action') if i.isdigit()]
             action = request.POST.get('action')
             
             if action == 'update_universite':
                 nouvelle_universite = request.POST.get('nouvelle_universite')
                 DossierTraite.objects.filter(id__in=selected_ids).update(universite=nouvelle_universite)
+                # update() ne déclenche pas post_save : réindexer les dossiers pour la recherche
+                recherche.indexer_dossiers_traites(selected_ids)
                 messages.success(request, f'{len(selected_ids)} dossiers mis à jour')
             
             elif action == 'update_pays':
                 nouveau_pays = request.POST.get('nouveau_pays')
                 DossierTraite.objects.filter(id__in=selected_ids).update(pays=nouveau_pays)
+                # update() ne déclenche pas post_save : réindexer les dossiers pour la recherche
+                recherche.indexer_dossiers_traites(selected_ids)
                 messages.success(request, f'{len(selected_ids)} dossiers mis à jour')
             
             elif action == 'update_avis':
                 nouvel_avis = request.POST.get('nouvel_avis')
                 DossierTraite.objects.filter(id__in=selected_ids).update(avis_commission=nouvel_avis)
+                # update() ne déclenche pas post_save : réindexer les dossiers pour la recherche
+                recherche.indexer_dossiers_traites(selected_ids)
                 messages.success(request, f'{len(selected_ids)} dossiers mis à jour')
             
             elif action == 'delete_selected':
@@ -253,4 +324,48 @@ class BulkEditForm(forms.Form):
 
 # Enregistrement des modèles dans l'admin
 admin.site.register(DossierTraite, DossierTraiteAdmin)
+
+
+class ReunionDossierInline(admin.TabularInline):
+    model = ReunionDossier
+    raw_id_fields = ['dossier']
+    extra = 0
+
+
+@admin.register(Reunion)
+class ReunionAdmin(admin.ModelAdmin):
+    list_display = ['date', 'titre', 'participants', 'nombre_dossiers', 'importee']
+    list_filter = ['importee', 'date']
+    search_fields = ['titre', 'ordre_du_jour', 'decisions']
+    date_hierarchy = 'date'
+    inlines = [ReunionDossierInline]
+    actions = ['generer_dossier_seance']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(nombre_dossiers=Count('examens'))
+    
+    @admin.action(description="Générer le dossier de séance (PDF)")
+    def generer_dossier_seance(self, request, queryset):
+        from .taches import mettre_en_file
+        
+        taches = [
+            mettre_en_file('dossier_seance', request.user, parametres={'reunion_id': reunion_id})
+            for reunion_id in queryset.values_list('id', flat=True)
+        ]
+        if len(taches) == 1:
+            return HttpResponseRedirect(reverse('dossiers:suivi_tache', args=[taches[0].id]))
+        self.message_user(request, f"{len(taches)} dossier(s) de séance en cours de génération.", messages.SUCCESS)
+    
+    def nombre_dossiers(self, obj):
+        return obj.nombre_dossiers
+    nombre_dossiers.short_description = 'Dossiers examinés'
+    nombre_dossiers.admin_order_field = 'nombre_dossiers'
+
+def queryset_export_dossiers_traites(utilisateur, filtres=''):
+    """Rejoue les paramètres de la liste d'administration (chaîne GET) pour un export en arrière-plan"""
+    requete = HttpRequest()
+    requete.method = 'GET'
+    requete.GET = QueryDict(filtres)
+    requete.user = utilisateur
+    return DossierTraiteAdmin(DossierTraite, admin.site).queryset_export(requete)
 # Les autres modèles sont déjà enregistrés avec @admin.register
@@ -0,0 +1,9 @@
+from .models import Notification
+
+
+def notifications_non_lues(request):
+    """Expose le nombre de notifications non lues (mis en cache) pour le badge de la barre de navigation"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'notifications_non_lues': Notification.compter_non_lues(user)}
@@ -0,0 +1,234 @@
+"""
+Dossier de séance d'une réunion de la commission : un seul PDF regroupant l'ordre du jour,
+la grille de notes de chaque candidat et le relevé des décisions à compléter en séance.
+
+Comme pour le rapport d'évaluation (pdf_evaluation), le rendu se fait en deux temps :
+donnees_dossier_seance() lit la réunion et tous ses dossiers en un nombre constant de requêtes
+et n'en garde que des listes et des chaînes, puis rendre_dossier_seance() construit le PDF sans
+l'ORM. La génération est une tâche en arrière-plan ('dossier_seance', voir taches.py).
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils.html import escape
+from django.utils.text import slugify
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.platypus import KeepTogether, PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from .models import ConsistanceAcademique, ReunionDossier
+from .notation import bareme_actif
+from .pdf_evaluation import STYLE_SECTION, STYLE_TABLE_FICHE, STYLE_TABLE_GRILLE, STYLE_TEXTE, STYLE_TITRE, _section, _tableau
+
+
+LIGNE_A_COMPLETER = "_" * 80
+CHOIX_DECISION = "[ ] Équivalence accordée      [ ] Équivalence refusée      [ ] Complément de dossier demandé"
+
+LARGEURS_ORDRE_DU_JOUR = [0.4*inch, 1*inch, 2.2*inch, 1.5*inch, 1*inch, 0.7*inch]
+LARGEURS_NOTES = [2.6*inch, 0.8*inch, 0.8*inch, 1*inch]
+LARGEURS_RELEVE = [0.4*inch, 2.2*inch, 4.2*inch]
+ENTETES_ORDRE_DU_JOUR = ['N°', 'Numéro', 'Candidat', 'Diplôme', 'Pays', 'Note']
+ENTETES_NOTES = ['Critère', 'Note', 'Maximum', 'Acquis']
+ENTETES_RELEVE = ['N°', 'Candidat', 'Décision']
+
+# Texte long dans les cellules : retour à la ligne automatique
+STYLE_TABLE_RELEVE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), 18),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+NIVEAUX = dict(ConsistanceAcademique.NIVEAUX_INTERPRETATION)
+
+
+def nom_fichier_dossier_seance(reunion):
+    return f"dossier_seance_{reunion.date.strftime('%Y%m%d')}_{slugify(reunion.titre) or reunion.pk}.pdf"
+
+
+def prefetch_dossier_seance(reunion):
+    """Examens de la réunion avec le dossier traité, le dossier d'origine et sa consistance (une requête)"""
+    return ReunionDossier.objects.filter(reunion=reunion).select_related(
+        'dossier__dossier__candidat__consistance_academique'
+    ).order_by('dossier__demandeur_candidat', 'dossier__numero')
+
+
+def _consistance(dossier_traite):
+    """Consistance académique évaluée dans l'application, None pour un dossier importé"""
+    try:
+        return dossier_traite.dossier.candidat.consistance_academique
+    except (AttributeError, ObjectDoesNotExist):
+        return None
+
+
+def _note(valeur):
+    if valeur is None:
+        return '—'
+    return f"{valeur:g}" if isinstance(valeur, float) else str(valeur)
+
+
+# --- Données ---
+
+def donnees_dossier_seance(reunion, examens=None):
+    """Extrait les données du dossier de séance (listes et chaînes uniquement)"""
+    if examens is None:
+        examens = prefetch_dossier_seance(reunion)
+    examens = list(examens)
+    bareme = bareme_actif()
+
+    # Notes : celles de la consistance si le dossier a été évalué ici, sinon les colonnes recopiées au transfert
+    sources = []
+    for examen in examens:
+        consistance = _consistance(examen.dossier)
+        source = consistance or examen.dossier
+        ligne = {champ: getattr(source, champ) for champ in bareme.champs_notes}
+        ligne['criteres_personnalises'] = consistance.criteres_personnalises if consistance else []
+        sources.append(ligne)
+    # Total, critères non acquis et interprétation de tous les candidats en une passe
+    resultats = bareme.evaluer_lot(sources)
+
+    ordre_du_jour = []
+    candidats = []
+    releve = []
+    for numero, (examen, ligne, resultat) in enumerate(zip(examens, sources, resultats), start=1):
+        dossier = examen.dossier
+        evalue = any(ligne[champ] is not None for champ in bareme.champs_notes)
+        note_totale = _note(resultat.score_total) if evalue else '—'
+        ordre_du_jour.append([
+            str(numero), dossier.numero, dossier.demandeur_candidat, dossier.diplome,
+            dossier.get_pays_display(), note_totale
+        ])
+
+        notes = []
+        for critere in bareme.criteres:
+            note = ligne[critere.champ_note]
+            if note is None or not critere.obligatoire:
+                acquis = '—'
+            else:
+                acquis = 'Oui' if critere.libelle not in resultat.criteres_non_acquis else 'Non'
+            notes.append([critere.libelle, _note(note), _note(critere.note_max), acquis])
+        for critere in ligne['criteres_personnalises']:
+            notes.append([critere.get('nom', ''), _note(critere.get('note')), _note(critere.get('note_max')), '—'])
+        notes.append(['Note totale', note_totale, '', ''])
+
+        decision = examen.decision
+        candidats.append({
+            'titre': f"{numero}. {dossier.demandeur_candidat} — dossier {dossier.numero}",
+            'fiche': [
+                ['Référence:', dossier.reference],
+                ['Diplôme:', dossier.diplome],
+                ['Université:', dossier.get_universite_display()],
+                ['Pays:', dossier.get_pays_display()],
+                ['Date de réception:', dossier.date_reception.strftime("%d/%m/%Y")],
+            ],
+            'notes': notes if evalue else [],
+            'interpretation': NIVEAUX.get(resultat.niveau_interpretation, '') if evalue else '',
+            'criteres_non_acquis': ", ".join(resultat.criteres_non_acquis) if evalue else '',
+            'avis': dossier.avis_commission,
+            'decision': decision,
+        })
+        releve.append([str(numero), dossier.demandeur_candidat, decision])
+
+    return {
+        'titre': reunion.titre or "Réunion de la commission d'équivalence",
+        'reunion': [
+            ['Date:', reunion.date.strftime("%d/%m/%Y")],
+            ['Dossiers examinés:', str(len(examens))],
+        ],
+        'participants': reunion.participants,
+        'ordre_du_jour_texte': reunion.ordre_du_jour,
+        'ordre_du_jour': ordre_du_jour,
+        'candidats': candidats,
+        'releve': releve,
+        'decisions': reunion.decisions,
+    }
+
+
+# --- Rendu ---
+
+def _texte(story, texte):
+    """Texte saisi (échappé), en conservant ses retours à la ligne"""
+    for ligne in texte.splitlines():
+        story.append(Paragraph(escape(ligne) or '&nbsp;', STYLE_TEXTE))
+    story.append(Spacer(1, 12))
+
+
+def _decision(story, decision):
+    story.append(Paragraph("<b>Décision de la commission</b>", STYLE_TEXTE))
+    story.append(Spacer(1, 6))
+    if decision:
+        _texte(story, decision)
+    else:
+        # Emplacement à compléter pendant la séance
+        story.append(Paragraph(CHOIX_DECISION, STYLE_TEXTE))
+        story.append(Spacer(1, 12))
+        for _ in range(3):
+            story.append(Paragraph(LIGNE_A_COMPLETER, STYLE_TEXTE))
+            story.append(Spacer(1, 8))
+
+
+def rendre_dossier_seance(donnees, sortie):
+    """Construit le PDF du dossier de séance à partir des données extraites et l'écrit dans sortie"""
+    story = [Paragraph("DOSSIER DE SÉANCE", STYLE_TITRE), Paragraph(escape(donnees['titre']), STYLE_SECTION), Spacer(1, 12)]
+    _tableau(story, donnees['reunion'], [2*inch, 4*inch], STYLE_TABLE_FICHE)
+
+    if donnees['participants']:
+        _section(story, "PARTICIPANTS")
+        _texte(story, donnees['participants'])
+
+    _section(story, "ORDRE DU JOUR")
+    if donnees['ordre_du_jour_texte']:
+        _texte(story, donnees['ordre_du_jour_texte'])
+    if donnees['ordre_du_jour']:
+        _tableau(story, [ENTETES_ORDRE_DU_JOUR] + donnees['ordre_du_jour'], LARGEURS_ORDRE_DU_JOUR, STYLE_TABLE_GRILLE)
+
+    for candidat in donnees['candidats']:
+        story.append(PageBreak())
+        _section(story, escape(candidat['titre']))
+        _tableau(story, candidat['fiche'], [2*inch, 4*inch], STYLE_TABLE_FICHE)
+        if candidat['notes']:
+            _tableau(story, [ENTETES_NOTES] + candidat['notes'], LARGEURS_NOTES, STYLE_TABLE_GRILLE)
+            story.append(Paragraph(f"<b>Interprétation :</b> {escape(candidat['interpretation'])}", STYLE_TEXTE))
+            if candidat['criteres_non_acquis']:
+                story.append(Paragraph(f"<b>Critères obligatoires non acquis :</b> {escape(candidat['criteres_non_acquis'])}", STYLE_TEXTE))
+            story.append(Spacer(1, 12))
+        else:
+            story.append(Paragraph("Aucune note enregistrée pour ce dossier.", STYLE_TEXTE))
+            story.append(Spacer(1, 12))
+        if candidat['avis']:
+            story.append(Paragraph("<b>Avis enregistré</b>", STYLE_TEXTE))
+            _texte(story, candidat['avis'])
+        _decision(story, candidat['decision'])
+
+    # Procès-verbal : relevé des décisions et signatures
+    story.append(PageBreak())
+    _section(story, "RELEVÉ DES DÉCISIONS")
+    if donnees['releve']:
+        lignes = [ENTETES_RELEVE] + [
+            [numero, Paragraph(escape(candidat), STYLE_TEXTE), Paragraph(escape(decision).replace('\n', '<br/>'), STYLE_TEXTE)]
+            for numero, candidat, decision in donnees['releve']
+        ]
+        tableau = Table(lignes, colWidths=LARGEURS_RELEVE, repeatRows=1)
+        tableau.setStyle(STYLE_TABLE_RELEVE)
+        story.append(tableau)
+        story.append(Spacer(1, 20))
+    if donnees['decisions']:
+        story.append(Paragraph("<b>Décisions générales</b>", STYLE_TEXTE))
+        _texte(story, donnees['decisions'])
+    story.append(KeepTogether([
+        Paragraph("<b>Signatures des membres de la commission</b>", STYLE_TEXTE),
+        Spacer(1, 40),
+        Paragraph(LIGNE_A_COMPLETER, STYLE_TEXTE),
+    ]))
+
+    SimpleDocTemplate(sortie, pagesize=A4, title=donnees['titre']).build(story)
+
+
+def generer_dossier_seance(reunion, sortie):
+    """Écrit le dossier de séance de la réunion dans sortie ; retourne le nombre de dossiers examinés"""
+    donnees = donnees_dossier_seance(reunion)
+    rendre_dossier_seance(donnees, sortie)
+    return len(donnees['candidats'])
+
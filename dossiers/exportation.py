@@ -0,0 +1,75 @@
+"""
+Export en flux des dossiers traités (Excel et CSV) à mémoire constante.
+
+Les dossiers sont lus par morceaux avec .values().iterator() : aucun objet modèle ni liste
+complète n'est construit. L'Excel est écrit avec le mode write-only d'openpyxl (lignes
+écrites au fil de l'eau dans le fichier), le CSV est produit ligne à ligne pour une
+StreamingHttpResponse.
+"""
+import codecs
+import csv
+
+from openpyxl import Workbook
+
+from .models import ReunionDossier
+
+
+TAILLE_LOT = 1000
+
+# (en-tête, champ) dans l'ordre des colonnes de l'export
+COLONNES_EXPORT = [
+    ('Numéro', 'numero'),
+    ('Demandeur', 'demandeur_candidat'),
+    ('Référence', 'reference'),
+    ('Date envoi', 'date_envoi'),
+    ('Référence réception', 'reference_reception'),
+    ('Date réception', 'date_reception'),
+    ('Diplôme', 'diplome'),
+    ('Université', 'universite'),
+    ('Pays', 'pays'),
+    ('Date avis', 'date_avis'),
+    ('Avis commission', 'avis_commission'),
+    ('Nombre réunions', 'nombre_reunions'),
+]
+ENTETES_EXPORT = [entete for entete, _ in COLONNES_EXPORT]
+
+
+def lignes_export(queryset, taille_lot=TAILLE_LOT):
+    """Produit une ligne (liste de valeurs) par dossier traité, lue par morceaux"""
+    champs = [champ for _, champ in COLONNES_EXPORT]
+    queryset = queryset.annotate(nombre_reunions=ReunionDossier.nombre_par_dossier())
+    for dossier in queryset.values(*champs).iterator(chunk_size=taille_lot):
+        yield [dossier[champ] for champ in champs]
+
+
+def ecrire_excel(queryset, sortie, taille_lot=TAILLE_LOT, progression=None):
+    """
+    Écrit l'export Excel dans sortie (chemin ou fichier binaire) en mode write-only.
+    progression(lignes_écrites), si fournie, est appelée après chaque lot ; retourne le nombre de lignes.
+    """
+    classeur = Workbook(write_only=True)
+    feuille = classeur.create_sheet('Dossiers traités')
+    feuille.append(ENTETES_EXPORT)
+    nombre = 0
+    for nombre, valeurs in enumerate(lignes_export(queryset, taille_lot), start=1):
+        feuille.append(valeurs)
+        if progression and nombre % taille_lot == 0:
+            progression(nombre)
+    classeur.save(sortie)
+    return nombre
+
+
+class _Tampon:
+    """Pseudo-fichier pour csv.writer : rend la ligne écrite au lieu de la stocker"""
+
+    def write(self, valeur):
+        return valeur
+
+
+def flux_csv(queryset, taille_lot=TAILLE_LOT):
+    """Produit l'export CSV (UTF-8 avec BOM, lisible par Excel) morceau par morceau"""
+    writer = csv.writer(_Tampon())
+    yield codecs.BOM_UTF8
+    yield writer.writerow(ENTETES_EXPORT).encode('utf-8')
+    for valeurs in lignes_export(queryset, taille_lot):
+        yield writer.writerow(['' if valeur is None else valeur for valeur in valeurs]).encode('utf-8')
@@ -0,0 +1,142 @@
+"""
+Envoi des fichiers stockés (pièces jointes) sans les charger en mémoire.
+
+reponse_fichier() gère les requêtes conditionnelles (ETag / Last-Modified -> 304), les
+requêtes partielles (Range -> 206, pour parcourir un gros PDF sans le retélécharger) et
+le type MIME d'après l'extension. Si FICHIERS_SENDFILE est configuré, l'envoi est délégué
+au serveur frontal (X-Sendfile pour Apache/lighttpd, X-Accel-Redirect pour nginx), qui
+prend alors lui-même en charge les plages et les requêtes conditionnelles.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+TAILLE_BLOC = 64 * 1024
+
+_PLAGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def peut_acceder_dossier(utilisateur, dossier):
+    """Les administrateurs voient tous les dossiers, les professeurs seulement ceux qui leur sont attribués"""
+    if utilisateur.role == 'admin':
+        return True
+    if utilisateur.role == 'professeur':
+        return dossier.professeurs.filter(pk=utilisateur.pk).exists()
+    return False
+
+
+def pieces_accessibles(utilisateur, pieces):
+    """Restreint un queryset de PieceJointe aux dossiers accessibles à l'utilisateur"""
+    if utilisateur.role == 'admin':
+        return pieces
+    if utilisateur.role == 'professeur':
+        return pieces.filter(dossier__professeurs=utilisateur)
+    return pieces.none()
+
+
+def type_mime(nom_fichier):
+    type_contenu, encodage = mimetypes.guess_type(nom_fichier)
+    if type_contenu is None or encodage:
+        return 'application/octet-stream'
+    return type_contenu
+
+
+def _plage_demandee(request, taille, etag, derniere_modification):
+    """
+    Plage (début, fin incluse) demandée par l'en-tête Range, None pour le fichier entier,
+    ou False si la plage n'est pas satisfaisable. Une seule plage est prise en charge.
+    """
+    entete = request.headers.get('Range', '').replace(' ', '')
+    correspondance = _PLAGE.match(entete)
+    if not correspondance or request.method != 'GET':
+        return None
+
+    # If-Range : la plage ne vaut que si le fichier n'a pas changé depuis la première réponse
+    si_plage = request.headers.get('If-Range')
+    if si_plage and si_plage != etag and si_plage != derniere_modification:
+        return None
+
+    debut, fin = correspondance.groups()
+    if not debut and not fin:
+        return None
+    if not debut:
+        # bytes=-N : les N derniers octets
+        longueur = int(fin)
+        if longueur == 0:
+            return False
+        return max(0, taille - longueur), taille - 1
+    debut = int(debut)
+    fin = min(int(fin), taille - 1) if fin else taille - 1
+    if debut >= taille or debut > fin:
+        return False
+    return debut, fin
+
+
+def _lire_plage(chemin, debut, longueur):
+    with open(chemin, 'rb') as fichier:
+        fichier.seek(debut)
+        while longueur > 0:
+            bloc = fichier.read(min(TAILLE_BLOC, longueur))
+            if not bloc:
+                break
+            longueur -= len(bloc)
+            yield bloc
+
+
+def _deleguer_envoi(chemin, mode, nom_fichier, en_ligne):
+    reponse = HttpResponse(content_type=type_mime(nom_fichier))
+    reponse['Content-Disposition'] = f"{'inline' if en_ligne else 'attachment'}; filename*=UTF-8''{quote(nom_fichier)}"
+    if mode == 'x-accel':
+        relatif = os.path.relpath(chemin, settings.MEDIA_ROOT).replace(os.sep, '/')
+        prefixe = getattr(settings, 'FICHIERS_X_ACCEL_PREFIXE', '/media-protege/')
+        reponse['X-Accel-Redirect'] = prefixe.rstrip('/') + '/' + quote(relatif)
+    else:
+        reponse['X-Sendfile'] = chemin
+    return reponse
+
+
+def reponse_fichier(request, chemin, nom_fichier=None, en_ligne=True):
+    """Réponse HTTP envoyant le fichier chemin (qui doit exister), sans le lire entièrement en mémoire"""
+    chemin = os.fspath(chemin)
+    nom_fichier = nom_fichier or os.path.basename(chemin)
+
+    mode = getattr(settings, 'FICHIERS_SENDFILE', None)
+    if mode:
+        return _deleguer_envoi(chemin, mode, nom_fichier, en_ligne)
+
+    etat = os.stat(chemin)
+    etag = f'"{etat.st_mtime_ns:x}-{etat.st_size:x}"'
+    derniere_modification = http_date(etat.st_mtime)
+
+    # If-None-Match / If-Modified-Since -> 304, If-Match / If-Unmodified-Since -> 412
+    reponse = get_conditional_response(request, etag=etag, last_modified=int(etat.st_mtime))
+    if reponse is None:
+        plage = _plage_demandee(request, etat.st_size, etag, derniere_modification)
+        if plage is False:
+            reponse = HttpResponse(status=416)
+            reponse['Content-Range'] = f'bytes */{etat.st_size}'
+        elif plage:
+            debut, fin = plage
+            reponse = StreamingHttpResponse(
+                _lire_plage(chemin, debut, fin - debut + 1), status=206, content_type=type_mime(nom_fichier)
+            )
+            reponse['Content-Range'] = f'bytes {debut}-{fin}/{etat.st_size}'
+            reponse['Content-Length'] = str(fin - debut + 1)
+        else:
+            reponse = FileResponse(
+                open(chemin, 'rb'), as_attachment=not en_ligne, filename=nom_fichier,
+                content_type=type_mime(nom_fichier)
+            )
+
+    reponse['ETag'] = etag
+    reponse['Last-Modified'] = derniere_modification
+    reponse['Accept-Ranges'] = 'bytes'
+    # Contenu soumis à autorisation : pas de cache partagé, revalidation à chaque consultation
+    patch_cache_control(reponse, private=True, no_cache=True)
+    return reponse
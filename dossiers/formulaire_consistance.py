@@ -0,0 +1,229 @@
+"""
+Lecture du formulaire de consistance académique.
+
+Les champs du formulaire sont décrits une fois (CHAMPS_TEXTE, COMPETENCES_FIXES, STAGES_PAR_DEFAUT
+et le barème pour les notes) ; lire_formulaire_consistance() lit et valide toute la saisie en une
+passe sans modifier la consistance, puis enregistrer_consistance() applique le résultat en une
+seule écriture. Une erreur de saisie n'enregistre donc rien ; consistance_avec_saisie() permet
+alors de réafficher le formulaire avec les valeurs saisies.
+"""
+import copy
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from .notation import CRITERES_FIXES
+
+
+# Champs texte de chaque critère fixe : <clé>_contenus et <clé>_commentaires
+CHAMPS_TEXTE = [
+    f'{cle}_{suffixe}' for cle, _, _ in CRITERES_FIXES for suffixe in ('contenus', 'commentaires')
+]
+
+# Cases « <clé>_comp_<i> » du formulaire -> champs booléens, dans l'ordre d'affichage des compétences
+COMPETENCES_FIXES = {
+    'sciences_geodesiques': [
+        'sciences_geodesie_geometrique', 'sciences_astronomie_geodesie_spatiale', 'sciences_geodesie_physique',
+        'sciences_ajustements_compensations', 'sciences_systemes_referentiels', 'sciences_projections_cartographiques',
+        'sciences_geodesie_appliquee', 'sciences_gnss', 'sciences_micro_geodesie',
+    ],
+    'topographie': [
+        'topographie_theorique_pratique', 'topographie_topometrique_instrumentation', 'topographie_techniques_mensuration',
+    ],
+    'photogrammetrie': [
+        'photogrammetrie_base_approfondie', 'photogrammetrie_photographies_aeriennes', 'photogrammetrie_aerotriangulation',
+        'photogrammetrie_restitution', 'photogrammetrie_produits_derives', 'photogrammetrie_drone',
+    ],
+    'cartographie': [
+        'cartographie_topographique', 'cartographie_representation_cartographique', 'cartographie_thematique',
+        'cartographie_semiologie_langage', 'cartographie_dao_cao', 'cartographie_drone',
+    ],
+    'droit_foncier': [
+        'droit_foncier_droit', 'droit_foncier_techniques_cadastrales', 'droit_foncier_gestion_amenagement',
+        'droit_foncier_reglementations',
+    ],
+    'sig': ['sig_bases', 'sig_gestion_analyse_donnees', 'sig_bases_donnees_geographiques', 'sig_web_mapping'],
+    'teledetection': ['teledetection_bases_physiques', 'teledetection_traitement_images', 'teledetection_applications'],
+}
+
+STAGES_PAR_DEFAUT = [
+    'stage_conservation_fonciere', 'stage_cadastre', 'stage_topographie', 'stage_geodesie', 'stage_photogrammetrie',
+]
+
+# La note des stages est exigée même si l'administrateur a retiré le critère
+CRITERES_TOUJOURS_EXIGES = {'stages'}
+
+
+@dataclass
+class SaisieConsistance:
+    valeurs: dict = field(default_factory=dict)
+    criteres_personnalises: list = field(default_factory=list)
+    erreurs: list = field(default_factory=list)
+    informations: list = field(default_factory=list)
+
+    @property
+    def champs(self):
+        return list(self.valeurs) + ['criteres_personnalises']
+
+
+def _lire_note(texte, libelle, note_max, erreurs):
+    """Note entière entre 0 et note_max, None si vide ; ajoute le message d'erreur à erreurs sinon"""
+    if not texte or not texte.strip():
+        return None
+    try:
+        note = int(texte)
+    except ValueError:
+        erreurs.append(f"❌ ERREUR : La note pour {libelle} doit être un nombre entier valide")
+        return None
+    if note < 0 or note > note_max:
+        erreurs.append(f"❌ ERREUR : La note pour {libelle} doit être entre 0 et {note_max} (saisie: {note})")
+        return None
+    return note
+
+
+def _lire_criteres_personnalises(donnees, criteres, est_admin, saisie):
+    """Ajout / suppression de critères et de compétences (administrateurs), cases cochées et notes"""
+    action_critere = donnees.get('action_critere')
+    if action_critere == 'ajouter' and est_admin:
+        nom_critere = donnees.get('nom_critere_personnalise', '').strip()
+        note_max_critere = donnees.get('note_max_critere_personnalise', 0)
+        if nom_critere and note_max_critere:
+            try:
+                criteres.append({
+                    'id': len(criteres) + 1,
+                    'nom': nom_critere,
+                    'note_max': int(note_max_critere),
+                    'note': None,
+                    'contenus': '',
+                    'commentaires': ''
+                })
+                saisie.informations.append(f"Critère '{nom_critere}' ajouté avec succès.")
+            except ValueError:
+                pass
+    elif action_critere == 'supprimer' and est_admin:
+        try:
+            critere_id = int(donnees.get('critere_id') or '')
+        except ValueError:
+            critere_id = None
+        supprime = next((critere for critere in criteres if critere.get('id') == critere_id), None)
+        if supprime:
+            criteres[:] = [critere for critere in criteres if critere.get('id') != critere_id]
+            saisie.informations.append(f"Critère '{supprime.get('nom')}' supprimé avec succès.")
+
+    for critere in criteres:
+        critere_id = critere.get('id')
+        critere.setdefault('competences', [])
+        critere.setdefault('competences_cochees', [])
+
+        if donnees.get(f'ajouter_competence_{critere_id}') and est_admin:
+            nouvelle = donnees.get(f'nouvelle_competence_{critere_id}', '').strip()
+            if nouvelle:
+                critere['competences'].append(nouvelle)
+                saisie.informations.append(f"Compétence '{nouvelle}' ajoutée au critère '{critere.get('nom')}'.")
+
+        if est_admin:
+            for index, competence in enumerate(critere['competences']):
+                if donnees.get(f'supprimer_competence_{critere_id}_{index}'):
+                    critere['competences'].pop(index)
+                    saisie.informations.append(f"Compétence '{competence}' supprimée du critère '{critere.get('nom')}'.")
+                    break
+
+        critere['competences_cochees'] = [
+            index for index in range(len(critere['competences']))
+            if donnees.get(f'competence_{critere_id}_{index}')
+        ]
+        # Note saisie par le professeur, plafonnée par la note maximale définie par l'admin
+        texte = donnees.get(f'note_critere_personnalise_{critere_id}')
+        critere['note'] = None
+        if texte and texte.strip():
+            nom, note_max = critere.get('nom'), critere.get('note_max', 10)
+            try:
+                note = int(texte)
+            except ValueError:
+                saisie.erreurs.append(f"❌ ERREUR : La note pour '{nom}' doit être un nombre entier valide")
+                continue
+            if note < 0:
+                saisie.erreurs.append(f"❌ ERREUR : La note pour '{nom}' ne peut pas être négative (saisie: {note})")
+            elif note > note_max:
+                saisie.erreurs.append(f"❌ ERREUR : La note pour '{nom}' ne peut pas dépasser {note_max} (saisie: {note})")
+            else:
+                critere['note'] = note
+
+
+def lire_formulaire_consistance(donnees, consistance, structure, bareme, est_admin=False):
+    """
+    Lit et valide le formulaire (request.POST) sans modifier la consistance.
+    structure : StructureEvaluationGlobale normalisée ; bareme : barème compilé (notes maximales).
+    """
+    saisie = SaisieConsistance()
+    valeurs = saisie.valeurs
+
+    # Notes exigées (critères fixes non retirés par l'administrateur, stages, critères personnalisés globaux)
+    manquantes = [
+        critere.libelle for critere in bareme.criteres
+        if (critere.cle not in structure.criteres_fixes_supprimes or critere.cle in CRITERES_TOUJOURS_EXIGES)
+        and not donnees.get(critere.champ_note, '').strip()
+    ]
+    manquantes += [
+        f"Critère personnalisé : {critere.get('nom')}"
+        for critere in structure.criteres_personnalises_globaux
+        if not donnees.get(f"note_critere_personnalise_{critere.get('id')}", '').strip()
+    ]
+    if manquantes:
+        saisie.erreurs.append(
+            f"❌ ERREUR : Vous devez remplir TOUTES les notes obligatoires !\n\nNotes manquantes : {', '.join(manquantes)}"
+        )
+
+    for critere in bareme.criteres:
+        valeurs[critere.champ_note] = _lire_note(
+            donnees.get(critere.champ_note), critere.libelle, critere.note_max, saisie.erreurs
+        )
+    for champ in CHAMPS_TEXTE:
+        valeurs[champ] = donnees.get(champ, '')
+    for cle, champs in COMPETENCES_FIXES.items():
+        for index, champ in enumerate(champs):
+            valeurs[champ] = f'{cle}_comp_{index}' in donnees
+
+    # Stages par défaut (seulement s'ils ne sont pas supprimés par l'admin) et stages configurables
+    for champ in STAGES_PAR_DEFAUT:
+        if champ not in structure.stages_defaut_supprimes:
+            valeurs[champ] = champ in donnees
+    valeurs['stages_configurables_cochees'] = [
+        stage['id'] for stage in structure.stages_configurables
+        if donnees.get(f"stage_configurable_{stage['id']}")
+    ]
+    # Boutons stages mutuellement exclusifs
+    statut_stages = donnees.get('stages_status')
+    valeurs['stages_acheves'] = statut_stages == 'acheves'
+    valeurs['stages_non_acheves'] = statut_stages == 'non_acheves'
+    valeurs['message_stages_non_acheves'] = donnees.get('message_stages_non_acheves', '')
+
+    # Travailler sur une copie : la consistance n'est modifiée qu'à l'enregistrement
+    saisie.criteres_personnalises = copy.deepcopy(consistance.criteres_personnalises or [])
+    _lire_criteres_personnalises(donnees, saisie.criteres_personnalises, est_admin, saisie)
+    return saisie
+
+
+def enregistrer_consistance(consistance, saisie):
+    """Applique une saisie valide et l'enregistre en une seule écriture (scores recalculés dans save())"""
+    for champ, valeur in saisie.valeurs.items():
+        setattr(consistance, champ, valeur)
+    consistance.criteres_personnalises = saisie.criteres_personnalises
+    with transaction.atomic():
+        consistance.save(update_fields=saisie.champs + ['date_modification'])
+
+
+def consistance_avec_saisie(consistance, saisie, donnees, bareme):
+    """
+    Copie non enregistrée de la consistance portant la saisie, pour réafficher le formulaire après
+    une erreur sans perdre ce que le professeur a tapé (une note invalide est réaffichée telle quelle).
+    """
+    copie = copy.copy(consistance)
+    for champ, valeur in saisie.valeurs.items():
+        setattr(copie, champ, valeur)
+    for critere in bareme.criteres:
+        texte = (donnees.get(critere.champ_note) or '').strip()
+        if texte and saisie.valeurs.get(critere.champ_note) is None:
+            setattr(copie, critere.champ_note, texte)
+    copie.criteres_personnalises = saisie.criteres_personnalises
+    return copie
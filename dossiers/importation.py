@@ -0,0 +1,617 @@
+"""
+Moteur d'import en masse des dossiers traités (fichier Excel de suivi des équivalences, fichiers CSV).
+
+Le fichier est normalisé colonne par colonne avec pandas, les numéros déjà présents en base
+sont récupérés en une seule requête et les nouveaux dossiers sont insérés par lots
+avec bulk_create dans une transaction.
+
+Le répertoire d'import automatique (IMPORT_AUTO_REPERTOIRE) est synchronisé de façon incrémentale :
+chaque fichier garde un point de reprise (FichierImporte) avec l'empreinte de son contenu et de
+chacune de ses lignes, de sorte qu'un nouveau passage ne traite que ce qui a changé.
+"""
+import codecs
+import csv
+import hashlib
+import io
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, transaction
+
+from . import recherche
+from .models import DossierTraite, FichierImporte, Reunion, ReunionDossier
+
+
+TAILLE_LOT = 500
+
+# Colonnes du fichier de suivi (lu sans en-tête)
+COLONNE_NUMERO = 0
+COLONNE_DEMANDEUR = 1
+COLONNE_REFERENCE = 2
+COLONNE_REFERENCE_RECEPTION = 4
+COLONNE_UNIVERSITE = 7
+COLONNE_PAYS = 8
+COLONNE_DATE_AVIS = 9
+COLONNE_AVIS = 10
+# Décisions prises lors des réunions de la commission : colonne -> date de la réunion
+COLONNES_REUNIONS = {
+    12: '2025-03-24',
+    13: '2025-05-13',
+    14: '2025-06-16',
+}
+PARTICIPANTS_REUNIONS = 'Commission d\'équivalence'
+ORDRE_DU_JOUR_REUNIONS = 'Examen du dossier d\'équivalence'
+NOMBRE_COLONNES = 15
+
+LIGNES_A_IGNORER = ['no.', 'nan', 'situation des dossiers']
+DIPLOME_PAR_DEFAUT = "Diplôme d'Ingénieur en Topographie"
+
+
+class RapportImport:
+    """Résultat structuré d'un import : lignes importées, ignorées et en échec"""
+
+    def __init__(self):
+        self.importes = []   # numéros importés
+        self.mis_a_jour = [] # numéros mis à jour (synchronisation)
+        self.ignores = []    # (ligne, numéro, raison)
+        self.echecs = []     # (ligne, numéro, message)
+
+    @property
+    def nombre_importes(self):
+        return len(self.importes)
+
+    @property
+    def nombre_ignores(self):
+        return len(self.ignores)
+
+    @property
+    def nombre_echecs(self):
+        return len(self.echecs)
+
+    def en_dict(self):
+        return {
+            'importes': self.nombre_importes,
+            'mis_a_jour': len(self.mis_a_jour),
+            'ignores': [{'ligne': ligne, 'numero': numero, 'raison': raison} for ligne, numero, raison in self.ignores],
+            'echecs': [{'ligne': ligne, 'numero': numero, 'message': message} for ligne, numero, message in self.echecs],
+        }
+
+
+def _texte(colonne, defaut):
+    """Colonne nettoyée (str + strip), les cellules vides remplacées par la valeur par défaut"""
+    nettoyee = colonne.astype(str).str.strip()
+    return nettoyee.where(colonne.notna(), defaut)
+
+
+def normaliser_feuille(df):
+    """
+    Filtre les lignes de dossiers et normalise leurs colonnes en une passe vectorisée.
+    Retourne un DataFrame indexé par le numéro de ligne du fichier (à partir de 1).
+    """
+    df = df.reindex(columns=range(NOMBRE_COLONNES))
+    df.index = df.index + 1
+
+    numeros = df[COLONNE_NUMERO].astype(str).str.strip()
+    # Ne garder que les lignes dont la première colonne est un numéro (ex. "12", "12.1", "12bis")
+    masque = (
+        df[COLONNE_NUMERO].notna()
+        & (numeros != '')
+        & ~numeros.str.lower().isin(LIGNES_A_IGNORER)
+        & numeros.str.replace('.', '', regex=False).str.replace('bis', '', regex=False).str.isdigit()
+    )
+    df = df[masque]
+    numeros = numeros[masque]
+
+    lignes = pd.DataFrame(index=df.index)
+    lignes['numero'] = numeros
+    lignes['demandeur_candidat'] = _texte(df[COLONNE_DEMANDEUR], None).fillna('Candidat ' + numeros)
+    lignes['reference'] = _texte(df[COLONNE_REFERENCE], None).fillna('REF-' + numeros)
+    lignes['reference_reception'] = _texte(df[COLONNE_REFERENCE_RECEPTION], '')
+    lignes['universite'] = _texte(df[COLONNE_UNIVERSITE], 'Université non spécifiée')
+    lignes['pays'] = _texte(df[COLONNE_PAYS], 'Pays non spécifié')
+    lignes['a_date_avis'] = df[COLONNE_DATE_AVIS].notna() & (df[COLONNE_DATE_AVIS].astype(str).str.strip() != '')
+    lignes['avis_commission'] = _texte(df[COLONNE_AVIS], 'Avis non spécifié')
+    for colonne in COLONNES_REUNIONS:
+        lignes[f'reunion_{colonne}'] = _texte(df[colonne], '')
+    return lignes
+
+
+def inserer_par_lots(objets, rapport, taille_lot=TAILLE_LOT, progression=None):
+    """
+    Insère les dossiers par lots avec bulk_create dans une transaction.
+    Si un lot est refusé par la base, ses lignes sont réessayées une à une
+    pour isoler celles en échec sans perdre les autres.
+    Chaque objet porte l'attribut _ligne (numéro de ligne du fichier) ;
+    progression(nombre_insérés) est appelée après chaque lot.
+    """
+    deja_importes = rapport.nombre_importes
+    with transaction.atomic():
+        for debut in range(0, len(objets), taille_lot):
+            lot = objets[debut:debut + taille_lot]
+            try:
+                with transaction.atomic():
+                    DossierTraite.objects.bulk_create(lot)
+                rapport.importes.extend(dossier.numero for dossier in lot)
+            except DatabaseError:
+                for dossier in lot:
+                    try:
+                        with transaction.atomic():
+                            dossier.save()
+                        rapport.importes.append(dossier.numero)
+                    except DatabaseError as e:
+                        rapport.echecs.append((dossier._ligne, dossier.numero, str(e)))
+            lier_reunions_importees(lot)
+            if progression:
+                progression(min(debut + taille_lot, len(objets)))
+
+    # bulk_create ne déclenche pas les signaux : indexer les nouveaux dossiers pour la recherche
+    nouveaux = rapport.importes[deja_importes:]
+    if nouveaux:
+        recherche.indexer_dossiers_traites(
+            list(DossierTraite.objects.filter(numero__in=nouveaux).values_list('id', flat=True))
+        )
+    return rapport
+
+
+def lier_reunions_importees(dossiers):
+    """
+    Rattache les dossiers enregistrés portant _reunions [(date, décision)] aux réunions du fichier de suivi :
+    une Reunion importée par date, partagée par tous les dossiers, et une insertion groupée des examens.
+    Les examens importés précédemment pour ces dossiers sont remplacés, les réunions saisies
+    dans l'application sont conservées.
+    """
+    dossiers = [dossier for dossier in dossiers if dossier.pk and hasattr(dossier, '_reunions')]
+    if not dossiers:
+        return
+    ReunionDossier.objects.filter(reunion__importee=True, dossier__in=[dossier.pk for dossier in dossiers]).delete()
+
+    reunions = {}
+    examens = []
+    for dossier in dossiers:
+        for date_reunion, decision in dossier._reunions:
+            if date_reunion not in reunions:
+                reunions[date_reunion] = (
+                    Reunion.objects.filter(importee=True, date=date_reunion).order_by('id').first()
+                    or Reunion.objects.create(
+                        date=date_reunion,
+                        participants=PARTICIPANTS_REUNIONS,
+                        ordre_du_jour=ORDRE_DU_JOUR_REUNIONS,
+                        importee=True,
+                    )
+                )
+            examens.append(ReunionDossier(reunion=reunions[date_reunion], dossier_id=dossier.pk, decision=decision))
+    ReunionDossier.objects.bulk_create(examens)
+
+
+def empreinte_valeurs(valeurs):
+    """Empreinte stable des valeurs sources d'une ligne (détection des lignes modifiées)"""
+    return hashlib.sha1(repr(tuple(valeurs)).encode('utf-8')).hexdigest()
+
+
+def dossiers_depuis_feuille(lignes, utilisateur):
+    """
+    Construit (sans les enregistrer) les DossierTraite d'une feuille normalisée.
+    Chaque objet porte _ligne (numéro de ligne) et _empreinte (empreinte des valeurs sources).
+    """
+    aujourd_hui = datetime.now().date()
+    colonnes_reunions = [f'reunion_{colonne}' for colonne in COLONNES_REUNIONS]
+
+    for ligne, valeurs in zip(lignes.index, lignes.itertuples(index=False)):
+        decisions = [getattr(valeurs, colonne) for colonne in colonnes_reunions]
+
+        dossier = DossierTraite(
+            numero=valeurs.numero,
+            demandeur_candidat=valeurs.demandeur_candidat,
+            reference=valeurs.reference,
+            date_envoi=aujourd_hui,  # On garde la date d'aujourd'hui pour l'import
+            reference_reception=valeurs.reference_reception,
+            date_reception=aujourd_hui,  # On garde la date d'aujourd'hui pour l'import
+            diplome=DIPLOME_PAR_DEFAUT,
+            universite=valeurs.universite,
+            pays=valeurs.pays,
+            date_avis=aujourd_hui if valeurs.a_date_avis else None,
+            avis_commission=valeurs.avis_commission,
+            cree_par=utilisateur,
+        )
+        # Décisions des réunions de la commission, enregistrées après l'insertion (lier_reunions_importees)
+        dossier._reunions = [
+            (date_reunion, decision)
+            for date_reunion, decision in zip(COLONNES_REUNIONS.values(), decisions)
+            if decision
+        ]
+        dossier._ligne = ligne
+        dossier._empreinte = empreinte_valeurs(valeurs)
+        yield dossier
+
+
+def importer_dossiers_traites_excel(source, utilisateur, taille_lot=TAILLE_LOT, progression=None):
+    """
+    Importe un fichier Excel de suivi (chemin ou fichier téléversé) dans DossierTraite.
+    progression(lignes_traitées, total), si fournie, est appelée après chaque lot.
+    Retourne un RapportImport.
+    """
+    lignes = normaliser_feuille(pd.read_excel(source, header=None))
+    rapport = RapportImport()
+    if lignes.empty:
+        return rapport
+    total = len(lignes)
+
+    # Numéros déjà en base : une seule requête pour tout le fichier
+    existants = set(
+        DossierTraite.objects.filter(numero__in=lignes['numero'].unique().tolist()).values_list('numero', flat=True)
+    )
+    doublons = lignes['numero'].duplicated()
+
+    a_creer = []
+    for dossier in dossiers_depuis_feuille(lignes, utilisateur):
+        if dossier.numero in existants:
+            rapport.ignores.append((dossier._ligne, dossier.numero, 'déjà existant'))
+        elif doublons[dossier._ligne]:
+            rapport.ignores.append((dossier._ligne, dossier.numero, 'doublon dans le fichier'))
+        else:
+            a_creer.append(dossier)
+
+    # Les lignes ignorées sont traitées d'emblée ; l'avancement suit ensuite les insertions
+    deja_traitees = total - len(a_creer)
+    suivi = (lambda inserees: progression(deja_traitees + inserees, total)) if progression else None
+    return inserer_par_lots(a_creer, rapport, taille_lot, suivi)
+
+
+# --- Import CSV en flux ---
+
+COLONNES_CSV_REQUISES = ['numero', 'demandeur_candidat', 'reference', 'date_envoi', 'date_reception', 'diplome', 'universite', 'pays', 'avis_commission']
+COLONNES_CSV_TEXTE = ['numero', 'demandeur_candidat', 'reference', 'diplome', 'universite', 'pays', 'avis_commission',
+                      'reference_reception', 'universite_autre', 'pays_autre']
+FORMATS_DATE = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d')
+DOSSIER_RAPPORTS = 'imports/rapports'
+
+
+class ErreurFormatCSV(Exception):
+    """Le fichier CSV ne peut pas être importé (colonnes manquantes, encodage)"""
+
+
+def lignes_decodees(fichier, encodage='utf-8-sig'):
+    """
+    Décode un fichier téléversé morceau par morceau et produit ses lignes
+    (fin de ligne incluse, comme attendu par le module csv) sans le charger en mémoire.
+    """
+    decodeur = codecs.getincrementaldecoder(encodage)()
+    reste = ''
+    morceaux = fichier.chunks() if hasattr(fichier, 'chunks') else iter(lambda: fichier.read(64 * 1024), b'')
+    for morceau in morceaux:
+        reste += decodeur.decode(morceau)
+        # La dernière ligne peut être incomplète : la garder pour le morceau suivant
+        coupure = reste.rfind('\n') + 1
+        complet, reste = reste[:coupure], reste[coupure:]
+        yield from io.StringIO(complet, newline='')
+    reste += decodeur.decode(b'', final=True)
+    if reste:
+        yield reste
+
+
+def parser_date(valeur):
+    """Convertit une date texte (AAAA-MM-JJ ou JJ/MM/AAAA) ; None si vide, ValueError si invalide"""
+    valeur = (valeur or '').strip()
+    if not valeur:
+        return None
+    for format_date in FORMATS_DATE:
+        try:
+            return datetime.strptime(valeur, format_date).date()
+        except ValueError:
+            continue
+    raise ValueError(f"date invalide « {valeur} »")
+
+
+def _dossier_depuis_ligne_csv(ligne, utilisateur):
+    """Valide une ligne CSV et construit le DossierTraite correspondant (ValueError si invalide)"""
+    valeurs = {colonne: (ligne.get(colonne) or '').strip() for colonne in COLONNES_CSV_TEXTE}
+    if not valeurs['numero']:
+        raise ValueError("numero manquant")
+
+    dates = {}
+    for colonne in ('date_envoi', 'date_reception', 'date_avis', 'date_decision'):
+        try:
+            dates[colonne] = parser_date(ligne.get(colonne))
+        except ValueError as e:
+            raise ValueError(f"{colonne} : {e}")
+    for colonne in ('date_envoi', 'date_reception'):
+        if dates[colonne] is None:
+            raise ValueError(f"{colonne} manquante")
+
+    return DossierTraite(cree_par=utilisateur, **valeurs, **dates)
+
+
+def _inserer_lot_csv(lot, rapport, taille_lot):
+    """Ignore les numéros déjà en base (une requête par lot) puis insère le reste"""
+    existants = set(
+        DossierTraite.objects.filter(numero__in=[dossier.numero for dossier in lot]).values_list('numero', flat=True)
+    )
+    a_creer = []
+    for dossier in lot:
+        if dossier.numero in existants:
+            rapport.ignores.append((dossier._ligne, dossier.numero, 'déjà existant'))
+        else:
+            a_creer.append(dossier)
+    inserer_par_lots(a_creer, rapport, taille_lot)
+
+
+def dossiers_depuis_csv(fichier, utilisateur, rapport):
+    """
+    Lit un CSV en flux et produit (sans les enregistrer) les DossierTraite valides,
+    avec _ligne et _empreinte ; les lignes invalides sont ajoutées aux échecs du rapport.
+    Lève ErreurFormatCSV si l'en-tête est inutilisable.
+    """
+    lecteur = csv.DictReader(lignes_decodees(fichier))
+    try:
+        colonnes = lecteur.fieldnames or []
+    except UnicodeDecodeError:
+        raise ErreurFormatCSV("Le fichier CSV doit être encodé en UTF-8.")
+    manquantes = [colonne for colonne in COLONNES_CSV_REQUISES if colonne not in colonnes]
+    if manquantes:
+        raise ErreurFormatCSV(f"Le fichier CSV doit contenir les colonnes : {', '.join(COLONNES_CSV_REQUISES)}")
+
+    try:
+        for numero_ligne, ligne in enumerate(lecteur, start=2):  # La ligne 1 est l'en-tête
+            try:
+                dossier = _dossier_depuis_ligne_csv(ligne, utilisateur)
+            except ValueError as e:
+                rapport.echecs.append((numero_ligne, (ligne.get('numero') or '').strip(), str(e)))
+                continue
+            dossier._ligne = numero_ligne
+            dossier._empreinte = empreinte_valeurs((colonne, ligne.get(colonne)) for colonne in colonnes)
+            yield dossier
+    except UnicodeDecodeError:
+        rapport.echecs.append((lecteur.line_num, '', "encodage invalide (UTF-8 attendu), lecture interrompue"))
+
+
+def importer_dossiers_traites_csv(fichier, utilisateur, taille_lot=TAILLE_LOT, progression=None):
+    """
+    Importe un fichier CSV de dossiers traités en flux : lecture et décodage par morceaux,
+    validation des lignes et des dates, insertion par lots bornés.
+    progression(lignes_lues, None), si fournie, est appelée après chaque lot.
+    Retourne un RapportImport ; lève ErreurFormatCSV si le fichier est inutilisable.
+    """
+    rapport = RapportImport()
+    vus = set()
+    lot = []
+    for dossier in dossiers_depuis_csv(fichier, utilisateur, rapport):
+        if dossier.numero in vus:
+            rapport.ignores.append((dossier._ligne, dossier.numero, 'doublon dans le fichier'))
+            continue
+        vus.add(dossier.numero)
+        lot.append(dossier)
+        if len(lot) >= taille_lot:
+            _inserer_lot_csv(lot, rapport, taille_lot)
+            lot = []
+            if progression:
+                progression(rapport.nombre_importes + rapport.nombre_ignores + rapport.nombre_echecs, None)
+    if lot:
+        _inserer_lot_csv(lot, rapport, taille_lot)
+    if progression:
+        lues = rapport.nombre_importes + rapport.nombre_ignores + rapport.nombre_echecs
+        progression(lues, lues)
+    return rapport
+
+
+def enregistrer_rapport_erreurs(rapport):
+    """
+    Écrit les lignes ignorées et en échec dans un fichier CSV téléchargeable.
+    Retourne le nom du fichier (sans chemin), ou None s'il n'y a rien à signaler.
+    """
+    if not rapport.echecs and not rapport.ignores:
+        return None
+    contenu = io.StringIO()
+    writer = csv.writer(contenu)
+    writer.writerow(['ligne', 'numero', 'statut', 'message'])
+    lignes = [(ligne, numero, 'echec', message) for ligne, numero, message in rapport.echecs]
+    lignes += [(ligne, numero, 'ignore', raison) for ligne, numero, raison in rapport.ignores]
+    writer.writerows(sorted(lignes, key=lambda valeurs: valeurs[0]))
+
+    nom_fichier = f"rapport_import_{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:8]}.csv"
+    default_storage.save(f"{DOSSIER_RAPPORTS}/{nom_fichier}", ContentFile(contenu.getvalue().encode('utf-8-sig')))
+    return nom_fichier
+
+
+# --- Synchronisation du répertoire d'import automatique ---
+
+EXTENSIONS_SYNCHRONISEES = ('.csv', '.xlsx', '.xls')
+# Champs réécrits quand une ligne déjà importée par le même fichier a été modifiée
+# (les dates du fichier Excel de suivi sont fictives et ne sont donc pas reprises)
+# (les réunions du fichier sont remplacées à part par lier_reunions_importees)
+CHAMPS_SYNCHRONISES_EXCEL = ['demandeur_candidat', 'reference', 'reference_reception', 'universite', 'pays',
+                             'avis_commission']
+CHAMPS_SYNCHRONISES_CSV = [colonne for colonne in COLONNES_CSV_TEXTE if colonne != 'numero'] + [
+    'date_envoi', 'date_reception', 'date_avis', 'date_decision']
+
+
+def empreinte_fichier(chemin, taille_bloc=1024 * 1024):
+    """Empreinte SHA-256 du contenu d'un fichier, lu par blocs"""
+    empreinte = hashlib.sha256()
+    with open(chemin, 'rb') as fichier:
+        for bloc in iter(lambda: fichier.read(taille_bloc), b''):
+            empreinte.update(bloc)
+    return empreinte.hexdigest()
+
+
+def _dossiers_du_fichier(chemin, utilisateur, rapport):
+    if chemin.suffix.lower() == '.csv':
+        with open(chemin, 'rb') as fichier:
+            yield from dossiers_depuis_csv(fichier, utilisateur, rapport)
+    else:
+        yield from dossiers_depuis_feuille(normaliser_feuille(pd.read_excel(chemin, header=None)), utilisateur)
+
+
+def _mettre_a_jour_par_lots(objets, champs, rapport, taille_lot):
+    """bulk_update des dossiers modifiés, avec repli ligne par ligne si le lot est refusé"""
+    try:
+        with transaction.atomic():
+            DossierTraite.objects.bulk_update(objets, champs, batch_size=taille_lot)
+        mis_a_jour = objets
+    except DatabaseError:
+        mis_a_jour = []
+        for dossier in objets:
+            try:
+                with transaction.atomic():
+                    dossier.save(update_fields=champs)
+                mis_a_jour.append(dossier)
+            except DatabaseError as e:
+                rapport.echecs.append((dossier._ligne, dossier.numero, str(e)))
+    rapport.mis_a_jour.extend(dossier.numero for dossier in mis_a_jour)
+    lier_reunions_importees(mis_a_jour)
+    recherche.indexer_dossiers_traites([dossier.id for dossier in mis_a_jour])
+    return mis_a_jour
+
+
+def _synchroniser_lot(lot, lignes_connues, champs, rapport, empreintes, taille_lot):
+    """
+    Un lot de lignes nouvelles ou modifiées : les numéros absents de la base sont créés,
+    ceux déjà importés par ce fichier sont mis à jour, les autres (saisis ailleurs) sont ignorés.
+    """
+    existants = {
+        dossier.numero: dossier
+        for dossier in DossierTraite.objects.filter(numero__in=[dossier.numero for dossier in lot]).only('id', 'numero', *champs)
+    }
+    a_creer, a_modifier = [], []
+    for dossier in lot:
+        existant = existants.get(dossier.numero)
+        if existant is None:
+            a_creer.append(dossier)
+        elif dossier.numero in lignes_connues:
+            for champ in champs:
+                setattr(existant, champ, getattr(dossier, champ))
+            if hasattr(dossier, '_reunions'):
+                existant._reunions = dossier._reunions
+            existant._ligne, existant._empreinte = dossier._ligne, dossier._empreinte
+            a_modifier.append(existant)
+        else:
+            rapport.ignores.append((dossier._ligne, dossier.numero, 'déjà existant (hors de ce fichier)'))
+
+    deja_importes = rapport.nombre_importes
+    inserer_par_lots(a_creer, rapport, taille_lot)
+    importes = set(rapport.importes[deja_importes:])
+    for dossier in a_creer:
+        if dossier.numero in importes:
+            empreintes[dossier.numero] = dossier._empreinte
+    for dossier in _mettre_a_jour_par_lots(a_modifier, champs, rapport, taille_lot):
+        empreintes[dossier.numero] = dossier._empreinte
+
+
+def synchroniser_fichier(chemin, utilisateur, taille_lot=TAILLE_LOT):
+    """
+    Synchronise un fichier déposé dans le répertoire d'import automatique.
+    Le fichier est ignoré si son contenu n'a pas changé (taille et date, puis empreinte SHA-256) ;
+    sinon seules les lignes nouvelles ou modifiées depuis le dernier passage sont importées
+    ou mises à jour, et le point de reprise du fichier est enregistré dans la même transaction.
+    Retourne le RapportImport, ou None si le fichier est inchangé.
+    """
+    chemin = Path(chemin).resolve()
+    etat = chemin.stat()
+    point = FichierImporte.objects.filter(chemin=str(chemin)).first()
+    if point and point.taille == etat.st_size and point.date_modification_fichier == etat.st_mtime:
+        return None
+    empreinte = empreinte_fichier(chemin)
+    if point and point.empreinte == empreinte:
+        # Fichier recopié ou touché sans changement de contenu
+        point.date_modification_fichier = etat.st_mtime
+        point.save(update_fields=['date_modification_fichier', 'date_synchronisation'])
+        return None
+
+    champs = CHAMPS_SYNCHRONISES_CSV if chemin.suffix.lower() == '.csv' else CHAMPS_SYNCHRONISES_EXCEL
+    rapport = RapportImport()
+    empreintes = {}
+    inchanges = 0
+    vus = set()
+    lot = []
+    with transaction.atomic():
+        # Relire le point de reprise verrouillé : deux synchronisations du même fichier ne se chevauchent pas
+        point = FichierImporte.objects.select_for_update().filter(chemin=str(chemin)).first()
+        if point and point.empreinte == empreinte:
+            return None
+        lignes_connues = point.lignes if point else {}
+        for dossier in _dossiers_du_fichier(chemin, utilisateur, rapport):
+            if dossier.numero in vus:
+                rapport.ignores.append((dossier._ligne, dossier.numero, 'doublon dans le fichier'))
+                continue
+            vus.add(dossier.numero)
+            if lignes_connues.get(dossier.numero) == dossier._empreinte:
+                empreintes[dossier.numero] = dossier._empreinte
+                inchanges += 1
+                continue
+            lot.append(dossier)
+            if len(lot) >= taille_lot:
+                _synchroniser_lot(lot, lignes_connues, champs, rapport, empreintes, taille_lot)
+                lot = []
+        if lot:
+            _synchroniser_lot(lot, lignes_connues, champs, rapport, empreintes, taille_lot)
+
+        # Une ligne déjà importée dont la mise à jour échoue reste rattachée au fichier
+        for _, numero, _ in rapport.echecs:
+            if numero in lignes_connues and numero not in empreintes:
+                empreintes[numero] = lignes_connues[numero]
+
+        FichierImporte.objects.update_or_create(
+            chemin=str(chemin),
+            defaults={
+                'empreinte': empreinte,
+                'taille': etat.st_size,
+                'date_modification_fichier': etat.st_mtime,
+                'lignes': empreintes,
+                'dernier_resultat': {
+                    'importes': rapport.nombre_importes,
+                    'mis_a_jour': len(rapport.mis_a_jour),
+                    'inchanges': inchanges,
+                    'ignores': rapport.nombre_ignores,
+                    'echecs': rapport.nombre_echecs,
+                },
+            }
+        )
+    rapport.inchanges = inchanges
+    return rapport
+
+
+def fichiers_a_synchroniser(repertoire):
+    """Fichiers CSV et Excel du répertoire (hors fichiers cachés et verrous d'Office), triés par nom"""
+    return sorted(
+        chemin for chemin in Path(repertoire).iterdir()
+        if chemin.is_file()
+        and chemin.suffix.lower() in EXTENSIONS_SYNCHRONISEES
+        and not chemin.name.startswith(('.', '~$'))
+    )
+
+
+def synchroniser_repertoire(repertoire, utilisateur, progression=None):
+    """
+    Synchronise tous les fichiers du répertoire d'import automatique.
+    progression(fichiers_traités, total), si fournie, est appelée après chaque fichier.
+    Retourne une liste de dictionnaires : fichier, statut (inchange, synchronise, erreur), rapport ou message.
+    """
+    if not os.path.isdir(repertoire):
+        raise FileNotFoundError(f"Répertoire d'import introuvable : {repertoire}")
+    fichiers = fichiers_a_synchroniser(repertoire)
+    resultats = []
+    for index, chemin in enumerate(fichiers, start=1):
+        try:
+            rapport = synchroniser_fichier(chemin, utilisateur)
+        except (ErreurFormatCSV, ValueError, OSError) as e:
+            resultats.append({'fichier': chemin.name, 'statut': 'erreur', 'message': str(e)})
+        else:
+            if rapport is None:
+                resultats.append({'fichier': chemin.name, 'statut': 'inchange'})
+            else:
+                resultats.append({
+                    'fichier': chemin.name,
+                    'statut': 'synchronise',
+                    'importes': rapport.nombre_importes,
+                    'mis_a_jour': len(rapport.mis_a_jour),
+                    'inchanges': rapport.inchanges,
+                    'ignores': rapport.nombre_ignores,
+                    'echecs': rapport.nombre_echecs,
+                })
+        if progression:
+            progression(index, len(fichiers))
+    return resultats
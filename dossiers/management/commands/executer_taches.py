@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dossiers.taches import executer_taches_en_attente
+
+class Command(BaseCommand):
+    help = 'Exécute les tâches en arrière-plan en attente (imports, exports, PDF)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2, help='Nombre de tâches exécutées en parallèle')
+        parser.add_argument('--intervalle', type=float, default=2.0, help='Secondes entre deux interrogations de la file')
+        parser.add_argument('--une-fois', action='store_true', help='Vider la file puis s\'arrêter')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"Worker démarré ({options['threads']} thread(s))"))
+        try:
+            while True:
+                nombre = executer_taches_en_attente(nombre_threads=options['threads'], limite=options['threads'] * 10)
+                if nombre:
+                    self.stdout.write(f'{nombre} tâche(s) exécutée(s)')
+                elif options['une_fois']:
+                    break
+                else:
+                    time.sleep(options['intervalle'])
+        except KeyboardInterrupt:
+            self.stdout.write('Arrêt du worker')
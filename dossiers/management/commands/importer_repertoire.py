@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from dossiers.importation import synchroniser_repertoire
+from users.models import CustomUser
+
+class Command(BaseCommand):
+    help = 'Synchronise les fichiers CSV et Excel du répertoire d\'import automatique (seules les lignes nouvelles ou modifiées sont traitées)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repertoire', default=str(settings.IMPORT_AUTO_REPERTOIRE), help='Répertoire à synchroniser')
+        parser.add_argument('--utilisateur', help='Nom d\'utilisateur enregistré comme créateur (par défaut : le premier administrateur)')
+
+    def handle(self, *args, **options):
+        if options['utilisateur']:
+            utilisateur = CustomUser.objects.filter(username=options['utilisateur']).first()
+        else:
+            utilisateur = CustomUser.objects.filter(role='admin').order_by('id').first()
+        if utilisateur is None:
+            raise CommandError('Aucun utilisateur trouvé pour enregistrer les dossiers importés')
+
+        try:
+            resultats = synchroniser_repertoire(options['repertoire'], utilisateur)
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+
+        for resultat in resultats:
+            if resultat['statut'] == 'inchange':
+                self.stdout.write(f"{resultat['fichier']} : inchangé")
+            elif resultat['statut'] == 'erreur':
+                self.stdout.write(self.style.ERROR(f"{resultat['fichier']} : {resultat['message']}"))
+            else:
+                self.stdout.write(
+                    f"{resultat['fichier']} : {resultat['importes']} importé(s), {resultat['mis_a_jour']} mis à jour, "
+                    f"{resultat['inchanges']} inchangé(s), {resultat['ignores']} ignoré(s), {resultat['echecs']} en erreur"
+                )
+        self.stdout.write(self.style.SUCCESS(f'{len(resultats)} fichier(s) examiné(s)'))
@@ -0,0 +1,72 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from dossiers.fichiers import type_mime
+from dossiers.models import PieceJointe
+from dossiers.pieces_jointes import compter_pages, empreinte_contenu, generer_apercu
+
+
+def _generer_apercu(piece_id):
+    try:
+        return generer_apercu(piece_id)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Calcule empreinte et métadonnées des pièces jointes existantes, fusionne les copies identiques et génère les aperçus manquants'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2, help='Nombre d\'aperçus générés en parallèle')
+        parser.add_argument('--conserver-doublons', action='store_true', help='Ne pas supprimer les copies devenues inutiles')
+
+    def handle(self, *args, **options):
+        # Copie de référence par contenu, à partir des pièces déjà ingérées
+        copies = {}
+        for empreinte, nom in PieceJointe.objects.exclude(empreinte='').order_by('id').values_list('empreinte', 'fichier'):
+            copies.setdefault(empreinte, nom)
+
+        traitees = manquantes = fusionnees = 0
+        remplacees = set()
+        for piece in PieceJointe.objects.filter(empreinte='').exclude(fichier='').iterator(chunk_size=200):
+            if not default_storage.exists(piece.fichier.name):
+                manquantes += 1
+                continue
+            with piece.fichier.open('rb') as fichier:
+                piece.empreinte = empreinte_contenu(fichier)
+            piece.nom_original = piece.nom_original or os.path.basename(piece.fichier.name)
+            piece.taille = piece.fichier.size
+
+            copie = copies.setdefault(piece.empreinte, piece.fichier.name)
+            if copie != piece.fichier.name:
+                remplacees.add(piece.fichier.name)
+                piece.fichier.name = copie
+                fusionnees += 1
+            piece.type_mime = type_mime(piece.nom_original)
+            piece.nombre_pages = compter_pages(piece.fichier.path, piece.type_mime)
+            piece.save(update_fields=['empreinte', 'nom_original', 'taille', 'fichier', 'type_mime', 'nombre_pages'])
+            traitees += 1
+
+        # Supprimer les copies qui ne sont plus référencées par aucune pièce
+        supprimees = 0
+        if not options['conserver_doublons']:
+            encore_utilisees = set(PieceJointe.objects.filter(fichier__in=remplacees).values_list('fichier', flat=True))
+            for nom in remplacees - encore_utilisees:
+                default_storage.delete(nom)
+                supprimees += 1
+
+        # Un aperçu par contenu suffit : il est ensuite partagé par toutes les pièces de même empreinte
+        a_generer = {}
+        for piece_id, empreinte in PieceJointe.objects.filter(apercu='').exclude(empreinte='').values_list('id', 'empreinte'):
+            a_generer.setdefault(empreinte, piece_id)
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            apercus = sum(1 for nom in pool.map(_generer_apercu, a_generer.values()) if nom)
+
+        self.stdout.write(f'{traitees} pièce(s) traitée(s), {fusionnees} fusionnée(s) avec une copie identique, {supprimees} copie(s) supprimée(s)')
+        if manquantes:
+            self.stdout.write(self.style.WARNING(f'{manquantes} pièce(s) dont le fichier est introuvable'))
+        self.stdout.write(self.style.SUCCESS(f'{apercus} aperçu(s) généré(s) sur {len(a_generer)} contenu(s) sans aperçu'))
@@ -0,0 +1,61 @@
+import unicodedata
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from dossiers.models import Candidat, ConsistanceAcademique, Dossier, DossierTraite
+
+
+def _normaliser(nom):
+    """Nom comparable : sans accents, en minuscules, espaces réduits"""
+    sans_accents = unicodedata.normalize('NFKD', nom or '').encode('ascii', 'ignore').decode()
+    return ' '.join(sans_accents.lower().split())
+
+
+class Command(BaseCommand):
+    help = 'Relie les dossiers traités sans dossier d\'origine à leur dossier (titre = numéro, sinon nom du candidat identique et sans ambiguïté)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--simulation', action='store_true', help='Afficher les correspondances sans rien enregistrer')
+
+    def handle(self, *args, **options):
+        # Dossiers candidats, les plus pertinents d'abord : évalués (consistance) puis les plus récents
+        dossiers = Dossier.objects.annotate(
+            evalue=Exists(ConsistanceAcademique.objects.filter(candidat__dossier=OuterRef('pk')))
+        ).order_by('-evalue', '-id').values_list('id', 'titre')
+        par_titre = {}
+        for dossier_id, titre in dossiers:
+            par_titre.setdefault(titre, dossier_id)
+
+        par_nom = defaultdict(set)
+        for dossier_id, nom in Candidat.objects.values_list('dossier_id', 'nom'):
+            if _normaliser(nom):
+                par_nom[_normaliser(nom)].add(dossier_id)
+
+        a_relier = []
+        ambigus = []
+        for dossier_traite in DossierTraite.objects.filter(dossier__isnull=True).only('id', 'numero', 'demandeur_candidat'):
+            dossier_id = par_titre.get(dossier_traite.numero)
+            if dossier_id is None:
+                correspondances = par_nom.get(_normaliser(dossier_traite.demandeur_candidat), set())
+                if len(correspondances) == 1:
+                    dossier_id = next(iter(correspondances))
+                elif correspondances:
+                    ambigus.append(dossier_traite)
+                    continue
+            if dossier_id is not None:
+                dossier_traite.dossier_id = dossier_id
+                a_relier.append(dossier_traite)
+
+        if options['verbosity'] >= 2:
+            for dossier_traite in a_relier:
+                self.stdout.write(f'{dossier_traite} -> dossier {dossier_traite.dossier_id}')
+        for dossier_traite in ambigus:
+            self.stdout.write(self.style.WARNING(f'{dossier_traite} : plusieurs candidats portent ce nom, non relié'))
+
+        if options['simulation']:
+            self.stdout.write(self.style.WARNING(f'Simulation : {len(a_relier)} dossier(s) traité(s) seraient relié(s), rien n\'a été enregistré'))
+            return
+        DossierTraite.objects.bulk_update(a_relier, ['dossier'], batch_size=500)
+        self.stdout.write(self.style.SUCCESS(f'{len(a_relier)} dossier(s) traité(s) relié(s) à leur dossier d\'origine, {len(ambigus)} ambigu(s)'))
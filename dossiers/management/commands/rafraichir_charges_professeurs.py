@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from dossiers.models import ChargeProfesseur
+
+class Command(BaseCommand):
+    help = 'Recalcule la charge de travail dénormalisée de tous les professeurs'
+
+    def handle(self, *args, **options):
+        nombre = ChargeProfesseur.recalculer()
+        self.stdout.write(
+            self.style.SUCCESS(f'Charge de travail recalculée pour {nombre} professeur(s)')
+        )
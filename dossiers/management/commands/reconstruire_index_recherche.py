@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from dossiers.recherche import index_disponible, reconstruire_index
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des dossiers et des dossiers traités"
+
+    def handle(self, *args, **options):
+        if not index_disponible():
+            self.stdout.write(
+                self.style.WARNING("Index plein texte indisponible sur ce moteur de base de données (recherche icontains utilisée)")
+            )
+            return
+        nombre_dossiers, nombre_traites = reconstruire_index()
+        self.stdout.write(
+            self.style.SUCCESS(f'Index reconstruit : {nombre_dossiers} dossier(s), {nombre_traites} dossier(s) traité(s)')
+        )
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dossiers.models import ConsistanceAcademique
+from dossiers.notation import TAILLE_LOT, rescorer_consistances
+
+
+class Command(BaseCommand):
+    help = 'Recalcule notes, critères obligatoires et interprétations de toutes les consistances avec le barème de la structure active'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--simulation', action='store_true', help='Afficher les changements sans rien enregistrer')
+        parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT, help='Nombre de consistances lues et évaluées par lot')
+        parser.add_argument('--processus', type=int, default=1, help='Nombre de processus pour évaluer les lots (1 : dans ce processus)')
+        parser.add_argument('--candidats', type=int, nargs='+', help='Limiter le recalcul à ces candidats (id)')
+
+    def handle(self, *args, **options):
+        queryset = ConsistanceAcademique.objects.all()
+        if options['candidats']:
+            queryset = queryset.filter(candidat_id__in=options['candidats'])
+
+        debut = time.monotonic()
+        nombre, modifiees, decisions, changements = rescorer_consistances(
+            queryset,
+            simulation=options['simulation'],
+            taille_lot=options['taille_lot'],
+            processus=options['processus'],
+        )
+        duree = time.monotonic() - debut
+
+        niveaux = dict(ConsistanceAcademique.NIVEAUX_INTERPRETATION)
+        for changement in changements:
+            self.stdout.write(
+                f"{changement.candidat} (candidat {changement.candidat_id}) : "
+                f"{changement.ancien_score:g} -> {changement.nouveau_score:g}, "
+                f"{niveaux.get(changement.ancien_niveau, changement.ancien_niveau)} -> {niveaux[changement.nouveau_niveau]}"
+            )
+
+        if options['simulation']:
+            self.stdout.write(self.style.WARNING(
+                f'Simulation : {nombre} consistance(s) évaluée(s) en {duree:.2f} s, '
+                f'{len(changements)} changement(s) de niveau, rien n\'a été enregistré'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'{nombre} consistance(s) évaluée(s) en {duree:.2f} s : {modifiees} mise(s) à jour, '
+                f'{decisions} note(s) de décision corrigée(s), {len(changements)} changement(s) de niveau'
+            ))
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def initialiser_charges(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    ChargeProfesseur = apps.get_model('dossiers', 'ChargeProfesseur')
+
+    comptes = CustomUser.objects.filter(role='professeur').annotate(
+        nb_assignes=Count('dossiers_attribues'),
+        nb_en_cours=Count('dossiers_attribues', filter=Q(dossiers_attribues__statut='en_cours')),
+        nb_traites=Count('dossiers_attribues', filter=Q(dossiers_attribues__statut='traite')),
+    ).values_list('id', 'nb_assignes', 'nb_en_cours', 'nb_traites')
+
+    ChargeProfesseur.objects.bulk_create([
+        ChargeProfesseur(
+            professeur_id=professeur_id,
+            dossiers_assignes=assignes,
+            dossiers_en_cours=en_cours,
+            dossiers_traites=traites,
+            taux_traitement=round(traites / assignes * 100, 1) if assignes > 0 else 0,
+        )
+        for professeur_id, assignes, en_cours, traites in comptes
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dossiers', '0026_update_decision_choices'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChargeProfesseur',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dossiers_assignes', models.IntegerField(default=0, verbose_name='Dossiers assignés')),
+                ('dossiers_en_cours', models.IntegerField(default=0, verbose_name='Dossiers en cours')),
+                ('dossiers_traites', models.IntegerField(default=0, verbose_name='Dossiers traités')),
+                ('taux_traitement', models.FloatField(default=0, verbose_name='Taux de traitement (%)')),
+                ('date_mise_a_jour', models.DateTimeField(auto_now=True)),
+                ('professeur', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='charge_travail', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Charge de travail professeur',
+                'verbose_name_plural': 'Charges de travail professeurs',
+            },
+        ),
+        migrations.RunPython(initialiser_charges, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,64 @@
+from django.db import migrations
+
+
+TABLE_DOSSIERS = 'dossiers_recherche_dossier'
+TABLE_DOSSIERS_TRAITES = 'dossiers_recherche_dossier_traite'
+
+
+def creer_index_recherche(apps, schema_editor):
+    # L'index FTS5 n'existe que sur SQLite (les autres moteurs utilisent les filtres icontains)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    DossierTraite = apps.get_model('dossiers', 'DossierTraite')
+    libelles_pays = dict(DossierTraite._meta.get_field('pays').choices)
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE_DOSSIERS} "
+            f"USING fts5(titre, description, candidat, pays, tokenize='unicode61 remove_diacritics 2')"
+        )
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE_DOSSIERS_TRAITES} "
+            f"USING fts5(numero, demandeur, reference, diplome, pays, avis_commission, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+        # Indexer l'existant
+        cursor.execute(
+            f"INSERT INTO {TABLE_DOSSIERS} (rowid, titre, description, candidat, pays) "
+            f"SELECT d.id, d.titre, d.description, COALESCE(c.nom, ''), COALESCE(c.pays_origine, '') "
+            f"FROM dossiers_dossier d LEFT JOIN dossiers_candidat c ON c.dossier_id = d.id"
+        )
+        cursor.executemany(
+            f"INSERT INTO {TABLE_DOSSIERS_TRAITES} (rowid, numero, demandeur, reference, diplome, pays, avis_commission) "
+            f"VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            [
+                (
+                    dt['id'], dt['numero'], dt['demandeur_candidat'], dt['reference'], dt['diplome'],
+                    ' '.join(filter(None, [dt['pays'], libelles_pays.get(dt['pays'], ''), dt['pays_autre']])),
+                    dt['avis_commission'],
+                )
+                for dt in DossierTraite.objects.values(
+                    'id', 'numero', 'demandeur_candidat', 'reference', 'diplome', 'pays', 'pays_autre', 'avis_commission'
+                ).iterator()
+            ]
+        )
+
+
+def supprimer_index_recherche(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE_DOSSIERS}")
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE_DOSSIERS_TRAITES}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dossiers', '0028_notification_index_curseur'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_index_recherche, supprimer_index_recherche),
+    ]
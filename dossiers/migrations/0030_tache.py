@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dossiers', '0029_index_recherche_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_tache', models.CharField(choices=[('import_excel', 'Import Excel des dossiers traités'), ('import_csv', 'Import CSV des dossiers traités'), ('export_excel', 'Export Excel des dossiers traités'), ('pdf_evaluation', "PDF d'évaluation")], max_length=30, verbose_name='Type de tâche')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('terminee', 'Terminée'), ('echec', 'Échec')], default='en_attente', max_length=20, verbose_name='Statut')),
+                ('parametres', models.JSONField(blank=True, default=dict, verbose_name='Paramètres')),
+                ('fichier_entree', models.FileField(blank=True, upload_to='taches/entrees/', verbose_name="Fichier d'entrée")),
+                ('fichier_resultat', models.FileField(blank=True, upload_to='taches/resultats/', verbose_name='Fichier résultat')),
+                ('resultat', models.JSONField(blank=True, default=dict, verbose_name='Résultat')),
+                ('progression', models.PositiveIntegerField(default=0, verbose_name='Lignes traitées')),
+                ('total', models.PositiveIntegerField(blank=True, null=True, verbose_name='Total de lignes')),
+                ('message', models.TextField(blank=True, verbose_name='Message')),
+                ('date_creation', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('date_debut', models.DateTimeField(blank=True, null=True, verbose_name='Date de début')),
+                ('date_fin', models.DateTimeField(blank=True, null=True, verbose_name='Date de fin')),
+                ('cree_par', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='taches', to=settings.AUTH_USER_MODEL, verbose_name='Créée par')),
+            ],
+            options={
+                'verbose_name': 'Tâche',
+                'verbose_name_plural': 'Tâches',
+                'ordering': ['-date_creation'],
+                'indexes': [models.Index(fields=['statut', 'date_creation'], name='tache_statut_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dossiers', '0030_tache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FichierImporte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chemin', models.CharField(max_length=500, unique=True, verbose_name='Chemin du fichier')),
+                ('empreinte', models.CharField(max_length=64, verbose_name='Empreinte SHA-256 du contenu')),
+                ('taille', models.PositiveBigIntegerField(default=0, verbose_name='Taille (octets)')),
+                ('date_modification_fichier', models.FloatField(default=0, verbose_name='Date de modification du fichier (mtime)')),
+                ('lignes', models.JSONField(blank=True, default=dict, verbose_name='Empreintes des lignes')),
+                ('dernier_resultat', models.JSONField(blank=True, default=dict, verbose_name='Résultat de la dernière synchronisation')),
+                ('date_premier_import', models.DateTimeField(auto_now_add=True, verbose_name='Premier import')),
+                ('date_synchronisation', models.DateTimeField(auto_now=True, verbose_name='Dernière synchronisation')),
+            ],
+            options={
+                'verbose_name': 'Fichier importé',
+                'verbose_name_plural': 'Fichiers importés',
+                'ordering': ['chemin'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='tache',
+            name='type_tache',
+            field=models.CharField(choices=[('import_excel', 'Import Excel des dossiers traités'), ('import_csv', 'Import CSV des dossiers traités'), ('export_excel', 'Export Excel des dossiers traités'), ('pdf_evaluation', "PDF d'évaluation"), ('import_repertoire', "Synchronisation du répertoire d'import")], max_length=30, verbose_name='Type de tâche'),
+        ),
+    ]
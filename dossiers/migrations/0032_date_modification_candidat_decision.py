@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dossiers', '0031_fichier_importe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='candidat',
+            name='date_modification',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='decisioncommission',
+            name='date_modification',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='tache',
+            name='type_tache',
+            field=models.CharField(choices=[('import_excel', 'Import Excel des dossiers traités'), ('import_csv', 'Import CSV des dossiers traités'), ('export_excel', 'Export Excel des dossiers traités'), ('pdf_evaluation', "PDF d'évaluation"), ('import_repertoire', "Synchronisation du répertoire d'import"), ('pdf_evaluation_lot', "PDF d'évaluation d'une réunion (ZIP)")], max_length=30, verbose_name='Type de tâche'),
+        ),
+    ]
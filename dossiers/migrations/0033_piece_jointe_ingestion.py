@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dossiers', '0032_date_modification_candidat_decision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='piecejointe',
+            name='apercu',
+            field=models.FileField(blank=True, upload_to='pieces_jointes/apercus/'),
+        ),
+        migrations.AddField(
+            model_name='piecejointe',
+            name='empreinte',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='piecejointe',
+            name='nom_original',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='piecejointe',
+            name='nombre_pages',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='piecejointe',
+            name='taille',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='piecejointe',
+            name='type_mime',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
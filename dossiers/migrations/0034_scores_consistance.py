@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:47
+
+from django.db import migrations, models
+
+
+# Règles en vigueur lors de la migration : (champ, libellé, note maximale, obligatoire)
+CRITERES_FIXES = [
+    ('sciences_geodesiques_note', 'Sciences géodésiques', 16, True),
+    ('topographie_note', 'Topographie', 16, True),
+    ('photogrammetrie_note', 'Photogrammétrie', 16, True),
+    ('cartographie_note', 'Cartographie', 16, True),
+    ('droit_foncier_note', 'Droit foncier', 10, True),
+    ('sig_note', 'SIG', 10, False),
+    ('teledetection_note', 'Télédétection', 10, False),
+    ('stages_note', 'Stages', 10, False),
+]
+
+
+def _nombre(valeur):
+    try:
+        return float(valeur) if valeur is not None else None
+    except (ValueError, TypeError):
+        return None
+
+
+def calculer_scores(apps, schema_editor):
+    ConsistanceAcademique = apps.get_model('dossiers', 'ConsistanceAcademique')
+
+    consistances = list(ConsistanceAcademique.objects.all())
+    for consistance in consistances:
+        total = 0
+        non_acquis = []
+        for champ, libelle, note_max, obligatoire in CRITERES_FIXES:
+            note = _nombre(getattr(consistance, champ))
+            if note is None:
+                continue
+            total += note
+            if obligatoire and note < note_max * 0.5:
+                non_acquis.append(libelle)
+        for critere in consistance.criteres_personnalises or []:
+            note = _nombre(critere.get('note'))
+            if note is not None:
+                total += note
+
+        consistance.score_total = total
+        consistance.criteres_non_acquis = non_acquis
+        consistance.criteres_obligatoires_acquis = not non_acquis
+        if non_acquis:
+            consistance.niveau_interpretation = 'insuffisant_obligatoire'
+        elif total >= 76:
+            consistance.niveau_interpretation = 'excellence'
+        elif total >= 50:
+            consistance.niveau_interpretation = 'solide'
+        else:
+            consistance.niveau_interpretation = 'insuffisant'
+
+    ConsistanceAcademique.objects.bulk_update(
+        consistances,
+        ['score_total', 'criteres_obligatoires_acquis', 'niveau_interpretation', 'criteres_non_acquis'],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dossiers', '0033_piece_jointe_ingestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consistanceacademique',
+            name='criteres_non_acquis',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='Critères obligatoires non acquis'),
+        ),
+        migrations.AddField(
+            model_name='consistanceacademique',
+            name='criteres_obligatoires_acquis',
+            field=models.BooleanField(db_index=True, default=True, editable=False, verbose_name='Critères obligatoires acquis'),
+        ),
+        migrations.AddField(
+            model_name='consistanceacademique',
+            name='niveau_interpretation',
+            field=models.CharField(choices=[('excellence', 'Formation validée avec excellence'), ('solide', 'Formation solide'), ('insuffisant', 'Formation insuffisante'), ('insuffisant_obligatoire', 'Formation insuffisante - Critères obligatoires non acquis')], db_index=True, default='insuffisant', editable=False, max_length=30, verbose_name='Interprétation'),
+        ),
+        migrations.AddField(
+            model_name='consistanceacademique',
+            name='score_total',
+            field=models.FloatField(db_index=True, default=0, editable=False, verbose_name='Note totale'),
+        ),
+        migrations.RunPython(calculer_scores, migrations.RunPython.noop),
+    ]
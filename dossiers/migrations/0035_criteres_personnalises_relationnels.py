@@ -0,0 +1,133 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _nombre(valeur):
+    try:
+        return float(valeur) if valeur is not None else None
+    except (ValueError, TypeError):
+        return None
+
+
+def remplir_depuis_json(apps, schema_editor):
+    StructureEvaluationGlobale = apps.get_model('dossiers', 'StructureEvaluationGlobale')
+    ConsistanceAcademique = apps.get_model('dossiers', 'ConsistanceAcademique')
+    CriterePersonnalise = apps.get_model('dossiers', 'CriterePersonnalise')
+    NoteCritere = apps.get_model('dossiers', 'NoteCritere')
+    CompetenceCochee = apps.get_model('dossiers', 'CompetenceCochee')
+
+    criteres = []
+    for structure in StructureEvaluationGlobale.objects.all():
+        identifiants = set()
+        for ordre, donnees in enumerate(structure.criteres_personnalises_globaux or []):
+            identifiant = donnees.get('id')
+            if not isinstance(identifiant, int) or identifiant in identifiants:
+                continue
+            identifiants.add(identifiant)
+            criteres.append(CriterePersonnalise(
+                structure=structure,
+                identifiant=identifiant,
+                nom=(donnees.get('nom') or '')[:255],
+                note_max=_nombre(donnees.get('note_max')),
+                ordre=ordre,
+            ))
+    CriterePersonnalise.objects.bulk_create(criteres)
+
+    # Les notes sont rattachées aux critères de même nom de la structure active
+    active = (
+        StructureEvaluationGlobale.objects.filter(actif=True).order_by('-date_creation').first()
+        or StructureEvaluationGlobale.objects.order_by('pk').first()
+    )
+    globaux = {}
+    if active is not None:
+        globaux = {critere.nom: critere for critere in CriterePersonnalise.objects.filter(structure=active)}
+
+    for consistance in ConsistanceAcademique.objects.exclude(criteres_personnalises=[]).iterator(chunk_size=500):
+        competences = []
+        for donnees in consistance.criteres_personnalises or []:
+            nom = (donnees.get('nom') or '')[:255]
+            note_critere = NoteCritere.objects.create(
+                consistance=consistance,
+                critere=globaux.get(nom),
+                identifiant=donnees.get('id') if isinstance(donnees.get('id'), int) else 0,
+                nom=nom,
+                note_max=_nombre(donnees.get('note_max')),
+                note=_nombre(donnees.get('note')),
+            )
+            libelles = donnees.get('competences') or []
+            for index in donnees.get('competences_cochees') or []:
+                if isinstance(index, int) and 0 <= index < len(libelles):
+                    competences.append(CompetenceCochee(
+                        consistance=consistance, note_critere=note_critere, competence=str(libelles[index])[:255]
+                    ))
+        CompetenceCochee.objects.bulk_create(competences)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dossiers', '0034_scores_consistance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CriterePersonnalise',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('identifiant', models.IntegerField(verbose_name='Identifiant dans la structure')),
+                ('nom', models.CharField(db_index=True, max_length=255)),
+                ('note_max', models.FloatField(blank=True, null=True)),
+                ('ordre', models.IntegerField(default=0)),
+                ('structure', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='criteres_personnalises', to='dossiers.structureevaluationglobale')),
+            ],
+            options={
+                'verbose_name': 'Critère personnalisé',
+                'verbose_name_plural': 'Critères personnalisés',
+                'ordering': ['structure', 'ordre'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NoteCritere',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('identifiant', models.IntegerField(verbose_name='Identifiant dans la consistance')),
+                ('nom', models.CharField(max_length=255)),
+                ('note_max', models.FloatField(blank=True, null=True)),
+                ('note', models.FloatField(blank=True, null=True)),
+                ('consistance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notes_criteres', to='dossiers.consistanceacademique')),
+                ('critere', models.ForeignKey(blank=True, help_text='Critère global de même nom dans la structure active', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notes', to='dossiers.criterepersonnalise')),
+            ],
+            options={
+                'verbose_name': 'Note de critère personnalisé',
+                'verbose_name_plural': 'Notes de critères personnalisés',
+            },
+        ),
+        migrations.CreateModel(
+            name='CompetenceCochee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('competence', models.CharField(db_index=True, max_length=255)),
+                ('consistance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='competences_cochees', to='dossiers.consistanceacademique')),
+                ('note_critere', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='competences_cochees', to='dossiers.notecritere')),
+            ],
+            options={
+                'verbose_name': 'Compétence cochée',
+                'verbose_name_plural': 'Compétences cochées',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='criterepersonnalise',
+            constraint=models.UniqueConstraint(fields=('structure', 'identifiant'), name='critere_perso_structure_id_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='notecritere',
+            index=models.Index(fields=['nom', 'note'], name='note_critere_nom_note_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notecritere',
+            index=models.Index(fields=['critere', 'note'], name='note_critere_critere_note_idx'),
+        ),
+        migrations.RunPython(remplir_depuis_json, migrations.RunPython.noop),
+    ]
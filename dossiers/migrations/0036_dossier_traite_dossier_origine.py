@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dossiers', '0035_criteres_personnalises_relationnels'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dossiertraite',
+            name='dossier',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='dossiers_traites', to='dossiers.dossier', verbose_name="Dossier d'origine"),
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:59
+
+import re
+
+from django.db import migrations, models
+
+
+# Libellés écrits dans avis_commission par valider_et_transferer_dossier : « Topographie: 12/16, ... »
+LIBELLES_NOTES = [
+    ('sciences_geodesiques_note', 'Sciences géodésiques'),
+    ('topographie_note', 'Topographie'),
+    ('photogrammetrie_note', 'Photogrammétrie'),
+    ('cartographie_note', 'Cartographie'),
+    ('droit_foncier_note', 'Droit foncier'),
+    ('sig_note', 'SIG'),
+    ('teledetection_note', 'Télédétection'),
+    ('stages_note', 'Stages'),
+]
+NOMBRE = r'(\d+(?:[.,]\d+)?)'
+MOTIFS_NOTES = [
+    (champ, re.compile(rf'(?<!\w){re.escape(libelle)}\s*:\s*{NOMBRE}\s*/\s*\d+', re.IGNORECASE))
+    for champ, libelle in LIBELLES_NOTES
+]
+MOTIF_SCORE = re.compile(rf'Score total\s*:\s*{NOMBRE}\s*/\s*100', re.IGNORECASE)
+
+
+def _nombre(texte):
+    return float(texte.replace(',', '.'))
+
+
+def extraire_notes(apps, schema_editor):
+    DossierTraite = apps.get_model('dossiers', 'DossierTraite')
+
+    dossiers = []
+    for dossier in DossierTraite.objects.exclude(avis_commission='').only('id', 'avis_commission'):
+        notes = {}
+        for champ, motif in MOTIFS_NOTES:
+            correspondance = motif.search(dossier.avis_commission)
+            if correspondance:
+                notes[champ] = int(_nombre(correspondance.group(1)))
+        score = MOTIF_SCORE.search(dossier.avis_commission)
+        if not notes and not score:
+            continue
+        for champ, note in notes.items():
+            setattr(dossier, champ, note)
+        dossier.score_total = _nombre(score.group(1)) if score else float(sum(notes.values()))
+        dossiers.append(dossier)
+
+    DossierTraite.objects.bulk_update(dossiers, [champ for champ, _ in LIBELLES_NOTES] + ['score_total'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dossiers', '0036_dossier_traite_dossier_origine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dossiertraite',
+            name='cartographie_note',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Note Cartographie'),
+        ),
+        migrations.AddField(
+            model_name='dossiertraite',
+            name='droit_foncier_note',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Note Droit foncier'),
+        ),
+        migrations.AddField(
+            model_name='dossiertraite',
+            name='photogrammetrie_note',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Note Photogrammétrie'),
+        ),
+        migrations.AddField(
+            model_name='dossiertraite',
+            name='sciences_geodesiques_note',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Note Sciences géodésiques'),
+        ),
+        migrations.AddField(
+            model_name='dossiertraite',
+            name='score_total',
+            field=models.FloatField(blank=True, db_index=True, null=True, verbose_name='Note totale'),
+        ),
+        migrations.AddField(
+            model_name='dossiertraite',
+            name='sig_note',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Note SIG'),
+        ),
+        migrations.AddField(
+            model_name='dossiertraite',
+            name='stages_note',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Note Stages'),
+        ),
+        migrations.AddField(
+            model_name='dossiertraite',
+            name='teledetection_note',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Note Télédétection'),
+        ),
+        migrations.AddField(
+            model_name='dossiertraite',
+            name='topographie_note',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Note Topographie'),
+        ),
+        migrations.RunPython(extraire_notes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,127 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:01
+
+from datetime import date, datetime, timezone as dt_timezone
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Réunions créées par l'import du fichier de suivi (importation.dossiers_depuis_feuille)
+PARTICIPANTS_IMPORT = "Commission d'équivalence"
+ORDRE_DU_JOUR_IMPORT = "Examen du dossier d'équivalence"
+
+
+def _date(valeur, defaut):
+    try:
+        return date.fromisoformat(str(valeur)[:10])
+    except (TypeError, ValueError):
+        return defaut
+
+
+def _date_ajout(valeur, defaut):
+    try:
+        return datetime.strptime(valeur, '%Y-%m-%d %H:%M:%S').replace(tzinfo=dt_timezone.utc)
+    except (TypeError, ValueError):
+        return defaut
+
+
+def convertir_reunions(apps, schema_editor):
+    """
+    Une réunion recopiée dans plusieurs dossiers (même date, participants et ordre du jour) devient
+    une seule Reunion ; les décisions qui diffèrent d'un dossier à l'autre restent sur l'examen.
+    """
+    DossierTraite = apps.get_model('dossiers', 'DossierTraite')
+    Reunion = apps.get_model('dossiers', 'Reunion')
+    ReunionDossier = apps.get_model('dossiers', 'ReunionDossier')
+
+    groupes = {}
+    occurrences = {}
+    for dossier_id, reunions, date_creation in DossierTraite.objects.values_list('id', 'reunions', 'date_creation'):
+        for reunion in reunions or []:
+            if not isinstance(reunion, dict):
+                continue
+            cle = (
+                _date(reunion.get('date'), date_creation.date()),
+                reunion.get('participants') or '',
+                reunion.get('ordre_du_jour') or '',
+            )
+            # Un dossier ne figure qu'une fois par réunion : une réunion répétée dans le même dossier est distincte
+            rang = occurrences.get((cle, dossier_id), 0)
+            occurrences[(cle, dossier_id)] = rang + 1
+            groupes.setdefault(cle + (rang,), []).append(
+                (dossier_id, reunion.get('decisions') or '', _date_ajout(reunion.get('date_ajout'), date_creation))
+            )
+
+    examens = []
+    for (date_reunion, participants, ordre_du_jour, _), lignes in groupes.items():
+        decisions = {decision for _, decision, _ in lignes}
+        commune = decisions.pop() if len(decisions) == 1 else ''
+        reunion = Reunion.objects.create(
+            date=date_reunion,
+            participants=participants,
+            ordre_du_jour=ordre_du_jour,
+            decisions=commune,
+            importee=participants == PARTICIPANTS_IMPORT and ordre_du_jour == ORDRE_DU_JOUR_IMPORT,
+            date_ajout=min(date_ajout for _, _, date_ajout in lignes),
+        )
+        examens.extend(
+            ReunionDossier(reunion=reunion, dossier_id=dossier_id, decision='' if commune else decision)
+            for dossier_id, decision, _ in lignes
+        )
+    ReunionDossier.objects.bulk_create(examens, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dossiers', '0037_notes_dossier_traite'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reunion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('titre', models.CharField(blank=True, max_length=200, verbose_name='Titre')),
+                ('date', models.DateField(db_index=True, verbose_name='Date de la réunion')),
+                ('participants', models.TextField(blank=True, verbose_name='Participants')),
+                ('ordre_du_jour', models.TextField(blank=True, verbose_name='Ordre du jour')),
+                ('decisions', models.TextField(blank=True, verbose_name='Décisions')),
+                ('importee', models.BooleanField(db_index=True, default=False, verbose_name='Issue du fichier de suivi')),
+                ('date_ajout', models.DateTimeField(default=django.utils.timezone.now, verbose_name="Date d'ajout")),
+                ('cree_par', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Créée par')),
+            ],
+            options={
+                'verbose_name': 'Réunion de la commission',
+                'verbose_name_plural': 'Réunions de la commission',
+                'ordering': ['-date', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReunionDossier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('decision', models.TextField(blank=True, verbose_name='Décision pour ce dossier')),
+                ('dossier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='examens_reunion', to='dossiers.dossiertraite')),
+                ('reunion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='examens', to='dossiers.reunion')),
+            ],
+            options={
+                'verbose_name': 'Dossier examiné en réunion',
+                'verbose_name_plural': 'Dossiers examinés en réunion',
+                'unique_together': {('reunion', 'dossier')},
+            },
+        ),
+        migrations.RunPython(convertir_reunions, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='dossiertraite',
+            name='reunions',
+        ),
+        migrations.AddField(
+            model_name='reunion',
+            name='dossiers',
+            field=models.ManyToManyField(related_name='reunions', through='dossiers.ReunionDossier', to='dossiers.dossiertraite', verbose_name='Dossiers examinés'),
+        ),
+    ]
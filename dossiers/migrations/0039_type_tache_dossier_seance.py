@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dossiers', '0038_reunions_commission'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tache',
+            name='type_tache',
+            field=models.CharField(choices=[('import_excel', 'Import Excel des dossiers traités'), ('import_csv', 'Import CSV des dossiers traités'), ('export_excel', 'Export Excel des dossiers traités'), ('pdf_evaluation', "PDF d'évaluation"), ('import_repertoire', "Synchronisation du répertoire d'import"), ('pdf_evaluation_lot', "PDF d'évaluation d'une réunion (ZIP)"), ('dossier_seance', "Dossier de séance d'une réunion")], max_length=30, verbose_name='Type de tâche'),
+        ),
+    ]
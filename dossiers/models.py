@@ -1,9 +1,17 @@
+import copy
+import os
+
 from django.db import models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.core.cache import cache
 from users.models import CustomUser
 from datetime import date, datetime
 from django.utils import timezone
 
+from .notation import CRITERES_FIXES, _nombre, bareme_actif
+
 # Create your models here.
 
 class Dossier(models.Model):
@@ -24,13 +32,85 @@ class Dossier(models.Model):
 
 class PieceJointe(models.Model):
     dossier = models.ForeignKey(Dossier, on_delete=models.CASCADE, related_name='pieces_jointes')
+    # Plusieurs pièces de même contenu partagent le même fichier stocké (voir pieces_jointes.py)
     fichier = models.FileField(upload_to='pieces_jointes/')
     description = models.CharField(max_length=255, blank=True)
     date_ajout = models.DateTimeField(auto_now_add=True)
+    nom_original = models.CharField(max_length=255, blank=True)
+    empreinte = models.CharField(max_length=64, blank=True, db_index=True)
+    taille = models.PositiveBigIntegerField(null=True, blank=True)
+    type_mime = models.CharField(max_length=100, blank=True)
+    nombre_pages = models.PositiveIntegerField(null=True, blank=True)
+    apercu = models.FileField(upload_to='pieces_jointes/apercus/', blank=True)
 
     def __str__(self):
         return self.fichier.name
 
+    @property
+    def nom_fichier(self):
+        return os.path.basename(self.fichier.name)
+
+    @property
+    def nom_affiche(self):
+        return self.nom_original or self.nom_fichier
+
+class ChargeProfesseur(models.Model):
+    """Charge de travail dénormalisée par professeur (tenue à jour par les signaux de dossiers.signals)"""
+    professeur = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='charge_travail')
+    dossiers_assignes = models.IntegerField(default=0, verbose_name="Dossiers assignés")
+    dossiers_en_cours = models.IntegerField(default=0, verbose_name="Dossiers en cours")
+    dossiers_traites = models.IntegerField(default=0, verbose_name="Dossiers traités")
+    taux_traitement = models.FloatField(default=0, verbose_name="Taux de traitement (%)")
+    date_mise_a_jour = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Charge de travail professeur"
+        verbose_name_plural = "Charges de travail professeurs"
+    
+    def __str__(self):
+        return f"Charge de {self.professeur.username}: {self.dossiers_traites}/{self.dossiers_assignes}"
+    
+    @classmethod
+    def recalculer(cls, professeurs_ids=None):
+        """Recalcule la charge des professeurs donnés (ou de tous) en une requête agrégée + écritures groupées"""
+        professeurs = CustomUser.objects.filter(role='professeur')
+        if professeurs_ids is not None:
+            professeurs = professeurs.filter(id__in=list(professeurs_ids))
+        
+        comptes = professeurs.annotate(
+            nb_assignes=Count('dossiers_attribues'),
+            nb_en_cours=Count('dossiers_attribues', filter=Q(dossiers_attribues__statut='en_cours')),
+            nb_traites=Count('dossiers_attribues', filter=Q(dossiers_attribues__statut='traite')),
+        ).values_list('id', 'nb_assignes', 'nb_en_cours', 'nb_traites')
+        
+        comptes = list(comptes)
+        existantes = {
+            charge.professeur_id: charge
+            for charge in cls.objects.filter(professeur_id__in=[c[0] for c in comptes])
+        }
+        
+        a_creer = []
+        a_mettre_a_jour = []
+        maintenant = timezone.now()
+        for professeur_id, assignes, en_cours, traites in comptes:
+            charge = existantes.get(professeur_id) or cls(professeur_id=professeur_id)
+            charge.dossiers_assignes = assignes
+            charge.dossiers_en_cours = en_cours
+            charge.dossiers_traites = traites
+            charge.taux_traitement = round(traites / assignes * 100, 1) if assignes > 0 else 0
+            charge.date_mise_a_jour = maintenant
+            if charge.pk:
+                a_mettre_a_jour.append(charge)
+            else:
+                a_creer.append(charge)
+        
+        if a_creer:
+            cls.objects.bulk_create(a_creer)
+        if a_mettre_a_jour:
+            cls.objects.bulk_update(a_mettre_a_jour, ['dossiers_assignes', 'dossiers_en_cours', 'dossiers_traites', 'taux_traitement', 'date_mise_a_jour'])
+        
+        return len(comptes)
+
 class RapportAnalyse(models.Model):
     TYPE_RAPPORT_CHOICES = [
         ('analyse_preliminaire', 'Analyse préliminaire'),
@@ -66,6 +146,8 @@ class Candidat(models.Model):
     nom = models.CharField(max_length=255)
     date_arrivee = models.DateField()
     pays_origine = models.CharField(max_length=100)
+    # Mise à jour aussi quand le dossier, les diplômes ou les évaluations changent (signaux) : sert de clé au cache des PDF
+    date_modification = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.nom
@@ -124,6 +206,7 @@ class DecisionCommission(models.Model):
     date_decision = models.DateTimeField(auto_now_add=True)
     recommandations = models.TextField()
     commentaires = models.TextField(blank=True)
+    date_modification = models.DateTimeField(auto_now=True)
     
     @property
     def interpretation_score(self):
@@ -206,6 +289,49 @@ class StructureEvaluationGlobale(models.Model):
     def __str__(self):
         return f"Structure d'évaluation globale (Créée le {self.date_creation.strftime('%d/%m/%Y')})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._criteres_initiaux = copy.deepcopy(instance.__dict__.get('criteres_personnalises_globaux'))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Tables CriterePersonnalise tenues à jour seulement si le JSON a changé depuis la lecture
+        if self.criteres_personnalises_globaux != getattr(self, '_criteres_initiaux', None):
+            self.synchroniser_criteres()
+    
+    def synchroniser_criteres(self):
+        """Reporte criteres_personnalises_globaux dans CriterePersonnalise (mise à jour par identifiant)"""
+        existants = {critere.identifiant: critere for critere in self.criteres_personnalises.all()}
+        a_creer, a_modifier = [], []
+        vus = set()
+        for ordre, donnees in enumerate(self.criteres_personnalises_globaux or []):
+            identifiant = donnees.get('id')
+            if not isinstance(identifiant, int) or identifiant in vus:
+                continue
+            vus.add(identifiant)
+            valeurs = {
+                'nom': (donnees.get('nom') or '')[:255],
+                'note_max': _nombre(donnees.get('note_max')),
+                'ordre': ordre,
+            }
+            critere = existants.pop(identifiant, None)
+            if critere is None:
+                a_creer.append(CriterePersonnalise(structure=self, identifiant=identifiant, **valeurs))
+            elif any(getattr(critere, champ) != valeur for champ, valeur in valeurs.items()):
+                for champ, valeur in valeurs.items():
+                    setattr(critere, champ, valeur)
+                a_modifier.append(critere)
+        
+        CriterePersonnalise.objects.filter(pk__in=[critere.pk for critere in existants.values()]).delete()
+        CriterePersonnalise.objects.bulk_create(a_creer)
+        CriterePersonnalise.objects.bulk_update(a_modifier, ['nom', 'note_max', 'ordre'])
+        # Rattacher les notes saisies sous le même nom à ces critères
+        for critere in a_creer + a_modifier:
+            NoteCritere.objects.filter(critere__isnull=True, nom=critere.nom).update(critere=critere)
+        self._criteres_initiaux = copy.deepcopy(self.criteres_personnalises_globaux)
+    
     def get_structure_active():
         """Récupérer la structure active"""
         try:
@@ -597,10 +723,41 @@ class ConsistanceAcademique(models.Model):
         verbose_name="Message pour stages non achevés"
     )
     
+    # Résultats calculés à chaque enregistrement (voir mettre_a_jour_scores)
+    NIVEAUX_INTERPRETATION = [
+        ('excellence', 'Formation validée avec excellence'),
+        ('solide', 'Formation solide'),
+        ('insuffisant', 'Formation insuffisante'),
+        ('insuffisant_obligatoire', 'Formation insuffisante - Critères obligatoires non acquis'),
+    ]
+    score_total = models.FloatField(default=0, db_index=True, editable=False, verbose_name="Note totale")
+    criteres_obligatoires_acquis = models.BooleanField(
+        default=True,
+        db_index=True,
+        editable=False,
+        verbose_name="Critères obligatoires acquis"
+    )
+    niveau_interpretation = models.CharField(
+        max_length=30,
+        choices=NIVEAUX_INTERPRETATION,
+        default='insuffisant',
+        db_index=True,
+        editable=False,
+        verbose_name="Interprétation"
+    )
+    criteres_non_acquis = models.JSONField(
+        default=list,
+        blank=True,
+        editable=False,
+        verbose_name="Critères obligatoires non acquis"
+    )
+    
     # Métadonnées
     date_creation = models.DateTimeField(auto_now_add=True)
     date_modification = models.DateTimeField(auto_now=True)
     
+    CHAMPS_SCORES = ['score_total', 'criteres_obligatoires_acquis', 'niveau_interpretation', 'criteres_non_acquis']
+    
     class Meta:
         verbose_name = "Consistance académique"
         verbose_name_plural = "Consistances académiques"
@@ -608,282 +765,64 @@ class ConsistanceAcademique(models.Model):
     def __str__(self):
         return f"Consistance académique - {self.candidat.nom}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._criteres_initiaux = copy.deepcopy(instance.__dict__.get('criteres_personnalises'))
+        return instance
+    
+    def save(self, *args, **kwargs):
+        self.mettre_a_jour_scores()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(self.CHAMPS_SCORES)
+        super().save(*args, **kwargs)
+        # Tables NoteCritere / CompetenceCochee tenues à jour seulement si le JSON a changé depuis la lecture
+        if self.criteres_personnalises != getattr(self, '_criteres_initiaux', []):
+            self.synchroniser_criteres()
+    
+    def synchroniser_criteres(self, criteres_globaux=None):
+        """
+        Reporte criteres_personnalises dans NoteCritere et CompetenceCochee (remplacement complet).
+        criteres_globaux ({nom: CriterePersonnalise}) évite de relire les critères de la structure active.
+        """
+        if criteres_globaux is None:
+            criteres_globaux = CriterePersonnalise.par_nom()
+        NoteCritere.objects.filter(consistance=self).delete()
+        notes, competences = lignes_criteres(self, criteres_globaux)
+        NoteCritere.objects.bulk_create(notes)
+        CompetenceCochee.objects.bulk_create(competences)
+        self._criteres_initiaux = copy.deepcopy(self.criteres_personnalises)
+    
+    def appliquer_resultat(self, resultat):
+        """Reporte un ResultatNotation sur les champs enregistrés ; retourne True si l'un d'eux change"""
+        modifie = False
+        for champ, valeur in resultat._asdict().items():
+            if getattr(self, champ) != valeur:
+                setattr(self, champ, valeur)
+                modifie = True
+        return modifie
+    
+    def mettre_a_jour_scores(self, bareme=None):
+        """Recalcule les résultats enregistrés (note totale, critères obligatoires, interprétation)"""
+        self.appliquer_resultat((bareme or bareme_actif()).evaluer(self))
+    
     @property
     def note_totale(self):
+        """Note totale enregistrée (mise à jour à chaque save)"""
+        return self.score_total
+    
+    def calculer_note_totale(self, bareme=None):
         """Calcule la note totale de la consistance académique"""
-        notes = []
-        
-        # Fonction helper pour convertir en nombre
-        def to_float(value):
-            if value is None:
-                return None
-            try:
-                return float(value)
-            except (ValueError, TypeError):
-                return None
-        
-        # Sciences géodésiques (16 points)
-        if self.sciences_geodesiques_note is not None:
-            note = to_float(self.sciences_geodesiques_note)
-            if note is not None:
-                notes.append(note)
-        
-        # Topographie (16 points)
-        if self.topographie_note is not None:
-            note = to_float(self.topographie_note)
-            if note is not None:
-                notes.append(note)
-        
-        # Photogrammétrie (16 points)
-        if self.photogrammetrie_note is not None:
-            note = to_float(self.photogrammetrie_note)
-            if note is not None:
-                notes.append(note)
-        
-        # Cartographie (16 points)
-        if self.cartographie_note is not None:
-            note = to_float(self.cartographie_note)
-            if note is not None:
-                notes.append(note)
-        
-        # Droit foncier (10 points)
-        if self.droit_foncier_note is not None:
-            note = to_float(self.droit_foncier_note)
-            if note is not None:
-                notes.append(note)
-        
-        # SIG (10 points)
-        if self.sig_note is not None:
-            note = to_float(self.sig_note)
-            if note is not None:
-                notes.append(note)
-        
-        # Télédétection (10 points)
-        if self.teledetection_note is not None:
-            note = to_float(self.teledetection_note)
-            if note is not None:
-                notes.append(note)
-        
-        # Stages (10 points)
-        if self.stages_note is not None:
-            note = to_float(self.stages_note)
-            if note is not None:
-                notes.append(note)
-        
-        # Critères personnalisés ajoutés par le professeur
-        for critere in self.criteres_personnalises:
-            if critere.get('note') is not None:
-                note = to_float(critere.get('note'))
-                if note is not None:
-                    notes.append(note)
-        
-        return sum(notes) if notes else 0
+        return (bareme or bareme_actif()).evaluer(self).score_total
     
-    def evaluer_criteres_obligatoires(self):
+    def evaluer_criteres_obligatoires(self, bareme=None):
         """
         Évalue les critères obligatoires selon la règle :
         - Note < 50% de la note allouée = critère non acquis
         - Si un critère obligatoire est non acquis = dossier insuffisant
         """
-        criteres_evaluation = {}
-        criteres_non_acquis = []
-        
-        # Fonction helper pour convertir en nombre
-        def to_float(value):
-            if value is None:
-                return None
-            try:
-                return float(value)
-            except (ValueError, TypeError):
-                return None
-        
-        # Sciences géodésiques obligatoires (16 points)
-        if self.sciences_geodesiques_note is not None:
-            note = to_float(self.sciences_geodesiques_note)
-            if note is not None:
-                note_min = 16 * 0.5  # 50% de 16 = 8
-                if note < note_min:
-                    criteres_evaluation['sciences_geodesiques'] = {
-                        'note': note,
-                        'note_min': note_min,
-                        'note_max': 16,
-                        'acquis': False,
-                        'pourcentage': (note / 16) * 100,
-                        'personnalise': False
-                    }
-                    criteres_non_acquis.append('Sciences géodésiques')
-                else:
-                    criteres_evaluation['sciences_geodesiques'] = {
-                        'note': note,
-                        'note_min': note_min,
-                        'note_max': 16,
-                        'acquis': True,
-                        'pourcentage': (note / 16) * 100,
-                        'personnalise': False
-                    }
-        
-        # Topographie obligatoire (16 points)
-        if self.topographie_note is not None:
-            note = to_float(self.topographie_note)
-            if note is not None:
-                note_min = 16 * 0.5  # 50% de 16 = 8
-                if note < note_min:
-                    criteres_evaluation['topographie'] = {
-                        'note': note,
-                        'note_min': note_min,
-                        'note_max': 16,
-                        'acquis': False,
-                        'pourcentage': (note / 16) * 100,
-                        'personnalise': False
-                    }
-                    criteres_non_acquis.append('Topographie')
-                else:
-                    criteres_evaluation['topographie'] = {
-                        'note': note,
-                        'note_min': note_min,
-                        'note_max': 16,
-                        'acquis': True,
-                        'pourcentage': (note / 16) * 100,
-                        'personnalise': False
-                    }
-        
-        # Photogrammétrie obligatoire (16 points)
-        if self.photogrammetrie_note is not None:
-            note = to_float(self.photogrammetrie_note)
-            if note is not None:
-                note_min = 16 * 0.5  # 50% de 16 = 8
-                if note < note_min:
-                    criteres_evaluation['photogrammetrie'] = {
-                        'note': note,
-                        'note_min': note_min,
-                        'note_max': 16,
-                        'acquis': False,
-                        'pourcentage': (note / 16) * 100,
-                        'personnalise': False
-                    }
-                    criteres_non_acquis.append('Photogrammétrie')
-                else:
-                    criteres_evaluation['photogrammetrie'] = {
-                        'note': note,
-                        'note_min': note_min,
-                        'note_max': 16,
-                        'acquis': True,
-                        'pourcentage': (note / 16) * 100,
-                        'personnalise': False
-                    }
-        
-        # Cartographie obligatoire (16 points)
-        if self.cartographie_note is not None:
-            note = to_float(self.cartographie_note)
-            if note is not None:
-                note_min = 16 * 0.5  # 50% de 16 = 8
-                if note < note_min:
-                    criteres_evaluation['cartographie'] = {
-                        'note': note,
-                        'note_min': note_min,
-                        'note_max': 16,
-                        'acquis': False,
-                        'pourcentage': (note / 16) * 100,
-                        'personnalise': False
-                    }
-                    criteres_non_acquis.append('Cartographie')
-                else:
-                    criteres_evaluation['cartographie'] = {
-                        'note': note,
-                        'note_min': note_min,
-                        'note_max': 16,
-                        'acquis': True,
-                        'pourcentage': (note / 16) * 100,
-                        'personnalise': False
-                    }
-        
-        # Droit foncier obligatoire (10 points)
-        if self.droit_foncier_note is not None:
-            note = to_float(self.droit_foncier_note)
-            if note is not None:
-                note_min = 10 * 0.5  # 50% de 10 = 5
-                if note < note_min:
-                    criteres_evaluation['droit_foncier'] = {
-                        'note': note,
-                        'note_min': note_min,
-                        'note_max': 10,
-                        'acquis': False,
-                        'pourcentage': (note / 10) * 100,
-                        'personnalise': False
-                    }
-                    criteres_non_acquis.append('Droit foncier')
-                else:
-                    criteres_evaluation['droit_foncier'] = {
-                        'note': note,
-                        'note_min': note_min,
-                        'note_max': 10,
-                        'acquis': True,
-                        'pourcentage': (note / 10) * 100,
-                        'personnalise': False
-                    }
-        
-        # SIG (10 points) - NON OBLIGATOIRE
-        if self.sig_note is not None:
-            note = to_float(self.sig_note)
-            if note is not None:
-                criteres_evaluation['sig'] = {
-                    'note': note,
-                    'note_min': 0,  # Pas de minimum pour les critères non-obligatoires
-                    'note_max': 10,
-                    'acquis': True,  # Toujours considéré comme acquis
-                    'pourcentage': (note / 10) * 100,
-                    'personnalise': False
-                }
-        
-        # Télédétection (10 points) - NON OBLIGATOIRE
-        if self.teledetection_note is not None:
-            note = to_float(self.teledetection_note)
-            if note is not None:
-                criteres_evaluation['teledetection'] = {
-                    'note': note,
-                    'note_min': 0,  # Pas de minimum pour les critères non-obligatoires
-                    'note_max': 10,
-                    'acquis': True,  # Toujours considéré comme acquis
-                    'pourcentage': (note / 10) * 100,
-                    'personnalise': False
-                }
-        
-        # Stages (10 points) - NON OBLIGATOIRE
-        if self.stages_note is not None:
-            note = to_float(self.stages_note)
-            if note is not None:
-                criteres_evaluation['stages'] = {
-                    'note': note,
-                    'note_min': 0,  # Pas de minimum pour les critères non-obligatoires
-                    'note_max': 10,
-                    'acquis': True,  # Toujours considéré comme acquis
-                    'pourcentage': (note / 10) * 100,
-                    'personnalise': False
-                }
-        
-        # Critères personnalisés ajoutés par le professeur - NON OBLIGATOIRES
-        for critere in self.criteres_personnalises:
-            if critere.get('note') is not None:
-                note_max = to_float(critere.get('note_max', 10))
-                note_actuelle = to_float(critere.get('note', 0))
-                
-                if note_max is not None and note_actuelle is not None:
-                    criteres_evaluation[f"critere_personnalise_{critere.get('id')}"] = {
-                        'note': note_actuelle,
-                        'note_min': 0,  # Pas de minimum pour les critères non-obligatoires
-                        'note_max': note_max,
-                        'acquis': True,  # Toujours considéré comme acquis
-                        'pourcentage': (note_actuelle / note_max) * 100,
-                        'nom': critere.get('nom', 'Critère personnalisé'),
-                        'personnalise': True
-                    }
-        
-        return {
-            'criteres': criteres_evaluation,
-            'criteres_non_acquis': criteres_non_acquis,
-            'dossier_suffisant': len(criteres_non_acquis) == 0,
-            'total_criteres_evalues': len(criteres_evaluation)
-        }
+        return (bareme or bareme_actif()).detailler(self)
     
     def interpreter_resultats_globaux(self):
         """
@@ -893,14 +832,12 @@ class ConsistanceAcademique(models.Model):
         - Moins de 50 points : Formation insuffisante
         - Si un critère obligatoire < 50% : Formation insuffisante (même avec 76-100 points)
         """
-        note_totale = self.note_totale
-        
-        # Vérifier d'abord les critères obligatoires
-        evaluation_obligatoires = self.evaluer_criteres_obligatoires()
-        criteres_non_acquis = evaluation_obligatoires['criteres_non_acquis']
+        # Résultats enregistrés par mettre_a_jour_scores() : rien n'est recalculé ici
+        note_totale = self.score_total
+        criteres_non_acquis = self.criteres_non_acquis
         
         # Si un critère obligatoire n'est pas acquis, le dossier est automatiquement insuffisant
-        if criteres_non_acquis:
+        if self.niveau_interpretation == 'insuffisant_obligatoire':
             criteres_liste = ", ".join(criteres_non_acquis)
             return {
                 'niveau': 'insuffisant_obligatoire',
@@ -914,7 +851,7 @@ class ConsistanceAcademique(models.Model):
             }
         
         # Si tous les critères obligatoires sont acquis, on peut évaluer selon le score total
-        if note_totale >= 76:
+        if self.niveau_interpretation == 'excellence':
             return {
                 'niveau': 'excellence',
                 'titre': 'Formation validée avec excellence',
@@ -924,7 +861,7 @@ class ConsistanceAcademique(models.Model):
                 'note_totale': note_totale,
                 'note_max': 100
             }
-        elif note_totale >= 50:
+        elif self.niveau_interpretation == 'solide':
             return {
                 'niveau': 'solide',
                 'titre': 'Formation solide',
@@ -945,6 +882,101 @@ class ConsistanceAcademique(models.Model):
                 'note_max': 100
             }
 
+class CriterePersonnalise(models.Model):
+    """Critère personnalisé global défini par l'administrateur (tenu à jour depuis criteres_personnalises_globaux)"""
+    structure = models.ForeignKey(StructureEvaluationGlobale, on_delete=models.CASCADE, related_name='criteres_personnalises')
+    identifiant = models.IntegerField(verbose_name="Identifiant dans la structure")
+    nom = models.CharField(max_length=255, db_index=True)
+    note_max = models.FloatField(null=True, blank=True)
+    ordre = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name = "Critère personnalisé"
+        verbose_name_plural = "Critères personnalisés"
+        ordering = ['structure', 'ordre']
+        constraints = [
+            models.UniqueConstraint(fields=['structure', 'identifiant'], name='critere_perso_structure_id_uniq'),
+        ]
+    
+    def __str__(self):
+        return self.nom
+    
+    @classmethod
+    def par_nom(cls):
+        """Critères de la structure active, indexés par nom"""
+        from .notation import structure_evaluation
+        
+        return {critere.nom: critere for critere in cls.objects.filter(structure_id=structure_evaluation().structure.pk)}
+
+
+class NoteCritere(models.Model):
+    """Note d'une consistance sur un critère personnalisé (tenue à jour depuis criteres_personnalises)"""
+    consistance = models.ForeignKey(ConsistanceAcademique, on_delete=models.CASCADE, related_name='notes_criteres')
+    critere = models.ForeignKey(
+        CriterePersonnalise,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='notes',
+        help_text="Critère global de même nom dans la structure active"
+    )
+    identifiant = models.IntegerField(verbose_name="Identifiant dans la consistance")
+    nom = models.CharField(max_length=255)
+    note_max = models.FloatField(null=True, blank=True)
+    note = models.FloatField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Note de critère personnalisé"
+        verbose_name_plural = "Notes de critères personnalisés"
+        indexes = [
+            models.Index(fields=['nom', 'note'], name='note_critere_nom_note_idx'),
+            models.Index(fields=['critere', 'note'], name='note_critere_critere_note_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.nom} : {self.note}/{self.note_max}"
+
+
+class CompetenceCochee(models.Model):
+    """Compétence cochée pour un critère personnalisé d'une consistance"""
+    consistance = models.ForeignKey(ConsistanceAcademique, on_delete=models.CASCADE, related_name='competences_cochees')
+    note_critere = models.ForeignKey(NoteCritere, on_delete=models.CASCADE, related_name='competences_cochees')
+    competence = models.CharField(max_length=255, db_index=True)
+    
+    class Meta:
+        verbose_name = "Compétence cochée"
+        verbose_name_plural = "Compétences cochées"
+    
+    def __str__(self):
+        return self.competence
+
+
+def lignes_criteres(consistance, criteres_globaux):
+    """
+    Lignes NoteCritere et CompetenceCochee (non enregistrées) d'une consistance, à partir de son JSON
+    criteres_personnalises ; criteres_globaux : {nom: CriterePersonnalise} de la structure active.
+    """
+    notes, competences = [], []
+    for donnees in consistance.criteres_personnalises or []:
+        nom = (donnees.get('nom') or '')[:255]
+        note_critere = NoteCritere(
+            consistance=consistance,
+            critere=criteres_globaux.get(nom),
+            identifiant=donnees.get('id') if isinstance(donnees.get('id'), int) else 0,
+            nom=nom,
+            note_max=_nombre(donnees.get('note_max')),
+            note=_nombre(donnees.get('note')),
+        )
+        notes.append(note_critere)
+        libelles = donnees.get('competences') or []
+        for index in donnees.get('competences_cochees') or []:
+            if isinstance(index, int) and 0 <= index < len(libelles):
+                competences.append(CompetenceCochee(
+                    consistance=consistance, note_critere=note_critere, competence=str(libelles[index])[:255]
+                ))
+    return notes, competences
+
+
 class Notification(models.Model):
     TYPES = [
         ('affectation', 'Affectation de dossier'),
@@ -963,11 +995,66 @@ class Notification(models.Model):
     date_creation = models.DateTimeField(auto_now_add=True)
     lu = models.BooleanField(default=False)
     
+    TAILLE_PAGE = 20
+    
     class Meta:
-        ordering = ['-date_creation']
+        ordering = ['-date_creation', '-id']
+        indexes = [
+            # Boîte de réception et compteur de non lues
+            models.Index(fields=['destinataire', 'lu', '-date_creation'], name='notif_dest_lu_date_idx'),
+            # Pagination par curseur (date_creation, id)
+            models.Index(fields=['destinataire', '-date_creation', '-id'], name='notif_dest_date_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.titre} - {self.destinataire.username}"
+    
+    @classmethod
+    def page_par_curseur(cls, utilisateur, curseur=None, taille=None, non_lues=False):
+        """
+        Retourne une page de notifications triées par (date_creation, id) décroissants
+        et le curseur de la page suivante (None s'il n'y en a plus).
+        Le curseur est le couple (date_creation, id) de la dernière notification affichée.
+        """
+        taille = taille or cls.TAILLE_PAGE
+        notifications = cls.objects.filter(destinataire=utilisateur).select_related('dossier')
+        if non_lues:
+            notifications = notifications.filter(lu=False)
+        if curseur:
+            date_curseur, id_curseur = curseur
+            notifications = notifications.filter(
+                Q(date_creation__lt=date_curseur) |
+                Q(date_creation=date_curseur, id__lt=id_curseur)
+            )
+        # Lire un élément de plus pour savoir s'il reste une page
+        page = list(notifications.order_by('-date_creation', '-id')[:taille + 1])
+        curseur_suivant = None
+        if len(page) > taille:
+            page = page[:taille]
+            curseur_suivant = (page[-1].date_creation, page[-1].id)
+        return page, curseur_suivant
+    
+    @staticmethod
+    def cle_cache_non_lues(utilisateur_id):
+        return f"notifications_non_lues_{utilisateur_id}"
+    
+    @classmethod
+    def compter_non_lues(cls, utilisateur):
+        """Nombre de notifications non lues, mis en cache jusqu'à la prochaine modification (5 min max)"""
+        cle = cls.cle_cache_non_lues(utilisateur.pk)
+        nombre = cache.get(cle)
+        if nombre is None:
+            nombre = cls.objects.filter(destinataire=utilisateur, lu=False).count()
+            cache.set(cle, nombre, 300)
+        return nombre
+    
+    @classmethod
+    def invalider_compteur(cls, utilisateur_id):
+        cache.delete(cls.cle_cache_non_lues(utilisateur_id))
+    
+    @classmethod
+    def invalider_compteurs(cls, utilisateurs_ids):
+        cache.delete_many([cls.cle_cache_non_lues(utilisateur_id) for utilisateur_id in utilisateurs_ids])
 
 class DossierTraite(models.Model):
     """Modèle pour les dossiers déjà traités avec historique complet"""
@@ -1153,8 +1240,26 @@ class DossierTraite(models.Model):
     avis_commission = models.TextField(verbose_name="Avis de la commission")
     date_decision = models.DateField(null=True, blank=True, verbose_name="Date de décision")
     
-    # Historique des réunions
-    reunions = models.JSONField(default=list, blank=True, verbose_name="Réunions")
+    # Dossier d'origine (évaluation, candidat, consistance) ; vide pour les dossiers importés
+    dossier = models.ForeignKey(
+        Dossier,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='dossiers_traites',
+        verbose_name="Dossier d'origine"
+    )
+    
+    # Notes de l'évaluation recopiées au transfert (vides pour les dossiers importés)
+    sciences_geodesiques_note = models.IntegerField(null=True, blank=True, verbose_name="Note Sciences géodésiques")
+    topographie_note = models.IntegerField(null=True, blank=True, verbose_name="Note Topographie")
+    photogrammetrie_note = models.IntegerField(null=True, blank=True, verbose_name="Note Photogrammétrie")
+    cartographie_note = models.IntegerField(null=True, blank=True, verbose_name="Note Cartographie")
+    droit_foncier_note = models.IntegerField(null=True, blank=True, verbose_name="Note Droit foncier")
+    sig_note = models.IntegerField(null=True, blank=True, verbose_name="Note SIG")
+    teledetection_note = models.IntegerField(null=True, blank=True, verbose_name="Note Télédétection")
+    stages_note = models.IntegerField(null=True, blank=True, verbose_name="Note Stages")
+    score_total = models.FloatField(null=True, blank=True, db_index=True, verbose_name="Note totale")
     
     # Métadonnées
     date_creation = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
@@ -1174,6 +1279,19 @@ class DossierTraite(models.Model):
     def __str__(self):
         return f"Dossier {self.numero} - {self.demandeur_candidat}"
     
+    CHAMPS_NOTES = [f'{cle}_note' for cle, _, _ in CRITERES_FIXES]
+    
+    @property
+    def note_totale(self):
+        """Note totale de l'évaluation transférée (None si le dossier n'a pas été évalué dans l'application)"""
+        return self.score_total
+    
+    def copier_notes(self, consistance):
+        """Recopie les notes et la note totale de la consistance académique évaluée"""
+        for champ in self.CHAMPS_NOTES:
+            setattr(self, champ, getattr(consistance, champ))
+        self.score_total = consistance.score_total
+    
     def get_universite_display(self):
         """Retourne le nom complet de l'université"""
         if self.universite == 'autre' and self.universite_autre:
@@ -1196,26 +1314,222 @@ class DossierTraite(models.Model):
                 return choice_label
         return self.pays
     
-    def ajouter_reunion(self, date_reunion, participants, ordre_du_jour, decisions):
-        """Ajoute une nouvelle réunion à l'historique"""
-        reunion = {
-            'id': len(self.reunions) + 1,
-            'date': date_reunion.strftime('%Y-%m-%d'),
-            'participants': participants,
-            'ordre_du_jour': ordre_du_jour,
-            'decisions': decisions,
-            'date_ajout': timezone.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        self.reunions.append(reunion)
-        self.save()
-        return reunion
+    def ajouter_reunion(self, date_reunion, participants, ordre_du_jour, decisions, titre='', cree_par=None):
+        """Ajoute une nouvelle réunion à l'historique (une réunion et un examen, sans réécrire le dossier)"""
+        return Reunion.creer(
+            [self], date_reunion, participants=participants, ordre_du_jour=ordre_du_jour,
+            decisions=decisions, titre=titre, cree_par=cree_par
+        )
+    
+    def historique_reunions(self):
+        """Réunions ayant examiné ce dossier (ReunionDossier), dans l'ordre d'ajout"""
+        return self.examens_reunion.select_related('reunion').order_by('id')
     
     def get_derniere_reunion(self):
         """Retourne la dernière réunion"""
-        if self.reunions:
-            return self.reunions[-1]
-        return None
+        return self.historique_reunions().last()
     
     def get_nombre_reunions(self):
-        """Retourne le nombre total de réunions"""
-        return len(self.reunions)
+        """Retourne le nombre total de réunions (annotation nombre_reunions_total si présente)"""
+        if hasattr(self, 'nombre_reunions_total'):
+            return self.nombre_reunions_total
+        return self.examens_reunion.count()
+
+
+class Reunion(models.Model):
+    """Réunion de la commission : ordre du jour et participants enregistrés une seule fois pour tous les dossiers examinés"""
+    titre = models.CharField(max_length=200, blank=True, verbose_name="Titre")
+    date = models.DateField(db_index=True, verbose_name="Date de la réunion")
+    participants = models.TextField(blank=True, verbose_name="Participants")
+    ordre_du_jour = models.TextField(blank=True, verbose_name="Ordre du jour")
+    decisions = models.TextField(blank=True, verbose_name="Décisions")
+    # Réunions recréées à chaque synchronisation du fichier de suivi Excel
+    importee = models.BooleanField(default=False, db_index=True, verbose_name="Issue du fichier de suivi")
+    dossiers = models.ManyToManyField(
+        DossierTraite,
+        through='ReunionDossier',
+        related_name='reunions',
+        verbose_name="Dossiers examinés"
+    )
+    date_ajout = models.DateTimeField(default=timezone.now, verbose_name="Date d'ajout")
+    cree_par = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Créée par"
+    )
+    
+    class Meta:
+        verbose_name = "Réunion de la commission"
+        verbose_name_plural = "Réunions de la commission"
+        ordering = ['-date', '-id']
+    
+    def __str__(self):
+        return f"Réunion du {self.date} - {self.titre or self.ordre_du_jour[:50]}"
+    
+    @classmethod
+    def creer(cls, dossiers, date_reunion, participants='', ordre_du_jour='', decisions='',
+              decisions_par_dossier=None, titre='', importee=False, cree_par=None):
+        """
+        Crée une réunion pour plusieurs dossiers traités : une insertion pour la réunion,
+        une insertion groupée pour les examens. decisions_par_dossier : {id du dossier: décision propre}.
+        """
+        if isinstance(date_reunion, datetime):
+            date_reunion = date_reunion.date()
+        decisions_par_dossier = decisions_par_dossier or {}
+        reunion = cls.objects.create(
+            titre=titre, date=date_reunion, participants=participants, ordre_du_jour=ordre_du_jour,
+            decisions=decisions, importee=importee, cree_par=cree_par
+        )
+        ReunionDossier.objects.bulk_create([
+            ReunionDossier(reunion=reunion, dossier=dossier, decision=decisions_par_dossier.get(dossier.id, ''))
+            for dossier in dossiers
+        ])
+        return reunion
+
+
+class ReunionDossier(models.Model):
+    """Examen d'un dossier traité lors d'une réunion, avec la décision propre à ce dossier"""
+    reunion = models.ForeignKey(Reunion, on_delete=models.CASCADE, related_name='examens')
+    dossier = models.ForeignKey(DossierTraite, on_delete=models.CASCADE, related_name='examens_reunion')
+    decision = models.TextField(blank=True, verbose_name="Décision pour ce dossier")
+    
+    class Meta:
+        verbose_name = "Dossier examiné en réunion"
+        verbose_name_plural = "Dossiers examinés en réunion"
+        unique_together = ['reunion', 'dossier']
+    
+    def __str__(self):
+        return f"{self.dossier.numero} - {self.reunion}"
+    
+    # Champs de la réunion, pour afficher l'historique d'un dossier comme une liste de réunions
+    @property
+    def date(self):
+        return self.reunion.date
+    
+    @property
+    def participants(self):
+        return self.reunion.participants
+    
+    @property
+    def ordre_du_jour(self):
+        return self.reunion.ordre_du_jour
+    
+    @property
+    def decisions(self):
+        return self.decision or self.reunion.decisions
+    
+    @property
+    def date_ajout(self):
+        return self.reunion.date_ajout
+    
+    @classmethod
+    def nombre_par_dossier(cls):
+        """Expression annotant chaque DossierTraite de son nombre de réunions (sous-requête, sans GROUP BY)"""
+        nombre = cls.objects.filter(dossier=OuterRef('pk')).order_by().values('dossier').annotate(
+            nombre=Count('id')
+        ).values('nombre')
+        return Coalesce(Subquery(nombre), 0)
+
+
+class Tache(models.Model):
+    """Tâche exécutée en arrière-plan (imports, exports, génération de PDF)"""
+    
+    TYPES = [
+        ('import_excel', 'Import Excel des dossiers traités'),
+        ('import_csv', 'Import CSV des dossiers traités'),
+        ('export_excel', 'Export Excel des dossiers traités'),
+        ('pdf_evaluation', 'PDF d\'évaluation'),
+        ('import_repertoire', 'Synchronisation du répertoire d\'import'),
+        ('pdf_evaluation_lot', 'PDF d\'évaluation d\'une réunion (ZIP)'),
+        ('dossier_seance', 'Dossier de séance d\'une réunion'),
+    ]
+    
+    STATUTS = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('terminee', 'Terminée'),
+        ('echec', 'Échec'),
+    ]
+    
+    type_tache = models.CharField(max_length=30, choices=TYPES, verbose_name="Type de tâche")
+    statut = models.CharField(max_length=20, choices=STATUTS, default='en_attente', verbose_name="Statut")
+    parametres = models.JSONField(default=dict, blank=True, verbose_name="Paramètres")
+    fichier_entree = models.FileField(upload_to='taches/entrees/', blank=True, verbose_name="Fichier d'entrée")
+    fichier_resultat = models.FileField(upload_to='taches/resultats/', blank=True, verbose_name="Fichier résultat")
+    resultat = models.JSONField(default=dict, blank=True, verbose_name="Résultat")
+    progression = models.PositiveIntegerField(default=0, verbose_name="Lignes traitées")
+    total = models.PositiveIntegerField(null=True, blank=True, verbose_name="Total de lignes")
+    message = models.TextField(blank=True, verbose_name="Message")
+    cree_par = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='taches', verbose_name="Créée par")
+    date_creation = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    date_debut = models.DateTimeField(null=True, blank=True, verbose_name="Date de début")
+    date_fin = models.DateTimeField(null=True, blank=True, verbose_name="Date de fin")
+    
+    class Meta:
+        ordering = ['-date_creation']
+        verbose_name = "Tâche"
+        verbose_name_plural = "Tâches"
+        indexes = [
+            # Sélection des tâches en attente par le worker
+            models.Index(fields=['statut', 'date_creation'], name='tache_statut_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_type_tache_display()} #{self.pk} ({self.get_statut_display()})"
+    
+    @property
+    def est_terminee(self):
+        return self.statut in ('terminee', 'echec')
+    
+    @property
+    def pourcentage(self):
+        """Pourcentage d'avancement (None si le total n'est pas connu)"""
+        if self.statut == 'terminee':
+            return 100
+        if not self.total:
+            return None
+        return min(100, int(self.progression * 100 / self.total))
+    
+    def reclamer(self):
+        """Passe la tâche en cours si elle est encore en attente ; False si un autre worker l'a prise"""
+        maintenant = timezone.now()
+        reclamee = Tache.objects.filter(pk=self.pk, statut='en_attente').update(
+            statut='en_cours', date_debut=maintenant
+        )
+        if reclamee:
+            self.statut = 'en_cours'
+            self.date_debut = maintenant
+        return bool(reclamee)
+    
+    def avancer(self, progression, total=None):
+        """Enregistre l'avancement sans toucher aux autres champs"""
+        self.progression = progression
+        champs = {'progression': progression}
+        if total is not None:
+            self.total = total
+            champs['total'] = total
+        Tache.objects.filter(pk=self.pk).update(**champs)
+
+
+class FichierImporte(models.Model):
+    """Point de reprise de la synchronisation d'un fichier du répertoire d'import automatique"""
+    
+    chemin = models.CharField(max_length=500, unique=True, verbose_name="Chemin du fichier")
+    empreinte = models.CharField(max_length=64, verbose_name="Empreinte SHA-256 du contenu")
+    taille = models.PositiveBigIntegerField(default=0, verbose_name="Taille (octets)")
+    date_modification_fichier = models.FloatField(default=0, verbose_name="Date de modification du fichier (mtime)")
+    # Empreinte de chaque ligne importée ou mise à jour : numéro -> empreinte des valeurs sources
+    lignes = models.JSONField(default=dict, blank=True, verbose_name="Empreintes des lignes")
+    dernier_resultat = models.JSONField(default=dict, blank=True, verbose_name="Résultat de la dernière synchronisation")
+    date_premier_import = models.DateTimeField(auto_now_add=True, verbose_name="Premier import")
+    date_synchronisation = models.DateTimeField(auto_now=True, verbose_name="Dernière synchronisation")
+    
+    class Meta:
+        ordering = ['chemin']
+        verbose_name = "Fichier importé"
+        verbose_name_plural = "Fichiers importés"
+    
+    def __str__(self):
+        return self.chemin
@@ -0,0 +1,417 @@
+"""
+Moteur de notation de la consistance académique.
+
+Le barème (critères fixes, note maximale, seuil d'acquisition, caractère obligatoire) est
+compilé une fois à partir de la structure d'évaluation active. Il évalue ensuite aussi bien
+une consistance isolée qu'un lot de lignes lues avec .values() : les notes sont rangées
+dans une matrice numpy et le total, les critères obligatoires non acquis et le niveau
+d'interprétation sont calculés pour toutes les lignes en une seule passe.
+"""
+import copy
+import multiprocessing
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+
+# Un critère obligatoire est non acquis en dessous de cette fraction de sa note maximale
+SEUIL_ACQUISITION = 0.5
+SEUIL_EXCELLENCE = 76
+SEUIL_SOLIDE = 50
+
+# (clé, libellé, obligatoire) : la note est dans <clé>_note, le maximum dans StructureEvaluationGlobale.<clé>_note_max
+CRITERES_FIXES = [
+    ('sciences_geodesiques', 'Sciences géodésiques', True),
+    ('topographie', 'Topographie', True),
+    ('photogrammetrie', 'Photogrammétrie', True),
+    ('cartographie', 'Cartographie', True),
+    ('droit_foncier', 'Droit foncier', True),
+    ('sig', 'SIG', False),
+    ('teledetection', 'Télédétection', False),
+    ('stages', 'Stages', False),
+]
+
+# Maxima par défaut (ceux des champs de StructureEvaluationGlobale) quand aucune structure n'existe
+NOTES_MAX_PAR_DEFAUT = {
+    'sciences_geodesiques': 16,
+    'topographie': 16,
+    'photogrammetrie': 16,
+    'cartographie': 16,
+    'droit_foncier': 10,
+    'sig': 10,
+    'teledetection': 10,
+    'stages': 10,
+}
+
+Critere = namedtuple('Critere', 'cle libelle champ_note note_max note_min obligatoire')
+ResultatNotation = namedtuple('ResultatNotation', 'score_total criteres_non_acquis criteres_obligatoires_acquis niveau_interpretation')
+ChangementNotation = namedtuple('ChangementNotation', 'candidat_id candidat ancien_score nouveau_score ancien_niveau nouveau_niveau')
+
+TAILLE_LOT = 1000
+
+
+def _nombre(valeur):
+    if valeur is None:
+        return None
+    try:
+        return float(valeur)
+    except (ValueError, TypeError):
+        return None
+
+
+def _valeur(ligne, champ):
+    return ligne[champ] if isinstance(ligne, dict) else getattr(ligne, champ)
+
+
+class Bareme:
+    """Table des critères compilée à partir d'une StructureEvaluationGlobale (ou des valeurs par défaut)"""
+
+    def __init__(self, structure=None):
+        self.version = structure.date_modification if structure is not None else None
+        self.criteres = []
+        for cle, libelle, obligatoire in CRITERES_FIXES:
+            note_max = getattr(structure, f'{cle}_note_max', None) or NOTES_MAX_PAR_DEFAUT[cle]
+            self.criteres.append(Critere(
+                cle=cle,
+                libelle=libelle,
+                champ_note=f'{cle}_note',
+                note_max=note_max,
+                note_min=note_max * SEUIL_ACQUISITION if obligatoire else 0,
+                obligatoire=obligatoire,
+            ))
+        self.champs_notes = [critere.champ_note for critere in self.criteres]
+        # Champs à lire (.values()) pour évaluer une consistance
+        self.champs = self.champs_notes + ['criteres_personnalises']
+        self._minima = np.array([critere.note_min for critere in self.criteres], dtype=float)
+        self._obligatoires = np.array([critere.obligatoire for critere in self.criteres], dtype=bool)
+        self._libelles = np.array([critere.libelle for critere in self.criteres], dtype=object)
+
+    def evaluer_lot(self, lignes):
+        """
+        Évalue des consistances (objets ou dictionnaires contenant self.champs) ;
+        retourne un ResultatNotation par ligne, dans le même ordre.
+        """
+        lignes = list(lignes)
+        if not lignes:
+            return []
+        notes = np.full((len(lignes), len(self.criteres)), np.nan)
+        personnalises = np.zeros(len(lignes))
+        for i, ligne in enumerate(lignes):
+            for j, champ in enumerate(self.champs_notes):
+                note = _nombre(_valeur(ligne, champ))
+                if note is not None:
+                    notes[i, j] = note
+            for critere in _valeur(ligne, 'criteres_personnalises') or []:
+                note = _nombre(critere.get('note'))
+                if note is not None:
+                    personnalises[i] += note
+
+        totaux = np.nansum(notes, axis=1) + personnalises
+        # Les notes absentes (NaN) ne sont jamais inférieures au seuil
+        non_acquis = self._obligatoires & (notes < self._minima)
+        insuffisant_obligatoire = non_acquis.any(axis=1)
+        niveaux = np.where(
+            insuffisant_obligatoire, 'insuffisant_obligatoire',
+            np.where(totaux >= SEUIL_EXCELLENCE, 'excellence',
+                     np.where(totaux >= SEUIL_SOLIDE, 'solide', 'insuffisant'))
+        )
+        return [
+            ResultatNotation(
+                score_total=float(totaux[i]),
+                criteres_non_acquis=list(self._libelles[non_acquis[i]]),
+                criteres_obligatoires_acquis=not insuffisant_obligatoire[i],
+                niveau_interpretation=str(niveaux[i]),
+            )
+            for i in range(len(lignes))
+        ]
+
+    def evaluer(self, consistance):
+        return self.evaluer_lot([consistance])[0]
+
+    def detailler(self, consistance):
+        """Évaluation critère par critère d'une consistance (affichage de la fiche)"""
+        criteres_evaluation = {}
+        criteres_non_acquis = []
+        for critere in self.criteres:
+            note = _nombre(getattr(consistance, critere.champ_note))
+            if note is None:
+                continue
+            acquis = not (critere.obligatoire and note < critere.note_min)
+            criteres_evaluation[critere.cle] = {
+                'note': note,
+                'note_min': critere.note_min,
+                'note_max': critere.note_max,
+                'acquis': acquis,
+                'pourcentage': (note / critere.note_max) * 100,
+                'personnalise': False
+            }
+            if not acquis:
+                criteres_non_acquis.append(critere.libelle)
+
+        # Critères personnalisés ajoutés par le professeur - NON OBLIGATOIRES
+        for critere in consistance.criteres_personnalises or []:
+            note_max = _nombre(critere.get('note_max', 10))
+            note = _nombre(critere.get('note'))
+            if note_max is None or note is None:
+                continue
+            criteres_evaluation[f"critere_personnalise_{critere.get('id')}"] = {
+                'note': note,
+                'note_min': 0,
+                'note_max': note_max,
+                'acquis': True,
+                'pourcentage': (note / note_max) * 100 if note_max else 0,
+                'nom': critere.get('nom', 'Critère personnalisé'),
+                'personnalise': True
+            }
+
+        return {
+            'criteres': criteres_evaluation,
+            'criteres_non_acquis': criteres_non_acquis,
+            'dossier_suffisant': len(criteres_non_acquis) == 0,
+            'total_criteres_evalues': len(criteres_evaluation)
+        }
+
+
+def structure_active():
+    """Structure d'évaluation active la plus récente (None si aucune n'a été définie)"""
+    from .models import StructureEvaluationGlobale
+
+    return (
+        StructureEvaluationGlobale.objects.filter(actif=True).order_by('-date_creation').first()
+        or StructureEvaluationGlobale.objects.order_by('pk').first()
+    )
+
+
+# --- Structure active en cache ---
+
+CLE_VERSION_STRUCTURE = 'structure_evaluation_version'
+# Avec un cache propre à chaque processus (LocMemCache), c'est le délai maximal avant
+# qu'un autre processus voie une modification ; avec un cache partagé, l'invalidation est immédiate
+DUREE_VERSION_STRUCTURE = 300
+
+# Compétences affichées sur la fiche de consistance quand l'administrateur n'en a pas défini
+COMPETENCES_FIXES_PAR_DEFAUT = {
+    'sciences_geodesiques': [
+        "Théorique et pratique de la géodésie",
+        "Mesures géodésiques",
+        "Calculs géodésiques"
+    ],
+    'topographie': [
+        "Théorique et pratique de la topographie",
+        "Topométrique et instrumentation",
+        "Techniques de mensuration"
+    ],
+    'photogrammetrie': [
+        "Base et approfondie de la photogrammétrie",
+        "Mise en place des photographies aériennes",
+        "Aérotriangulation",
+        "Restitution photogrammétrique",
+        "Génération de produits dérivés (MNT/Ortho)",
+        "Drone"
+    ],
+    'cartographie': [
+        "Théorique et pratique de la cartographie",
+        "Techniques de cartographie",
+        "Produits cartographiques"
+    ],
+    'droit_foncier': [
+        "Droit foncier",
+        "Cadastre",
+        "Aménagements fonciers"
+    ],
+    'sig': [
+        "Systèmes d'Information Géographique",
+        "Applications SIG",
+        "Analyse spatiale"
+    ],
+    'teledetection': [
+        "Télédétection",
+        "Traitement d'images",
+        "Applications de télédétection"
+    ],
+}
+
+CHAMPS_JSON_STRUCTURE = [
+    ('criteres_personnalises_globaux', list),
+    ('competences_par_critere', dict),
+    ('competences_criteres_fixes', dict),
+    ('criteres_fixes_supprimes', list),
+    ('stages_configurables', list),
+    ('stages_defaut_supprimes', list),
+]
+
+
+def version_structure(structure):
+    return f"{structure.pk}:{structure.date_modification.isoformat()}"
+
+
+class StructureEvaluation:
+    """
+    Structure active normalisée une fois par version et partagée entre les requêtes
+    (ses objets ne doivent pas être modifiés) :
+    - structure : la ligne de la base, champs JSON vides au lieu de None ;
+    - affichage : copie pour la fiche de consistance, critères personnalisés dans l'ordre
+      d'ajout et compétences par défaut des critères fixes complétées ;
+    - bareme : le barème compilé.
+    """
+
+    def __init__(self, structure):
+        for champ, vide in CHAMPS_JSON_STRUCTURE:
+            if getattr(structure, champ) is None:
+                setattr(structure, champ, vide())
+        self.structure = structure
+        self.version = version_structure(structure)
+        self.bareme = Bareme(structure)
+
+        self.affichage = copy.deepcopy(structure)
+        self.affichage.criteres_personnalises_globaux.sort(key=lambda critere: critere.get('id', 0))
+        for cle, competences in COMPETENCES_FIXES_PAR_DEFAUT.items():
+            if not self.affichage.competences_criteres_fixes.get(cle):
+                self.affichage.competences_criteres_fixes[cle] = list(competences)
+
+
+_verrou_structure = threading.Lock()
+_structure_en_cache = None
+
+
+def structure_evaluation():
+    """
+    Structure active normalisée, relue seulement quand sa version (identifiant et date de
+    modification, publiée dans le cache Django) change ; créée avec les valeurs par défaut si absente.
+    """
+    global _structure_en_cache
+    entree = _structure_en_cache
+    if entree is not None and cache.get(CLE_VERSION_STRUCTURE) == entree.version:
+        return entree
+
+    with _verrou_structure:
+        structure = structure_active()
+        if structure is None:
+            from .models import StructureEvaluationGlobale
+
+            structure = StructureEvaluationGlobale.objects.create()
+        entree = StructureEvaluation(structure)
+        _structure_en_cache = entree
+    cache.set(CLE_VERSION_STRUCTURE, entree.version, DUREE_VERSION_STRUCTURE)
+    return entree
+
+
+def invalider_structure_evaluation():
+    global _structure_en_cache
+    _structure_en_cache = None
+    cache.delete(CLE_VERSION_STRUCTURE)
+
+
+def bareme_actif():
+    """Barème compilé à partir de la structure active (en cache)"""
+    return structure_evaluation().bareme
+
+
+# --- Recalcul de l'archive ---
+
+def _lots(iterable, taille):
+    iterateur = iter(iterable)
+    while lot := list(islice(iterateur, taille)):
+        yield lot
+
+
+def _evaluer_dans_pool(pool, bareme, lots, avance):
+    """Lecture (ORM) dans ce processus, évaluation dans le pool avec au plus avance lots en attente"""
+    en_cours = deque()
+    for lot in lots:
+        en_cours.append((lot, pool.submit(bareme.evaluer_lot, lot)))
+        if len(en_cours) >= avance:
+            lot_pret, futur = en_cours.popleft()
+            yield lot_pret, futur.result()
+    while en_cours:
+        lot_pret, futur = en_cours.popleft()
+        yield lot_pret, futur.result()
+
+
+def _ecrire_lot(lignes, resultats):
+    """Enregistre les résultats modifiés d'un lot et la note des décisions correspondantes"""
+    from .models import ConsistanceAcademique, DecisionCommission
+
+    consistances = []
+    scores = {}
+    for ligne, resultat in zip(lignes, resultats):
+        consistance = ConsistanceAcademique(pk=ligne['id'], **{champ: ligne[champ] for champ in ConsistanceAcademique.CHAMPS_SCORES})
+        if consistance.appliquer_resultat(resultat):
+            consistances.append(consistance)
+        scores[ligne['candidat_id']] = int(resultat.score_total)
+
+    decisions = [
+        DecisionCommission(pk=decision_id, score_total=scores[candidat_id])
+        for decision_id, candidat_id, score in DecisionCommission.objects.filter(
+            candidat_id__in=scores
+        ).values_list('id', 'candidat_id', 'score_total')
+        if score != scores[candidat_id]
+    ]
+    # bulk_update ne déclenche pas auto_now : la date est mise à jour explicitement pour invalider les PDF en cache
+    maintenant = timezone.now()
+    for decision in decisions:
+        decision.date_modification = maintenant
+
+    with transaction.atomic():
+        ConsistanceAcademique.objects.bulk_update(consistances, ConsistanceAcademique.CHAMPS_SCORES)
+        DecisionCommission.objects.bulk_update(decisions, ['score_total', 'date_modification'])
+    return len(consistances), len(decisions)
+
+
+def rescorer_consistances(queryset=None, bareme=None, simulation=False, taille_lot=TAILLE_LOT, processus=1, progression=None):
+    """
+    Recalcule les résultats enregistrés des consistances (toutes par défaut) avec le barème
+    donné ou celui de la structure active, lues par lots avec .values().iterator().
+    Les lots sont évalués dans un pool de processus si processus > 1. En simulation, rien n'est écrit.
+    progression(consistances_traitées), si fournie, est appelée après chaque lot.
+    Retourne (nombre traité, consistances modifiées, décisions modifiées, changements de niveau).
+    """
+    from .models import ConsistanceAcademique
+
+    bareme = bareme or bareme_actif()
+    if queryset is None:
+        queryset = ConsistanceAcademique.objects.all()
+    lignes = queryset.order_by('pk').values(
+        'id', 'candidat_id', 'candidat__nom', *bareme.champs, *ConsistanceAcademique.CHAMPS_SCORES
+    ).iterator(chunk_size=taille_lot)
+
+    pool = None
+    if processus > 1:
+        pool = ProcessPoolExecutor(max_workers=processus, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        lots = _lots(lignes, taille_lot)
+        if pool:
+            evalues = _evaluer_dans_pool(pool, bareme, lots, 2 * processus)
+        else:
+            evalues = ((lot, bareme.evaluer_lot(lot)) for lot in lots)
+
+        nombre = modifiees = decisions = 0
+        changements = []
+        for lot, resultats in evalues:
+            for ligne, resultat in zip(lot, resultats):
+                if ligne['niveau_interpretation'] != resultat.niveau_interpretation:
+                    changements.append(ChangementNotation(
+                        candidat_id=ligne['candidat_id'],
+                        candidat=ligne['candidat__nom'],
+                        ancien_score=ligne['score_total'],
+                        nouveau_score=resultat.score_total,
+                        ancien_niveau=ligne['niveau_interpretation'],
+                        nouveau_niveau=resultat.niveau_interpretation,
+                    ))
+            if not simulation:
+                lot_modifiees, lot_decisions = _ecrire_lot(lot, resultats)
+                modifiees += lot_modifiees
+                decisions += lot_decisions
+            nombre += len(lot)
+            if progression:
+                progression(nombre)
+    finally:
+        if pool:
+            pool.shutdown()
+    return nombre, modifiees, decisions, changements
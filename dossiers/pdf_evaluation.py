@@ -0,0 +1,260 @@
+"""
+Génération du rapport PDF d'évaluation d'équivalence d'un candidat, avec cache sur disque.
+
+Le rendu se fait en deux temps : donnees_pdf_evaluation() extrait du modèle tout ce qui est
+affiché (à partir d'objets préchargés), puis rendre_pdf_evaluation() construit le PDF à partir
+de ces seules données, avec des styles compilés une fois pour toutes. Cette seconde étape
+n'utilise pas l'ORM : les lots de PDF sont rendus dans un pool de processus.
+
+Les PDF générés sont conservés sous PDF_EVALUATION_CACHE avec une clé formée du candidat, de sa
+décision et de leurs dates de modification ; les signaux mettent à jour la date du candidat
+quand son dossier, ses diplômes ou ses évaluations changent, ce qui invalide l'ancien PDF.
+"""
+import hashlib
+import io
+import multiprocessing
+import os
+import shutil
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.text import slugify
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+
+# À incrémenter quand la mise en page change, pour ne plus servir les PDF déjà en cache
+VERSION_GABARIT = 1
+
+# --- Styles compilés une seule fois ---
+
+STYLES = getSampleStyleSheet()
+STYLE_TITRE = ParagraphStyle(
+    'CustomTitle',
+    parent=STYLES['Heading1'],
+    fontSize=16,
+    spaceAfter=30,
+    alignment=1  # Centré
+)
+STYLE_SECTION = STYLES['Heading2']
+STYLE_TEXTE = STYLES['Normal']
+
+# Tableau libellé / valeur (candidat, résultats)
+STYLE_TABLE_FICHE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.grey),
+    ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+    ('BACKGROUND', (1, 0), (1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+# Tableau avec ligne d'en-tête (diplômes, évaluations)
+STYLE_TABLE_GRILLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+LARGEURS_FICHE = [2*inch, 4*inch]
+LARGEURS_DIPLOMES = [1.5*inch, 0.8*inch, 1.5*inch, 1*inch, 0.8*inch]
+LARGEURS_EVALUATIONS = [1.5*inch, 0.6*inch, 0.6*inch, 1*inch, 2*inch]
+ENTETES_DIPLOMES = ['Diplôme', 'Année', 'Université', 'Pays', 'Durée']
+ENTETES_EVALUATIONS = ['Compétence', 'Poids', 'Note', 'Points obtenus', 'Commentaires']
+
+
+def nom_fichier_pdf_evaluation(candidat):
+    return f"evaluation_{candidat.nom}_{timezone.now().strftime('%Y%m%d')}.pdf"
+
+
+def prefetch_pdf_evaluation(queryset):
+    """Précharge sur un queryset de Dossier tout ce qu'affiche le PDF d'évaluation"""
+    return queryset.select_related('candidat__decision').prefetch_related(
+        'candidat__diplomes', 'candidat__evaluations__competence'
+    )
+
+
+# --- Rendu ---
+
+def donnees_pdf_evaluation(dossier):
+    """Extrait les données affichées dans le PDF (listes et chaînes uniquement)"""
+    candidat = dossier.candidat
+    decision = candidat.decision
+    return {
+        'candidat': [
+            ['Nom:', candidat.nom],
+            ['Pays d\'origine:', candidat.pays_origine],
+            ['Date d\'arrivée:', candidat.date_arrivee.strftime("%d/%m/%Y")],
+            ['Dossier:', dossier.titre]
+        ],
+        'diplomes': [
+            [diplome.nom, str(diplome.annee), diplome.universite, diplome.pays, f"{diplome.duree} ans"]
+            for diplome in candidat.diplomes.all()
+        ],
+        'evaluations': [
+            [
+                evaluation.competence.nom,
+                str(evaluation.competence.poids),
+                str(evaluation.note),
+                str(evaluation.points_obtenus),
+                evaluation.commentaires[:50] + "..." if len(evaluation.commentaires) > 50 else evaluation.commentaires
+            ]
+            for evaluation in candidat.evaluations.all()
+        ],
+        'resultats': [
+            ['Score total:', f"{decision.score_total}/100"],
+            ['Interprétation:', decision.interpretation_score],
+            ['Décision:', decision.get_decision_display()],
+            ['Date de décision:', decision.date_decision.strftime("%d/%m/%Y")]
+        ],
+        'recommandations': decision.recommandations,
+        'commentaires': decision.commentaires,
+    }
+
+
+def _section(story, titre):
+    story.append(Paragraph(titre, STYLE_SECTION))
+    story.append(Spacer(1, 12))
+
+
+def _tableau(story, lignes, largeurs, style):
+    tableau = Table(lignes, colWidths=largeurs)
+    tableau.setStyle(style)
+    story.append(tableau)
+    story.append(Spacer(1, 20))
+
+
+def rendre_pdf_evaluation(donnees, sortie):
+    """Construit le PDF à partir des données extraites et l'écrit dans sortie (fichier ou tampon)"""
+    story = [Paragraph("RAPPORT D'ÉVALUATION D'ÉQUIVALENCE", STYLE_TITRE), Spacer(1, 20)]
+
+    _section(story, "INFORMATIONS DU CANDIDAT")
+    _tableau(story, donnees['candidat'], LARGEURS_FICHE, STYLE_TABLE_FICHE)
+
+    if donnees['diplomes']:
+        _section(story, "DIPLÔMES")
+        _tableau(story, [ENTETES_DIPLOMES] + donnees['diplomes'], LARGEURS_DIPLOMES, STYLE_TABLE_GRILLE)
+
+    if donnees['evaluations']:
+        _section(story, "ÉVALUATION DES COMPÉTENCES")
+        _tableau(story, [ENTETES_EVALUATIONS] + donnees['evaluations'], LARGEURS_EVALUATIONS, STYLE_TABLE_GRILLE)
+
+    _section(story, "RÉSULTATS")
+    _tableau(story, donnees['resultats'], LARGEURS_FICHE, STYLE_TABLE_FICHE)
+
+    if donnees['recommandations']:
+        _section(story, "RECOMMANDATIONS")
+        story.append(Paragraph(donnees['recommandations'], STYLE_TEXTE))
+        story.append(Spacer(1, 20))
+
+    if donnees['commentaires']:
+        _section(story, "COMMENTAIRES")
+        story.append(Paragraph(donnees['commentaires'], STYLE_TEXTE))
+
+    SimpleDocTemplate(sortie, pagesize=A4).build(story)
+
+
+def rendre_pdf_en_octets(donnees):
+    """Rendu en mémoire (fonction de niveau module, exécutable dans un processus du pool)"""
+    tampon = io.BytesIO()
+    rendre_pdf_evaluation(donnees, tampon)
+    return tampon.getvalue()
+
+
+def generer_pdf_evaluation(dossier, sortie):
+    """Écrit le PDF d'évaluation du dossier dans sortie (réponse HTTP, fichier ou tampon)"""
+    rendre_pdf_evaluation(donnees_pdf_evaluation(dossier), sortie)
+
+
+# --- Cache sur disque ---
+
+def repertoire_cache():
+    return Path(getattr(settings, 'PDF_EVALUATION_CACHE', Path(settings.MEDIA_ROOT) / 'cache' / 'pdf_evaluation'))
+
+
+def chemin_cache(candidat):
+    """Emplacement du PDF en cache pour l'état actuel du candidat et de sa décision"""
+    decision = candidat.decision
+    cle = (
+        f"{VERSION_GABARIT}|{candidat.pk}|{candidat.date_modification.isoformat()}"
+        f"|{decision.pk}|{decision.date_modification.isoformat()}"
+    )
+    return repertoire_cache() / f"candidat_{candidat.pk}" / f"{hashlib.sha1(cle.encode('utf-8')).hexdigest()[:20]}.pdf"
+
+
+def _ecrire_cache(chemin, contenu):
+    """Remplace atomiquement le PDF en cache du candidat et supprime ses versions périmées"""
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    temporaire = chemin.with_name(f"{chemin.stem}.{uuid.uuid4().hex}.tmp")
+    temporaire.write_bytes(contenu)
+    os.replace(temporaire, chemin)
+    for ancien in chemin.parent.glob('*.pdf'):
+        if ancien != chemin:
+            ancien.unlink(missing_ok=True)
+
+
+def pdf_en_cache(dossier):
+    """Chemin du PDF d'évaluation s'il est déjà en cache et à jour, sinon None"""
+    chemin = chemin_cache(dossier.candidat)
+    return chemin if chemin.exists() else None
+
+
+def pdf_evaluation_en_cache(dossier):
+    """Chemin du PDF d'évaluation du dossier, généré et mis en cache si nécessaire"""
+    chemin = chemin_cache(dossier.candidat)
+    if not chemin.exists():
+        _ecrire_cache(chemin, rendre_pdf_en_octets(donnees_pdf_evaluation(dossier)))
+    return chemin
+
+
+def supprimer_cache_candidat(candidat_id):
+    shutil.rmtree(repertoire_cache() / f"candidat_{candidat_id}", ignore_errors=True)
+
+
+# --- Lots ---
+
+def generer_zip_evaluations(dossiers, sortie, processus=None, progression=None):
+    """
+    Écrit dans sortie un ZIP des PDF d'évaluation des dossiers (préchargés avec prefetch_pdf_evaluation).
+    Les PDF absents du cache sont rendus en parallèle dans un pool de processus.
+    progression(pdf_prêts, total), si fournie, est appelée au fil du rendu ; retourne le nombre de PDF.
+    """
+    dossiers = list(dossiers)
+    chemins = [chemin_cache(dossier.candidat) for dossier in dossiers]
+    a_rendre = {
+        chemin: donnees_pdf_evaluation(dossier)
+        for dossier, chemin in zip(dossiers, chemins)
+        if not chemin.exists()
+    }
+    prets = len(dossiers) - len(a_rendre)
+    if progression:
+        progression(prets, len(dossiers))
+
+    if len(a_rendre) == 1:
+        chemin, donnees = a_rendre.popitem()
+        _ecrire_cache(chemin, rendre_pdf_en_octets(donnees))
+    elif a_rendre:
+        # « spawn » : pas de fork d'un processus web multi-threadé ni de connexions partagées
+        nombre = processus or getattr(settings, 'PDF_EVALUATION_PROCESSUS', None) or min(4, os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=nombre, mp_context=multiprocessing.get_context('spawn')) as pool:
+            for index, (chemin, contenu) in enumerate(zip(a_rendre, pool.map(rendre_pdf_en_octets, a_rendre.values())), start=1):
+                _ecrire_cache(chemin, contenu)
+                if progression:
+                    progression(prets + index)
+
+    with zipfile.ZipFile(sortie, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for dossier, chemin in zip(dossiers, chemins):
+            archive.write(chemin, f"evaluation_{slugify(dossier.candidat.nom) or 'candidat'}_{dossier.pk}.pdf")
+    return len(dossiers)
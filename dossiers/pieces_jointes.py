@@ -0,0 +1,180 @@
+"""
+Ingestion des pièces jointes : une seule copie stockée par contenu.
+
+Chaque fichier téléversé est haché (SHA-256) ; si ce contenu est déjà stocké, la nouvelle
+PieceJointe pointe vers la copie existante, sinon il est enregistré sous pieces_jointes/<empreinte>.
+La taille, le type MIME et le nombre de pages sont relevés à l'ingestion ; l'aperçu de la
+première page est généré en arrière-plan (pool de threads des tâches) et partagé entre
+toutes les pièces de même contenu.
+
+Le rendu des PDF utilise PyMuPDF s'il est installé, à défaut l'outil pdftoppm (poppler) ;
+sans l'un ou l'autre, seuls les aperçus d'images sont produits.
+"""
+import hashlib
+import io
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .fichiers import type_mime
+from .models import PieceJointe
+
+logger = logging.getLogger(__name__)
+
+DOSSIER_PIECES = 'pieces_jointes'
+DOSSIER_APERCUS = 'pieces_jointes/apercus'
+TAILLE_APERCU = (320, 480)
+
+_OBJET_PAGE = re.compile(rb'/Type\s*/Page(?![A-Za-z])')
+_CHEVAUCHEMENT = 32
+
+
+def empreinte_contenu(fichier):
+    """SHA-256 d'un fichier Django (téléversé ou stocké), lu par morceaux"""
+    empreinte = hashlib.sha256()
+    for morceau in fichier.chunks():
+        empreinte.update(morceau)
+    return empreinte.hexdigest()
+
+
+def compter_pages(chemin, type_contenu):
+    """Nombre de pages d'un PDF (1 pour une image, None si inconnu)"""
+    if type_contenu.startswith('image/'):
+        return 1
+    if type_contenu != 'application/pdf':
+        return None
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+    if fitz is not None:
+        try:
+            with fitz.open(chemin) as document:
+                return document.page_count
+        except Exception:
+            return None
+
+    # Sans PyMuPDF : compter les objets /Type /Page en lisant le fichier par blocs
+    # (ne fonctionne pas si les objets sont compressés dans des flux d'objets)
+    nombre = 0
+    reste = b''
+    with open(chemin, 'rb') as fichier:
+        for bloc in iter(lambda: fichier.read(1024 * 1024), b''):
+            donnees = reste + bloc
+            limite = max(0, len(donnees) - _CHEVAUCHEMENT)
+            nombre += sum(1 for correspondance in _OBJET_PAGE.finditer(donnees) if correspondance.start() < limite)
+            reste = donnees[limite:]
+    nombre += len(_OBJET_PAGE.findall(reste))
+    return nombre or None
+
+
+def _premiere_page_pdf(chemin):
+    from PIL import Image
+
+    try:
+        import fitz
+    except ImportError:
+        fitz = None
+    if fitz is not None:
+        with fitz.open(chemin) as document:
+            if not document.page_count:
+                return None
+            image = document[0].get_pixmap(dpi=72)
+            return Image.frombytes('RGB', (image.width, image.height), image.samples)
+
+    if shutil.which('pdftoppm'):
+        with tempfile.TemporaryDirectory() as repertoire:
+            prefixe = os.path.join(repertoire, 'apercu')
+            subprocess.run(
+                ['pdftoppm', '-png', '-f', '1', '-l', '1', '-singlefile', '-scale-to', str(max(TAILLE_APERCU)), chemin, prefixe],
+                check=True, capture_output=True, timeout=60
+            )
+            with Image.open(prefixe + '.png') as image:
+                return image.copy()
+    return None
+
+
+def image_premiere_page(chemin, type_contenu):
+    """Image PIL de la première page (ou de l'image elle-même), None si le format n'est pas pris en charge"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    if type_contenu.startswith('image/'):
+        with Image.open(chemin) as image:
+            image.seek(0)
+            return image.convert('RGB')
+    if type_contenu == 'application/pdf':
+        return _premiere_page_pdf(chemin)
+    return None
+
+
+def generer_apercu(piece_id):
+    """Génère l'aperçu d'une pièce et l'associe à toutes les pièces de même contenu ; retourne son nom ou None"""
+    piece = PieceJointe.objects.filter(pk=piece_id).first()
+    if piece is None or piece.apercu or not piece.empreinte or not piece.fichier:
+        return None
+
+    nom = f"{DOSSIER_APERCUS}/{piece.empreinte}.png"
+    if not default_storage.exists(nom):
+        try:
+            image = image_premiere_page(piece.fichier.path, piece.type_mime)
+        except Exception:
+            logger.exception("Aperçu impossible pour la pièce jointe %s", piece_id)
+            return None
+        if image is None:
+            return None
+        image.thumbnail(TAILLE_APERCU)
+        tampon = io.BytesIO()
+        image.save(tampon, format='PNG', optimize=True)
+        nom = default_storage.save(nom, ContentFile(tampon.getvalue()))
+
+    PieceJointe.objects.filter(empreinte=piece.empreinte, apercu='').update(apercu=nom)
+    return nom
+
+
+def planifier_apercu(piece):
+    from .taches import soumettre
+
+    if not piece.apercu:
+        soumettre(generer_apercu, piece.pk)
+
+
+def enregistrer_piece_jointe(dossier, fichier, description=''):
+    """
+    Crée la PieceJointe d'un fichier téléversé : le contenu n'est stocké que s'il est nouveau,
+    les métadonnées sont relevées et l'aperçu est planifié en arrière-plan.
+    """
+    empreinte = empreinte_contenu(fichier)
+    nom_original = os.path.basename(fichier.name)
+    piece = PieceJointe(
+        dossier=dossier,
+        description=description,
+        empreinte=empreinte,
+        nom_original=nom_original,
+        taille=fichier.size,
+    )
+
+    existante = PieceJointe.objects.filter(empreinte=empreinte).exclude(fichier='').order_by('id').first()
+    if existante and default_storage.exists(existante.fichier.name):
+        # Contenu déjà stocké : réutiliser la copie et ses métadonnées
+        piece.fichier.name = existante.fichier.name
+        piece.type_mime = existante.type_mime
+        piece.nombre_pages = existante.nombre_pages
+        piece.apercu.name = existante.apercu.name
+    else:
+        extension = os.path.splitext(nom_original)[1].lower()
+        nom = f"{DOSSIER_PIECES}/{empreinte}{extension}"
+        piece.fichier.name = nom if default_storage.exists(nom) else default_storage.save(nom, fichier)
+        piece.type_mime = type_mime(nom_original)
+        piece.nombre_pages = compter_pages(piece.fichier.path, piece.type_mime)
+
+    piece.save()
+    planifier_apercu(piece)
+    return piece
@@ -0,0 +1,180 @@
+"""
+Index de recherche plein texte (SQLite FTS5) pour les dossiers et les dossiers traités.
+
+Chaque table FTS5 utilise l'identifiant de l'objet indexé comme rowid, ce qui permet de
+filtrer et de classer les résultats dans la même requête SQL que le reste des filtres.
+Sur un autre moteur que SQLite, la recherche retombe sur des filtres icontains.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Candidat, Dossier, DossierTraite
+
+
+TABLE_DOSSIERS = 'dossiers_recherche_dossier'
+TABLE_DOSSIERS_TRAITES = 'dossiers_recherche_dossier_traite'
+
+# Poids bm25 des colonnes, dans l'ordre de déclaration des tables
+POIDS_DOSSIERS = (10.0, 2.0, 8.0, 3.0)  # titre, description, candidat, pays
+POIDS_DOSSIERS_TRAITES = (10.0, 8.0, 10.0, 4.0, 3.0, 1.0)  # numero, demandeur, reference, diplome, pays, avis
+
+
+def index_disponible():
+    """L'index FTS5 n'existe que sur SQLite"""
+    return connection.vendor == 'sqlite'
+
+
+def expression_recherche(texte):
+    """
+    Convertit une saisie utilisateur en expression FTS5 : chaque mot devient un préfixe
+    entre guillemets ("geod"* trouve "géodésie"), et tous les mots doivent être présents.
+    """
+    mots = re.findall(r'\w+', texte or '')
+    if not mots:
+        return None
+    return ' '.join(f'"{mot}"*' for mot in mots)
+
+
+def _filtrer(queryset, table, poids, texte):
+    expression = expression_recherche(texte)
+    if expression is None:
+        return queryset
+    colonne_id = f'{queryset.model._meta.db_table}.id'
+    poids_sql = ', '.join(str(p) for p in poids)
+    return queryset.filter(
+        id__in=RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [expression])
+    ).annotate(
+        rang_recherche=RawSQL(
+            f"SELECT bm25({table}, {poids_sql}) FROM {table} WHERE {table} MATCH %s AND rowid = {colonne_id}",
+            [expression]
+        )
+    ).order_by('rang_recherche')
+
+
+def filtrer_dossiers(queryset, texte):
+    """Filtre les dossiers sur titre, description, nom et pays du candidat, classés par pertinence"""
+    if not index_disponible():
+        return queryset.filter(
+            Q(titre__icontains=texte) |
+            Q(description__icontains=texte) |
+            Q(candidat__nom__icontains=texte) |
+            Q(candidat__pays_origine__icontains=texte)
+        )
+    return _filtrer(queryset, TABLE_DOSSIERS, POIDS_DOSSIERS, texte)
+
+
+def filtrer_dossiers_traites(queryset, texte):
+    """Filtre les dossiers traités sur numéro, demandeur, référence, diplôme, pays et avis, classés par pertinence"""
+    if not index_disponible():
+        return queryset.filter(
+            Q(demandeur_candidat__icontains=texte) |
+            Q(numero__icontains=texte) |
+            Q(reference__icontains=texte) |
+            Q(diplome__icontains=texte)
+        )
+    return _filtrer(queryset, TABLE_DOSSIERS_TRAITES, POIDS_DOSSIERS_TRAITES, texte)
+
+
+CHAMPS_DOSSIER_TRAITE = ('id', 'numero', 'demandeur_candidat', 'reference', 'diplome', 'pays', 'pays_autre', 'avis_commission')
+INSERTION_DOSSIER_TRAITE = (
+    f"INSERT INTO {TABLE_DOSSIERS_TRAITES} (rowid, numero, demandeur, reference, diplome, pays, avis_commission) "
+    f"VALUES (%s, %s, %s, %s, %s, %s, %s)"
+)
+
+
+def _valeurs_dossier_traite(dossier_traite, libelles_pays):
+    pays = ' '.join(filter(None, [
+        dossier_traite['pays'],
+        libelles_pays.get(dossier_traite['pays'], ''),
+        dossier_traite['pays_autre'],
+    ]))
+    return (
+        dossier_traite['id'],
+        dossier_traite['numero'],
+        dossier_traite['demandeur_candidat'],
+        dossier_traite['reference'],
+        dossier_traite['diplome'],
+        pays,
+        dossier_traite['avis_commission'],
+    )
+
+
+def indexer_dossier(dossier_id):
+    """(Ré)indexe un dossier avec le nom et le pays de son candidat"""
+    if not index_disponible():
+        return
+    dossier = Dossier.objects.filter(id=dossier_id).values('titre', 'description').first()
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE_DOSSIERS} WHERE rowid = %s", [dossier_id])
+        if dossier is None:
+            return
+        candidat = Candidat.objects.filter(dossier_id=dossier_id).values('nom', 'pays_origine').first() or {}
+        cursor.execute(
+            f"INSERT INTO {TABLE_DOSSIERS} (rowid, titre, description, candidat, pays) VALUES (%s, %s, %s, %s, %s)",
+            [dossier_id, dossier['titre'], dossier['description'], candidat.get('nom', ''), candidat.get('pays_origine', '')]
+        )
+
+
+def desindexer_dossier(dossier_id):
+    if index_disponible():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE_DOSSIERS} WHERE rowid = %s", [dossier_id])
+
+
+def indexer_dossiers_traites(dossiers_traites_ids):
+    """(Ré)indexe un lot de dossiers traités en deux requêtes"""
+    if not index_disponible() or not dossiers_traites_ids:
+        return
+    libelles_pays = dict(DossierTraite.PAYS_CHOICES)
+    lignes = [
+        _valeurs_dossier_traite(dossier_traite, libelles_pays)
+        for dossier_traite in DossierTraite.objects.filter(id__in=dossiers_traites_ids).values(*CHAMPS_DOSSIER_TRAITE)
+    ]
+    with connection.cursor() as cursor:
+        marqueurs = ', '.join(['%s'] * len(dossiers_traites_ids))
+        cursor.execute(f"DELETE FROM {TABLE_DOSSIERS_TRAITES} WHERE rowid IN ({marqueurs})", list(dossiers_traites_ids))
+        cursor.executemany(INSERTION_DOSSIER_TRAITE, lignes)
+
+
+def desindexer_dossier_traite(dossier_traite_id):
+    if index_disponible():
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLE_DOSSIERS_TRAITES} WHERE rowid = %s", [dossier_traite_id])
+
+
+def reconstruire_index(taille_lot=1000):
+    """Vide et reconstruit entièrement les deux index ; retourne le nombre d'entrées indexées"""
+    if not index_disponible():
+        return 0, 0
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE_DOSSIERS}")
+        cursor.execute(
+            f"INSERT INTO {TABLE_DOSSIERS} (rowid, titre, description, candidat, pays) "
+            f"SELECT d.id, d.titre, d.description, COALESCE(c.nom, ''), COALESCE(c.pays_origine, '') "
+            f"FROM {Dossier._meta.db_table} d LEFT JOIN {Candidat._meta.db_table} c ON c.dossier_id = d.id"
+        )
+        nombre_dossiers = cursor.rowcount
+
+        cursor.execute(f"DELETE FROM {TABLE_DOSSIERS_TRAITES}")
+        libelles_pays = dict(DossierTraite.PAYS_CHOICES)
+        nombre_traites = 0
+        lot = []
+        for dossier_traite in DossierTraite.objects.values(*CHAMPS_DOSSIER_TRAITE).iterator(chunk_size=taille_lot):
+            lot.append(_valeurs_dossier_traite(dossier_traite, libelles_pays))
+            if len(lot) >= taille_lot:
+                cursor.executemany(INSERTION_DOSSIER_TRAITE, lot)
+                nombre_traites += len(lot)
+                lot = []
+        if lot:
+            cursor.executemany(INSERTION_DOSSIER_TRAITE, lot)
+            nombre_traites += len(lot)
+
+        # Compacter les segments FTS5 après une reconstruction complète
+        cursor.execute(f"INSERT INTO {TABLE_DOSSIERS}({TABLE_DOSSIERS}) VALUES ('optimize')")
+        cursor.execute(f"INSERT INTO {TABLE_DOSSIERS_TRAITES}({TABLE_DOSSIERS_TRAITES}) VALUES ('optimize')")
+
+    return nombre_dossiers, nombre_traites
@@ -0,0 +1,153 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import recherche
+from .models import (
+    Candidat, ChargeProfesseur, Competence, Diplome, Dossier, DossierTraite, EvaluationCompetence, Notification,
+    StructureEvaluationGlobale
+)
+from .notation import invalider_structure_evaluation
+from .pdf_evaluation import supprimer_cache_candidat
+
+
+@receiver(pre_save, sender=Dossier)
+def memoriser_statut_initial(sender, instance, **kwargs):
+    """Mémorise le statut en base pour détecter ses changements à la sauvegarde"""
+    if instance.pk:
+        instance._statut_initial = sender.objects.filter(pk=instance.pk).values_list('statut', flat=True).first()
+    else:
+        instance._statut_initial = None
+
+
+@receiver(post_save, sender=Dossier)
+def rafraichir_charges_apres_changement_statut(sender, instance, created, **kwargs):
+    """Met à jour la charge des professeurs du dossier quand son statut change"""
+    if not created and instance.statut != getattr(instance, '_statut_initial', None):
+        professeurs_ids = list(instance.professeurs.values_list('id', flat=True))
+        if professeurs_ids:
+            ChargeProfesseur.recalculer(professeurs_ids)
+
+
+@receiver(m2m_changed, sender=Dossier.professeurs.through)
+def rafraichir_charges_apres_affectation(sender, instance, action, reverse, pk_set, **kwargs):
+    """Met à jour la charge des professeurs ajoutés ou retirés d'un dossier"""
+    if action == 'pre_clear':
+        # Mémoriser les professeurs avant que le lien ne soit vidé
+        if reverse:
+            instance._professeurs_avant_clear = [instance.pk]
+        else:
+            instance._professeurs_avant_clear = list(instance.professeurs.values_list('id', flat=True))
+        return
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        professeurs_ids = [instance.pk]
+    elif action == 'post_clear':
+        professeurs_ids = getattr(instance, '_professeurs_avant_clear', [])
+    else:
+        professeurs_ids = list(pk_set or [])
+
+    if professeurs_ids:
+        ChargeProfesseur.recalculer(professeurs_ids)
+
+
+@receiver(pre_delete, sender=Dossier)
+def memoriser_professeurs_avant_suppression(sender, instance, **kwargs):
+    instance._professeurs_avant_suppression = list(instance.professeurs.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Dossier)
+def rafraichir_charges_apres_suppression(sender, instance, **kwargs):
+    professeurs_ids = getattr(instance, '_professeurs_avant_suppression', [])
+    if professeurs_ids:
+        ChargeProfesseur.recalculer(professeurs_ids)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def initialiser_charge_professeur(sender, instance, created, update_fields=None, **kwargs):
+    """Crée ou rafraîchit la ligne de charge quand un utilisateur devient professeur"""
+    if update_fields is not None and 'role' not in update_fields:
+        return
+    if instance.role == 'professeur':
+        ChargeProfesseur.recalculer([instance.pk])
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def invalider_compteur_notifications(sender, instance, **kwargs):
+    """Invalide le compteur de notifications non lues du destinataire"""
+    Notification.invalider_compteur(instance.destinataire_id)
+
+
+@receiver(post_save, sender=Dossier)
+def indexer_dossier_apres_sauvegarde(sender, instance, **kwargs):
+    """Maintient l'index de recherche plein texte à jour"""
+    recherche.indexer_dossier(instance.pk)
+
+
+@receiver(post_delete, sender=Dossier)
+def desindexer_dossier_apres_suppression(sender, instance, **kwargs):
+    recherche.desindexer_dossier(instance.pk)
+
+
+@receiver(post_save, sender=Candidat)
+@receiver(post_delete, sender=Candidat)
+def reindexer_dossier_du_candidat(sender, instance, **kwargs):
+    """Le nom et le pays du candidat font partie de l'entrée d'index de son dossier"""
+    recherche.indexer_dossier(instance.dossier_id)
+
+
+@receiver(post_save, sender=DossierTraite)
+def indexer_dossier_traite_apres_sauvegarde(sender, instance, **kwargs):
+    recherche.indexer_dossiers_traites([instance.pk])
+
+
+@receiver(post_delete, sender=DossierTraite)
+def desindexer_dossier_traite_apres_suppression(sender, instance, **kwargs):
+    recherche.desindexer_dossier_traite(instance.pk)
+
+
+# --- Cache des PDF d'évaluation : la date de modification du candidat fait partie de la clé ---
+
+def _toucher_candidats(**filtres):
+    Candidat.objects.filter(**filtres).update(date_modification=timezone.now())
+
+
+@receiver(post_save, sender=Diplome)
+@receiver(post_delete, sender=Diplome)
+@receiver(post_save, sender=EvaluationCompetence)
+@receiver(post_delete, sender=EvaluationCompetence)
+def invalider_pdf_apres_changement_candidat(sender, instance, **kwargs):
+    """Les diplômes et évaluations figurent dans le PDF d'évaluation du candidat"""
+    _toucher_candidats(pk=instance.candidat_id)
+
+
+@receiver(post_save, sender=Dossier)
+def invalider_pdf_apres_changement_dossier(sender, instance, created, **kwargs):
+    """Le titre du dossier figure dans le PDF d'évaluation"""
+    if not created:
+        _toucher_candidats(dossier_id=instance.pk)
+
+
+@receiver(post_save, sender=Competence)
+def invalider_pdf_apres_changement_competence(sender, instance, created, **kwargs):
+    """Nom et poids de la compétence figurent dans les PDF des candidats évalués sur celle-ci"""
+    if not created:
+        _toucher_candidats(evaluations__competence=instance)
+
+
+@receiver(post_delete, sender=Candidat)
+def supprimer_pdf_du_candidat(sender, instance, **kwargs):
+    supprimer_cache_candidat(instance.pk)
+
+
+@receiver(post_save, sender=StructureEvaluationGlobale)
+@receiver(post_delete, sender=StructureEvaluationGlobale)
+def invalider_structure_en_cache(sender, **kwargs):
+    """Après validation, pour qu'aucune requête ne remette en cache l'ancienne version entre-temps"""
+    transaction.on_commit(invalider_structure_evaluation)
@@ -0,0 +1,174 @@
+from datetime import timedelta
+
+from django.db.models import Avg, Count, Exists, Max, Min, OuterRef, Q
+from django.utils import timezone
+
+from .models import CompetenceCochee, Dossier, DossierTraite, DecisionCommission, NoteCritere
+from users.models import CustomUser
+
+
+def statistiques_dossiers(queryset=None):
+    """
+    Compte les dossiers par statut en une seule requête agrégée.
+    Retourne un dictionnaire {'total': ..., 'non_traite': ..., 'en_cours': ..., 'traite': ..., 'archive': ...}
+    """
+    if queryset is None:
+        queryset = Dossier.objects.all()
+
+    agregats = {'total': Count('id')}
+    for statut, _ in Dossier.STATUT_CHOICES:
+        agregats[statut] = Count('id', filter=Q(statut=statut))
+
+    return queryset.aggregate(**agregats)
+
+
+def statistiques_dossiers_traites(queryset=None):
+    """
+    Compte les dossiers traités (total, ce mois, cette semaine) en une seule requête agrégée
+    """
+    if queryset is None:
+        queryset = Dossier.objects.all()
+
+    maintenant = timezone.now()
+    return queryset.filter(statut='traite').aggregate(
+        total=Count('id'),
+        ce_mois=Count('id', filter=Q(date_reception__month=maintenant.month)),
+        cette_semaine=Count('id', filter=Q(date_reception__gte=(maintenant - timedelta(days=7)).date())),
+    )
+
+
+def statistiques_archives(queryset=None):
+    """
+    Statistiques des dossiers traités en une seule requête agrégée : total, nombre de dossiers notés,
+    note totale moyenne et moyenne de chaque critère (colonnes de notes)
+    """
+    if queryset is None:
+        queryset = DossierTraite.objects.all()
+
+    agregats = {
+        'total': Count('id'),
+        'evalues': Count('score_total'),
+        'moyenne_score': Avg('score_total'),
+    }
+    for champ in DossierTraite.CHAMPS_NOTES:
+        agregats[f'moyenne_{champ}'] = Avg(champ)
+
+    return queryset.aggregate(**agregats)
+
+
+def statistiques_decisions():
+    """
+    Compte les décisions de la commission par type et calcule le score moyen en une seule requête agrégée
+    """
+    agregats = {
+        'total': Count('id'),
+        'moyenne_score': Avg('score_total'),
+    }
+    for decision, _ in DecisionCommission.DECISION_CHOICES:
+        agregats[decision] = Count('id', filter=Q(decision=decision))
+
+    return DecisionCommission.objects.aggregate(**agregats)
+
+
+def charges_professeurs():
+    """
+    Retourne la charge de travail de chaque professeur depuis la table dénormalisée ChargeProfesseur
+    (une seule requête, quel que soit le nombre de professeurs)
+    """
+    professeurs_stats = []
+    for professeur in CustomUser.objects.filter(role='professeur').select_related('charge_travail'):
+        charge = getattr(professeur, 'charge_travail', None)
+        professeurs_stats.append({
+            'professeur': professeur,
+            'total_dossiers': charge.dossiers_assignes if charge else 0,
+            'dossiers_assignes': charge.dossiers_assignes if charge else 0,
+            'dossiers_en_cours': charge.dossiers_en_cours if charge else 0,
+            'dossiers_traites': charge.dossiers_traites if charge else 0,
+            'taux_traitement': charge.taux_traitement if charge else 0,
+        })
+    return professeurs_stats
+
+
+# Facette des dossiers dont le candidat n'a pas de pays d'origine (voir filtre_pays)
+PAYS_NON_DEFINI = 'Non défini'
+
+
+def filtre_pays(pays):
+    """Condition sur le pays du candidat correspondant à une valeur de la facette par pays"""
+    if pays == PAYS_NON_DEFINI:
+        return Q(candidat__pays_origine__isnull=True) | Q(candidat__pays_origine='')
+    return Q(candidat__pays_origine=pays)
+
+
+def facettes_dossiers(queryset):
+    """
+    Calcule en une seule requête groupée le nombre de résultats et les facettes
+    par statut, par pays du candidat et par professeur d'un ensemble de dossiers filtré.
+
+    Le regroupement se fait sur (statut, pays) : chaque dossier appartient à un seul groupe,
+    les comptes par professeur sont des agrégats conditionnels distincts dans chaque groupe.
+    L'affectation est testée par une sous-requête sur la table d'association, indépendante
+    d'une éventuelle jointure sur les professeurs déjà faite par les filtres du queryset.
+    Les dossiers sans pays sont regroupés sous PAYS_NON_DEFINI.
+    """
+    professeurs = list(CustomUser.objects.filter(role='professeur').order_by('username'))
+    affectations = Dossier.professeurs.through.objects.filter(dossier_id=OuterRef('pk'))
+
+    agregats = {'nombre': Count('id', distinct=True)}
+    for professeur in professeurs:
+        agregats[f'professeur_{professeur.id}'] = Count(
+            'id', distinct=True, filter=Q(Exists(affectations.filter(customuser_id=professeur.id)))
+        )
+
+    groupes = (
+        queryset.order_by()
+        .values('statut', 'candidat__pays_origine')
+        .annotate(**agregats)
+    )
+
+    total = 0
+    par_statut = {statut: 0 for statut, _ in Dossier.STATUT_CHOICES}
+    par_pays = {}
+    par_professeur = {professeur.id: 0 for professeur in professeurs}
+    for groupe in groupes:
+        total += groupe['nombre']
+        par_statut[groupe['statut']] = par_statut.get(groupe['statut'], 0) + groupe['nombre']
+        pays = groupe['candidat__pays_origine'] or PAYS_NON_DEFINI
+        par_pays[pays] = par_pays.get(pays, 0) + groupe['nombre']
+        for professeur in professeurs:
+            par_professeur[professeur.id] += groupe[f'professeur_{professeur.id}']
+
+    return {
+        'total': total,
+        'par_statut': par_statut,
+        'par_pays': sorted(par_pays.items(), key=lambda item: (-item[1], item[0])),
+        'par_professeur': [
+            (professeur, par_professeur[professeur.id])
+            for professeur in professeurs
+            if par_professeur[professeur.id]
+        ],
+    }
+
+
+def statistiques_criteres_personnalises():
+    """
+    Moyenne, minimum, maximum et nombre de notes par critère personnalisé (tables NoteCritere,
+    une seule requête agrégée), du critère le plus noté au moins noté
+    """
+    return list(
+        NoteCritere.objects.filter(note__isnull=False).values('nom').annotate(
+            nombre=Count('id'),
+            moyenne=Avg('note'),
+            minimum=Min('note'),
+            maximum=Max('note'),
+        ).order_by('-nombre', 'nom')
+    )
+
+
+def candidats_par_competence(limite=20):
+    """Nombre de candidats ayant chaque compétence cochée sur un critère personnalisé, les plus fréquentes d'abord"""
+    return list(
+        CompetenceCochee.objects.values('competence').annotate(
+            candidats=Count('consistance', distinct=True)
+        ).order_by('-candidats', 'competence')[:limite]
+    )
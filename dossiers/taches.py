@@ -0,0 +1,248 @@
+"""
+File de tâches en arrière-plan sans broker externe.
+
+Les tâches sont des lignes de la table Tache. Elles sont exécutées :
+- par un pool de threads du processus web (TACHES_EN_PROCESSUS, activé par défaut),
+  soumises dès que la transaction qui les crée est validée ;
+- et/ou par la commande `python manage.py executer_taches`, qui interroge la table.
+Chaque exécutant réclame la tâche par un UPDATE conditionnel : une tâche n'est exécutée qu'une fois.
+Une tâche restée « en cours » au-delà de TACHES_DELAI_EXPIRATION est passée en échec par la commande.
+"""
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import File
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Tache
+
+logger = logging.getLogger(__name__)
+
+EXECUTANTS = {}
+
+_pool = None
+
+
+def executant(type_tache):
+    """Enregistre la fonction qui exécute un type de tâche : fonction(tache)"""
+    def decorateur(fonction):
+        EXECUTANTS[type_tache] = fonction
+        return fonction
+    return decorateur
+
+
+def _pool_processus():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'TACHES_THREADS', 2),
+            thread_name_prefix='taches'
+        )
+    return _pool
+
+
+def mettre_en_file(type_tache, utilisateur, parametres=None, fichier=None):
+    """Crée une tâche en attente et la soumet au pool du processus une fois la transaction validée"""
+    tache = Tache(type_tache=type_tache, cree_par=utilisateur, parametres=parametres or {})
+    if fichier is not None:
+        tache.fichier_entree.save(os.path.basename(fichier.name), fichier, save=False)
+    tache.save()
+
+    if getattr(settings, 'TACHES_EN_PROCESSUS', True):
+        transaction.on_commit(lambda: _pool_processus().submit(executer_tache, tache.pk))
+    return tache
+
+
+def soumettre(fonction, *args):
+    """Exécute fonction(*args) dans le pool du processus après validation de la transaction (travail interne, sans Tache)"""
+    if getattr(settings, 'TACHES_EN_PROCESSUS', True):
+        transaction.on_commit(lambda: _pool_processus().submit(_executer_travail, fonction, *args))
+
+
+def _executer_travail(fonction, *args):
+    close_old_connections()
+    try:
+        fonction(*args)
+    except Exception:
+        logger.exception("Échec du travail en arrière-plan %s", fonction.__name__)
+    finally:
+        close_old_connections()
+
+
+def executer_tache(tache_id):
+    """Réclame puis exécute une tâche ; retourne False si elle a déjà été prise ou n'a pas pu être exécutée"""
+    close_old_connections()
+    try:
+        tache = Tache.objects.select_related('cree_par').get(pk=tache_id)
+        if not tache.reclamer():
+            return False
+        try:
+            EXECUTANTS[tache.type_tache](tache)
+            tache.statut = 'terminee'
+        except Exception as e:
+            logger.exception("Échec de la tâche %s", tache_id)
+            tache.statut = 'echec'
+            tache.message = str(e)
+        tache.date_fin = timezone.now()
+        tache.save(update_fields=['statut', 'message', 'resultat', 'fichier_resultat', 'date_fin'])
+        return True
+    except Exception as e:
+        # Lecture ou enregistrement impossible (base verrouillée...) : ne pas laisser la tâche en cours indéfiniment
+        logger.exception("Erreur lors de l'exécution de la tâche %s", tache_id)
+        _marquer_echec(tache_id, str(e))
+        return False
+    finally:
+        # Les threads du pool ne passent pas par le cycle requête/réponse
+        close_old_connections()
+
+
+def _marquer_echec(tache_id, message):
+    """Dernière tentative pour passer la tâche en échec (un UPDATE, sans relire la tâche)"""
+    try:
+        Tache.objects.filter(pk=tache_id, statut__in=['en_attente', 'en_cours']).update(
+            statut='echec', message=message, date_fin=timezone.now()
+        )
+    except Exception:
+        logger.exception("Impossible de marquer la tâche %s en échec", tache_id)
+
+
+def expirer_taches_bloquees(delai=None):
+    """
+    Passe en échec les tâches « en cours » depuis plus de delai secondes (TACHES_DELAI_EXPIRATION) :
+    processus arrêté pendant l'exécution, échec d'enregistrement non rattrapé... ; retourne leur nombre
+    """
+    delai = delai or getattr(settings, 'TACHES_DELAI_EXPIRATION', 3600)
+    limite = timezone.now() - timedelta(seconds=delai)
+    nombre = Tache.objects.filter(statut='en_cours', date_debut__lt=limite).update(
+        statut='echec', message="Tâche interrompue : délai d'exécution dépassé", date_fin=timezone.now()
+    )
+    if nombre:
+        logger.warning("%s tâche(s) bloquée(s) passée(s) en échec", nombre)
+    return nombre
+
+
+def executer_taches_en_attente(nombre_threads=2, limite=None):
+    """Exécute les tâches en attente (les plus anciennes d'abord) ; retourne le nombre exécuté"""
+    expirer_taches_bloquees()
+    ids = Tache.objects.filter(statut='en_attente').order_by('date_creation').values_list('id', flat=True)
+    if limite:
+        ids = ids[:limite]
+    ids = list(ids)
+    if not ids:
+        return 0
+    with ThreadPoolExecutor(max_workers=nombre_threads, thread_name_prefix='worker') as pool:
+        return sum(1 for executee in pool.map(executer_tache, ids) if executee)
+
+
+# --- Exécutants ---
+
+@executant('import_excel')
+def _importer_excel(tache):
+    from .importation import importer_dossiers_traites_excel
+
+    source = tache.parametres.get('chemin') or tache.fichier_entree.path
+    rapport = importer_dossiers_traites_excel(source, tache.cree_par, progression=tache.avancer)
+    tache.resultat = rapport.en_dict()
+    tache.message = f"{rapport.nombre_importes} importé(s), {rapport.nombre_ignores} ignoré(s), {rapport.nombre_echecs} en erreur"
+
+
+@executant('import_csv')
+def _importer_csv(tache):
+    from .importation import DOSSIER_RAPPORTS, enregistrer_rapport_erreurs, importer_dossiers_traites_csv
+
+    with tache.fichier_entree.open('rb') as fichier:
+        rapport = importer_dossiers_traites_csv(fichier, tache.cree_par, progression=tache.avancer)
+    tache.resultat = {
+        'importes': rapport.nombre_importes,
+        'ignores': rapport.nombre_ignores,
+        'echecs': rapport.nombre_echecs,
+    }
+    nom_rapport = enregistrer_rapport_erreurs(rapport)
+    if nom_rapport:
+        tache.fichier_resultat.name = f"{DOSSIER_RAPPORTS}/{nom_rapport}"
+    tache.message = f"{rapport.nombre_importes} importé(s), {rapport.nombre_ignores} ignoré(s), {rapport.nombre_echecs} en erreur"
+
+
+@executant('import_repertoire')
+def _synchroniser_repertoire(tache):
+    from .importation import synchroniser_repertoire
+
+    resultats = synchroniser_repertoire(tache.parametres['repertoire'], tache.cree_par, progression=tache.avancer)
+    tache.resultat = {'fichiers': resultats}
+    synchronises = [resultat for resultat in resultats if resultat['statut'] == 'synchronise']
+    tache.message = (
+        f"{len(resultats)} fichier(s) examiné(s), {len(synchronises)} synchronisé(s) : "
+        f"{sum(resultat['importes'] for resultat in synchronises)} importé(s), "
+        f"{sum(resultat['mis_a_jour'] for resultat in synchronises)} mis à jour, "
+        f"{sum(1 for resultat in resultats if resultat['statut'] == 'erreur')} fichier(s) en erreur"
+    )
+
+
+@executant('export_excel')
+def _exporter_excel(tache):
+    from .admin import queryset_export_dossiers_traites
+    from .exportation import ecrire_excel
+
+    dossiers = queryset_export_dossiers_traites(tache.cree_par, tache.parametres.get('filtres', ''))
+    total = dossiers.count()
+    tache.avancer(0, total)
+
+    # Écriture en flux dans un fichier temporaire sur disque, puis copie dans le stockage
+    with tempfile.TemporaryFile() as sortie:
+        nombre = ecrire_excel(dossiers, sortie, progression=tache.avancer)
+        sortie.seek(0)
+        nom_fichier = f"dossiers_traites_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+        tache.fichier_resultat.save(nom_fichier, File(sortie), save=False)
+    tache.avancer(nombre)
+    tache.message = f"{nombre} dossier(s) exporté(s)"
+
+
+@executant('pdf_evaluation')
+def _generer_pdf_evaluation(tache):
+    from .models import Dossier
+    from .pdf_evaluation import nom_fichier_pdf_evaluation, pdf_evaluation_en_cache, prefetch_pdf_evaluation
+
+    dossier = prefetch_pdf_evaluation(Dossier.objects.all()).get(pk=tache.parametres['dossier_id'])
+    tache.avancer(0, 1)
+    with open(pdf_evaluation_en_cache(dossier), 'rb') as pdf:
+        tache.fichier_resultat.save(nom_fichier_pdf_evaluation(dossier.candidat), File(pdf), save=False)
+    tache.avancer(1)
+    tache.message = "PDF généré"
+
+
+@executant('pdf_evaluation_lot')
+def _generer_pdf_evaluation_lot(tache):
+    from .models import Dossier
+    from .pdf_evaluation import generer_zip_evaluations, prefetch_pdf_evaluation
+
+    date_reunion = tache.parametres['date_reunion']
+    dossiers = prefetch_pdf_evaluation(
+        Dossier.objects.filter(candidat__decision__date_decision__date=date_reunion)
+    ).order_by('candidat__nom')
+    with tempfile.TemporaryFile() as sortie:
+        nombre = generer_zip_evaluations(dossiers, sortie, progression=tache.avancer)
+        sortie.seek(0)
+        tache.fichier_resultat.save(f"evaluations_reunion_{date_reunion}.zip", File(sortie), save=False)
+    tache.message = f"{nombre} PDF d'évaluation dans l'archive"
+
+
+@executant('dossier_seance')
+def _generer_dossier_seance(tache):
+    from .dossier_seance import donnees_dossier_seance, nom_fichier_dossier_seance, rendre_dossier_seance
+    from .models import Reunion
+
+    reunion = Reunion.objects.get(pk=tache.parametres['reunion_id'])
+    donnees = donnees_dossier_seance(reunion)
+    nombre = len(donnees['candidats'])
+    tache.avancer(0, nombre)
+    with tempfile.TemporaryFile() as sortie:
+        rendre_dossier_seance(donnees, sortie)
+        sortie.seek(0)
+        tache.fichier_resultat.save(nom_fichier_dossier_seance(reunion), File(sortie), save=False)
+    tache.avancer(nombre)
+    tache.message = f"Dossier de séance généré ({nombre} dossier(s))"
@@ -10,6 +10,8 @@ urlpatterns = [
     path('traites/', views.dossiers_traites, name='dossiers_traites'),
     path('recherche/', views.recherche_avancee, name='recherche_avancee'),
     path('notifications/', views.notifications, name='notifications'),
+    path('notifications/api/', views.notifications_json, name='notifications_json'),
+    path('notifications/action-groupee/', views.notifications_action_groupee, name='notifications_action_groupee'),
     path('notifications/marquer-lues/', views.marquer_toutes_lues, name='marquer_toutes_lues'),
     path('notifications/<int:notification_id>/supprimer/', views.supprimer_notification, name='supprimer_notification'),
 
@@ -27,10 +29,12 @@ urlpatterns = [
     path('dossier/<int:dossier_id>/valider-et-transferer/', views.valider_et_transferer_dossier, name='valider_et_transferer_dossier'),
     path('dossier/<int:dossier_id>/renvoyer-au-professeur/', views.renvoyer_au_professeur, name='renvoyer_au_professeur'),
     path('dossier/<int:dossier_id>/export-pdf/', views.exporter_evaluation_pdf, name='exporter_evaluation_pdf'),
+    path('evaluations/export-reunion/', views.exporter_evaluations_reunion, name='exporter_evaluations_reunion'),
     path('dossier/<int:dossier_id>/modifier/', views.modifier_dossier, name='modifier_dossier'),
     path('dossier/<int:dossier_id>/supprimer/', views.supprimer_dossier, name='supprimer_dossier'),
     path('controle-fiche-evaluation/', views.controle_fiche_evaluation, name='controle_fiche_evaluation'),
     path('test-media/', views.test_media_file, name='test_media_file'),
+    path('piece-jointe/<int:piece_id>/apercu/', views.apercu_piece_jointe, name='apercu_piece_jointe'),
     path('admin/dossiers/', views.admin_dossiers, name='admin_dossiers'),
     path('professeur/dossiers/', views.professeur_dossiers, name='professeur_dossiers'),
 
@@ -40,11 +44,15 @@ urlpatterns = [
     path('dossiers-traites/<int:dossier_id>/modifier/', views.modifier_dossier_traite, name='modifier_dossier_traite'),
     path('dossiers-traites/<int:dossier_id>/reunion/', views.ajouter_reunion_dossier, name='ajouter_reunion_dossier'),
     path('dossiers-traites/<int:dossier_id>/reunions/', views.voir_reunions_dossier, name='voir_reunions_dossier'),
+    path('reunions/<int:reunion_id>/dossier-seance/', views.dossier_seance_reunion, name='dossier_seance_reunion'),
     path('dossiers-traites/<int:dossier_id>/avis/', views.voir_avis_commission, name='voir_avis_commission'),
     path('dossiers-traites/<int:dossier_traite_id>/details/', views.voir_details_traitement, name='voir_details_traitement'),
     path('dossiers-traites/<int:dossier_traite_id>/renvoyer-au-professeur/', views.renvoyer_dossier_traite_au_professeur, name='renvoyer_dossier_traite_au_professeur'),
     path('dossiers-traites/<int:dossier_id>/supprimer/', views.supprimer_dossier_traite, name='supprimer_dossier_traite'),
     path('dossiers-traites/import-csv/', views.import_csv_dossiers, name='import_csv_dossiers'),
+    path('taches/<int:tache_id>/', views.suivi_tache, name='suivi_tache'),
+    path('taches/<int:tache_id>/progression/', views.progression_tache, name='progression_tache'),
+    path('taches/<int:tache_id>/resultat/', views.telecharger_resultat_tache, name='telecharger_resultat_tache'),
     path('dossiers-traites/import-csv-auto/', views.import_csv_auto, name='import_csv_auto'),
     path('dossiers-traites/creer-reunion-multiple/', views.creer_reunion_multiple, name='creer_reunion_multiple'),
     path('dossiers-traites/creer-reunion-form/', views.creer_reunion_form, name='creer_reunion_form'),
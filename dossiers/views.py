@@ -1,27 +1,31 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseForbidden
 from django.template.loader import render_to_string
+from django.urls import reverse
 from django.utils import timezone
-from django.db.models import Q
+from django.db.models import Count, Exists, OuterRef, Q
+from django.db.models.functions import TruncDate
+from django.utils.dateparse import parse_date
 from datetime import datetime
-from .models import Dossier, PieceJointe, RapportAnalyse, HistoriqueAction, Candidat, Diplome, PieceManquante, Competence, EvaluationCompetence, DecisionCommission, Notification, EtapeEvaluation, EvaluationEtape, IndicateurDiplome, EtatDossier, ConsistanceAcademique, DossierTraite, StructureEvaluationGlobale
+from .models import Dossier, PieceJointe, RapportAnalyse, HistoriqueAction, Candidat, Diplome, PieceManquante, Competence, EvaluationCompetence, DecisionCommission, Notification, EtapeEvaluation, EvaluationEtape, IndicateurDiplome, EtatDossier, ConsistanceAcademique, DossierTraite, Reunion, ReunionDossier, StructureEvaluationGlobale, Tache
 from users.models import CustomUser
-from django.db import models
+from django.db import transaction
 import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from django.core.paginator import Paginator
 from django.template.loader import render_to_string
 from django.http import FileResponse
 import os
 from django.conf import settings
-import pandas as pd
+from .taches import mettre_en_file
+from .pdf_evaluation import nom_fichier_pdf_evaluation, pdf_en_cache
+from .fichiers import peut_acceder_dossier, pieces_accessibles, reponse_fichier
+from .formulaire_consistance import COMPETENCES_FIXES, consistance_avec_saisie, enregistrer_consistance, lire_formulaire_consistance
+from .notation import bareme_actif, structure_evaluation
+from .pieces_jointes import enregistrer_piece_jointe
+from .recherche import filtrer_dossiers, filtrer_dossiers_traites
+from .statistiques import facettes_dossiers, filtre_pays, statistiques_archives, statistiques_dossiers, statistiques_dossiers_traites, statistiques_decisions, charges_professeurs, statistiques_criteres_personnalises, candidats_par_competence
 
 def evaluer_candidat(candidat_id):
     """
@@ -123,6 +127,32 @@ def creer_notification(destinataire, type_notification, titre, message, dossier=
     )
     return notification
 
+def creer_notifications_bulk(destinataires, type_notification, titre, message, dossier=None):
+    """
+    Crée la même notification pour plusieurs destinataires en une seule insertion.
+    Les destinataires (utilisateurs ou identifiants) sont dédoublonnés.
+    """
+    destinataires_ids = list(dict.fromkeys(
+        getattr(destinataire, 'pk', destinataire) for destinataire in destinataires
+    ))
+    if not destinataires_ids:
+        return []
+    
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                destinataire_id=destinataire_id,
+                type_notification=type_notification,
+                titre=titre,
+                message=message,
+                dossier=dossier
+            )
+            for destinataire_id in destinataires_ids
+        ])
+    # bulk_create ne déclenche pas les signaux : invalider les compteurs explicitement
+    Notification.invalider_compteurs(destinataires_ids)
+    return notifications
+
 @login_required
 def recherche_avancee(request):
     """Recherche avancée dans les dossiers"""
@@ -131,16 +161,14 @@ def recherche_avancee(request):
     date_debut = request.GET.get('date_debut', '')
     date_fin = request.GET.get('date_fin', '')
     professeur = request.GET.get('professeur', '')
+    professeur_id = request.GET.get('professeur_id', '')
+    pays = request.GET.get('pays', '')
     
     dossiers = Dossier.objects.all()
     
     if query:
-        dossiers = dossiers.filter(
-            Q(titre__icontains=query) |
-            Q(description__icontains=query) |
-            Q(candidat__nom__icontains=query) |
-            Q(candidat__pays_origine__icontains=query)
-        )
+        # Index plein texte : préfixes, classement par pertinence
+        dossiers = filtrer_dossiers(dossiers, query)
     
     if statut:
         dossiers = dossiers.filter(statut=statut)
@@ -151,35 +179,60 @@ def recherche_avancee(request):
     if date_fin:
         dossiers = dossiers.filter(date_reception__lte=date_fin)
     
+    # Sous-requêtes sur la table d'association : pas de jointure qui dupliquerait les dossiers co-affectés
+    affectations = Dossier.professeurs.through.objects.filter(dossier_id=OuterRef('pk'))
     if professeur:
-        dossiers = dossiers.filter(professeurs__username__icontains=professeur)
-    
-    # Statistiques de recherche
-    total_trouve = dossiers.count()
-    par_statut = {
-        'non_traite': dossiers.filter(statut='non_traite').count(),
-        'en_cours': dossiers.filter(statut='en_cours').count(),
-        'traite': dossiers.filter(statut='traite').count(),
-    }
+        dossiers = dossiers.filter(Exists(affectations.filter(customuser__username__icontains=professeur)))
+    
+    # Professeur choisi dans les facettes : correspondance exacte
+    if professeur_id.isdigit():
+        dossiers = dossiers.filter(Exists(affectations.filter(customuser_id=int(professeur_id))))
+    else:
+        professeur_id = ''
+    
+    if pays:
+        dossiers = dossiers.filter(filtre_pays(pays))
+    
+    # Statistiques de recherche : total et facettes en une seule requête groupée
+    facettes = facettes_dossiers(dossiers)
     
     context = {
-        'dossiers': dossiers,
+        'dossiers': dossiers.select_related('candidat').prefetch_related('professeurs'),
         'query': query,
         'statut': statut,
         'date_debut': date_debut,
         'date_fin': date_fin,
         'professeur': professeur,
-        'total_trouve': total_trouve,
-        'par_statut': par_statut,
+        'professeur_id': professeur_id,
+        'pays': pays,
+        'total_trouve': facettes['total'],
+        'par_statut': facettes['par_statut'],
+        'facettes_pays': facettes['par_pays'],
+        'facettes_professeurs': facettes['par_professeur'],
     }
     
     return render(request, 'dossiers/recherche_avancee.html', context)
 
+def _encoder_curseur(curseur):
+    """Sérialise un curseur (date_creation, id) pour l'URL"""
+    if not curseur:
+        return ''
+    date_creation, notification_id = curseur
+    return f"{date_creation.isoformat()}|{notification_id}"
+
+def _decoder_curseur(valeur):
+    """Relit un curseur transmis en paramètre ; None s'il est absent ou invalide"""
+    if not valeur:
+        return None
+    try:
+        date_texte, notification_id = valeur.rsplit('|', 1)
+        return datetime.fromisoformat(date_texte), int(notification_id)
+    except ValueError:
+        return None
+
 @login_required
 def notifications(request):
     """Gestion des notifications"""
-    notifications = request.user.notifications.all()
-    
     if request.method == 'POST':
         notification_id = request.POST.get('notification_id')
         if notification_id:
@@ -191,17 +244,85 @@ def notifications(request):
             except Notification.DoesNotExist:
                 return JsonResponse({'success': False})
     
+    # Première page seulement : la suite est chargée par notifications_json (défilement infini)
+    page, curseur_suivant = Notification.page_par_curseur(request.user)
+    compteurs = request.user.notifications.aggregate(
+        total=Count('id'),
+        non_lues=Count('id', filter=Q(lu=False)),
+    )
+    
     context = {
-        'notifications': notifications,
-        'non_lues': notifications.filter(lu=False).count(),
+        'notifications': page,
+        'curseur_suivant': _encoder_curseur(curseur_suivant),
+        'total': compteurs['total'],
+        'non_lues': compteurs['non_lues'],
+        'lues': compteurs['total'] - compteurs['non_lues'],
     }
     
     return render(request, 'dossiers/notifications.html', context)
 
+@login_required
+def notifications_json(request):
+    """Page suivante de notifications (défilement infini)"""
+    curseur = _decoder_curseur(request.GET.get('curseur'))
+    non_lues = request.GET.get('non_lues') == '1'
+    page, curseur_suivant = Notification.page_par_curseur(request.user, curseur=curseur, non_lues=non_lues)
+    
+    html = ''.join(
+        render_to_string('dossiers/notification_item.html', {'notification': notification}, request=request)
+        for notification in page
+    )
+    return JsonResponse({
+        'html': html,
+        'notifications': [
+            {
+                'id': notification.id,
+                'titre': notification.titre,
+                'type': notification.type_notification,
+                'lu': notification.lu,
+                'date_creation': notification.date_creation.isoformat(),
+            }
+            for notification in page
+        ],
+        'curseur_suivant': _encoder_curseur(curseur_suivant),
+    })
+
+@login_required
+def notifications_action_groupee(request):
+    """Marquer comme lues ou supprimer plusieurs notifications en une requête"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Méthode non autorisée'}, status=405)
+    
+    action = request.POST.get('action')
+    try:
+        ids = [int(notification_id) for notification_id in request.POST.getlist('ids')]
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Identifiants invalides'}, status=400)
+    
+    if action not in ('lire', 'supprimer') or not ids:
+        return JsonResponse({'success': False, 'error': 'Action ou sélection invalide'}, status=400)
+    
+    # Le filtre sur le destinataire empêche d'agir sur les notifications d'un autre utilisateur
+    selection = Notification.objects.filter(destinataire=request.user, id__in=ids)
+    if action == 'lire':
+        nombre = selection.filter(lu=False).update(lu=True)
+    else:
+        nombre, _ = selection.delete()
+    # update() ne déclenche pas les signaux : invalider le compteur explicitement
+    Notification.invalider_compteur(request.user.pk)
+    
+    return JsonResponse({
+        'success': True,
+        'nombre': nombre,
+        'non_lues': Notification.compter_non_lues(request.user),
+    })
+
 @login_required
 def marquer_toutes_lues(request):
     """Marquer toutes les notifications comme lues"""
     request.user.notifications.filter(lu=False).update(lu=True)
+    # update() ne déclenche pas les signaux : invalider le compteur explicitement
+    Notification.invalider_compteur(request.user.pk)
     messages.success(request, "Toutes les notifications ont été marquées comme lues.")
     return redirect('dossiers:notifications')
 
@@ -233,60 +354,10 @@ def import_csv_dossiers(request):
                     messages.error(request, "Veuillez sélectionner un fichier CSV valide.")
                     return render(request, 'dossiers/import_csv.html')
                 
-                # Lire le fichier CSV
-                import csv
-                from io import StringIO
-                
-                # Décoder le contenu du fichier
-                content = csv_file.read().decode('utf-8')
-                csv_data = StringIO(content)
-                
-                # Parser le CSV
-                reader = csv.DictReader(csv_data)
-                
-                                                 # Vérifier les colonnes requises
-                required_columns = ['numero', 'demandeur_candidat', 'reference', 'date_envoi', 'date_reception', 'diplome', 'universite', 'pays', 'avis_commission']
-                if not all(col in reader.fieldnames for col in required_columns):
-                    messages.error(request, f"Le fichier CSV doit contenir les colonnes : {', '.join(required_columns)}")
-                    return render(request, 'dossiers/import_csv.html')
-                
-                # Traiter chaque ligne
-                dossiers_crees = 0
-                dossiers_erreurs = 0
-                
-                for row_num, row in enumerate(reader, start=2):  # Commencer à 2 car la ligne 1 est l'en-tête
-                    try:
-                        # Créer le dossier traité directement
-                        dossier_traite = DossierTraite.objects.create(
-                            numero=row['numero'].strip(),
-                            demandeur_candidat=row['demandeur_candidat'].strip(),
-                            reference=row['reference'].strip(),
-                            date_envoi=row.get('date_envoi', timezone.now().date()),
-                            date_reception=row.get('date_reception', timezone.now().date()),
-                            diplome=row['diplome'].strip(),
-                            universite=row['universite'].strip(),
-                            pays=row['pays'].strip(),
-                            avis_commission=row['avis_commission'].strip(),
-                            reference_reception=row.get('reference_reception', ''),
-                            universite_autre=row.get('universite_autre', ''),
-                            pays_autre=row.get('pays_autre', ''),
-                            date_avis=row.get('date_avis', None),
-                            date_decision=row.get('date_decision', None),
-                            cree_par=request.user
-                        )
-                        
-                        dossiers_crees += 1
-                        
-                    except Exception as e:
-                        dossiers_erreurs += 1
-                        messages.warning(request, f"Erreur ligne {row_num}: {str(e)}")
-                
-                if dossiers_crees > 0:
-                    messages.success(request, f"{dossiers_crees} dossiers importés avec succès depuis le fichier CSV.")
-                if dossiers_erreurs > 0:
-                    messages.warning(request, f"{dossiers_erreurs} dossiers n'ont pas pu être importés.")
-                
-                return redirect('dossiers:dossiers_traites_admin')
+                # Lecture en flux et insertion par lots en arrière-plan ; les erreurs vont dans un rapport CSV
+                tache = mettre_en_file('import_csv', request.user, fichier=csv_file)
+                messages.success(request, "Import CSV lancé en arrière-plan.")
+                return redirect('dossiers:suivi_tache', tache_id=tache.id)
                 
             except Exception as e:
                 messages.error(request, f"Erreur lors de l'import : {str(e)}")
@@ -295,18 +366,60 @@ def import_csv_dossiers(request):
     
     return render(request, 'dossiers/import_csv.html')
 
+def _tache_de_l_utilisateur(request, tache_id):
+    """Tâche créée par l'utilisateur (ou n'importe quelle tâche pour un admin)"""
+    taches = Tache.objects.all() if request.user.role == 'admin' else Tache.objects.filter(cree_par=request.user)
+    return get_object_or_404(taches, id=tache_id)
+
+def _etat_tache(tache):
+    return {
+        'id': tache.id,
+        'type': tache.type_tache,
+        'statut': tache.statut,
+        'statut_libelle': tache.get_statut_display(),
+        'progression': tache.progression,
+        'total': tache.total,
+        'pourcentage': tache.pourcentage,
+        'message': tache.message,
+        'resultat': tache.resultat,
+        'url_resultat': reverse('dossiers:telecharger_resultat_tache', args=[tache.id]) if tache.fichier_resultat else None,
+    }
+
+@login_required
+def suivi_tache(request, tache_id):
+    """Page de suivi d'une tâche en arrière-plan"""
+    tache = _tache_de_l_utilisateur(request, tache_id)
+    return render(request, 'dossiers/suivi_tache.html', {'tache': tache, 'etat': _etat_tache(tache)})
+
+@login_required
+def progression_tache(request, tache_id):
+    """État et avancement d'une tâche (interrogé périodiquement par la page de suivi)"""
+    tache = _tache_de_l_utilisateur(request, tache_id)
+    return JsonResponse(_etat_tache(tache))
+
+@login_required
+def telecharger_resultat_tache(request, tache_id):
+    """Télécharger le fichier produit par une tâche terminée"""
+    tache = _tache_de_l_utilisateur(request, tache_id)
+    if not tache.fichier_resultat:
+        messages.error(request, "Aucun fichier disponible pour cette tâche.")
+        return redirect('dossiers:suivi_tache', tache_id=tache.id)
+    return reponse_fichier(request, tache.fichier_resultat.path, os.path.basename(tache.fichier_resultat.name), en_ligne=False)
+
 @login_required
 def import_csv_auto(request):
-    """Import automatique de tous les dossiers depuis un fichier CSV"""
+    """Import automatique : synchronise en arrière-plan les fichiers déposés dans le répertoire d'import"""
     if request.user.role != 'admin':
         messages.error(request, "Accès non autorisé")
         return redirect('dossiers:dashboard')
     
-    # Logique d'import automatique similaire mais sans interface utilisateur
-    # Cette fonction peut être appelée par un script ou une tâche planifiée
+    if request.method != 'POST':
+        return redirect('dossiers:dossiers_traites_admin')
     
-    messages.success(request, "Import automatique CSV déclenché avec succès.")
-    return redirect('dossiers:dossiers_traites_admin')
+    # La même synchronisation peut être planifiée avec `python manage.py importer_repertoire`
+    tache = mettre_en_file('import_repertoire', request.user, parametres={'repertoire': str(settings.IMPORT_AUTO_REPERTOIRE)})
+    messages.success(request, "Synchronisation du répertoire d'import lancée.")
+    return redirect('dossiers:suivi_tache', tache_id=tache.id)
 
 @login_required
 def rapports_statistiques(request):
@@ -315,26 +428,11 @@ def rapports_statistiques(request):
         messages.error(request, "Accès non autorisé")
         return redirect('dossiers:dashboard')
     
-    # Statistiques générales
-    total_dossiers = Dossier.objects.count()
-    dossiers_non_traites = Dossier.objects.filter(statut='non_traite').count()
-    dossiers_en_cours = Dossier.objects.filter(statut='en_cours').count()
-    dossiers_traites = Dossier.objects.filter(statut='traite').count()
+    # Statistiques générales (une seule requête agrégée)
+    stats_dossiers = statistiques_dossiers()
     
-    # Statistiques par professeur
-    professeurs_stats = []
-    professeurs = CustomUser.objects.filter(role='professeur')
-    for prof in professeurs:
-        dossiers_assignes = prof.dossiers_attribues.count()
-        dossiers_traites_prof = prof.dossiers_attribues.filter(statut='traite').count()
-        taux_traitement = (dossiers_traites_prof / dossiers_assignes * 100) if dossiers_assignes > 0 else 0
-        
-        professeurs_stats.append({
-            'professeur': prof,
-            'dossiers_assignes': dossiers_assignes,
-            'dossiers_traites': dossiers_traites_prof,
-            'taux_traitement': round(taux_traitement, 1)
-        })
+    # Statistiques par professeur (table dénormalisée ChargeProfesseur)
+    professeurs_stats = charges_professeurs()
     
     # Statistiques par mois
     from django.db.models import Count
@@ -349,36 +447,27 @@ def rapports_statistiques(request):
         non_traites=Count('id', filter=Q(statut='non_traite'))
     ).order_by('mois')
     
-    # Statistiques des évaluations (5 types de décisions)
-    total_evaluations = DecisionCommission.objects.count()
-    evaluations_completes = DecisionCommission.objects.filter(decision='equivalence_accorder').count()
-    evaluations_conditionnelles = DecisionCommission.objects.filter(decision='completement_dossier').count()
-    evaluations_invitation_soutenance = DecisionCommission.objects.filter(decision='invitation_soutenance').count()
-    evaluations_invitation_concours = DecisionCommission.objects.filter(decision='invitation_concours').count()
-    evaluations_refusees = DecisionCommission.objects.filter(decision='non_equivalent').count()
-    
-    # Moyenne des scores
-    if total_evaluations > 0:
-        moyenne_score = DecisionCommission.objects.aggregate(
-            moyenne=models.Avg('score_total')
-        )['moyenne']
-    else:
-        moyenne_score = 0
+    # Statistiques des évaluations (5 types de décisions + moyenne des scores, une seule requête agrégée)
+    stats_decisions = statistiques_decisions()
+    moyenne_score = stats_decisions['moyenne_score']
     
     context = {
-        'total_dossiers': total_dossiers,
-        'dossiers_non_traites': dossiers_non_traites,
-        'dossiers_en_cours': dossiers_en_cours,
-        'dossiers_traites': dossiers_traites,
+        'total_dossiers': stats_dossiers['total'],
+        'dossiers_non_traites': stats_dossiers['non_traite'],
+        'dossiers_en_cours': stats_dossiers['en_cours'],
+        'dossiers_traites': stats_dossiers['traite'],
         'professeurs_stats': professeurs_stats,
         'dossiers_par_mois': dossiers_par_mois,
-        'total_evaluations': total_evaluations,
-        'evaluations_completes': evaluations_completes,
-        'evaluations_conditionnelles': evaluations_conditionnelles,
-        'evaluations_invitation_soutenance': evaluations_invitation_soutenance,
-        'evaluations_invitation_concours': evaluations_invitation_concours,
-        'evaluations_refusees': evaluations_refusees,
+        'total_evaluations': stats_decisions['total'],
+        'evaluations_completes': stats_decisions['equivalence_accorder'],
+        'evaluations_conditionnelles': stats_decisions['completement_dossier'],
+        'evaluations_invitation_soutenance': stats_decisions['invitation_soutenance'],
+        'evaluations_invitation_concours': stats_decisions['invitation_concours'],
+        'evaluations_refusees': stats_decisions['non_equivalent'],
         'moyenne_score': round(moyenne_score, 1) if moyenne_score else 0,
+        # Critères personnalisés (tables NoteCritere / CompetenceCochee, requêtes agrégées)
+        'stats_criteres': statistiques_criteres_personnalises(),
+        'competences_frequentes': candidats_par_competence(),
     }
     
     return render(request, 'dossiers/rapports_statistiques.html', context)
@@ -406,11 +495,8 @@ def admin_dossiers(request):
     if statut_filter:
         dossiers = dossiers.filter(statut=statut_filter)
     
-    # Calcul des statistiques
-    total_dossiers = Dossier.objects.count()
-    non_traites = Dossier.objects.filter(statut='non_traite').count()
-    en_cours = Dossier.objects.filter(statut='en_cours').count()
-    traites = Dossier.objects.filter(statut='traite').count()
+    # Calcul des statistiques (une seule requête agrégée)
+    stats_dossiers = statistiques_dossiers()
     
     # Statistiques des dossiers traités (import Excel)
     total_dossiers_traites = DossierTraite.objects.count()
@@ -419,10 +505,10 @@ def admin_dossiers(request):
         'dossiers': dossiers,
         'professeurs': professeurs,
         'statuts': Dossier.STATUT_CHOICES,
-        'total_dossiers': total_dossiers,
-        'non_traites': non_traites,
-        'en_cours': en_cours,
-        'traites': traites,
+        'total_dossiers': stats_dossiers['total'],
+        'non_traites': stats_dossiers['non_traite'],
+        'en_cours': stats_dossiers['en_cours'],
+        'traites': stats_dossiers['traite'],
         'total_dossiers_traites': total_dossiers_traites,
     }
     return render(request, 'dossiers/admin_dashboard.html', context)
@@ -450,17 +536,15 @@ def dossiers_traites(request):
     if professeur_filter:
         dossiers_traites = dossiers_traites.filter(professeurs__id=professeur_filter)
 
-    # Calcul des statistiques spécifiques aux dossiers traités
-    total_traites = Dossier.objects.filter(statut='traite').count()
-    traites_ce_mois = Dossier.objects.filter(statut='traite', date_reception__month=timezone.now().month).count()
-    traites_ce_semaine = Dossier.objects.filter(statut='traite', date_reception__gte=timezone.now() - timezone.timedelta(days=7)).count()
+    # Calcul des statistiques spécifiques aux dossiers traités (une seule requête agrégée)
+    stats_traites = statistiques_dossiers_traites()
 
     context = {
         'dossiers': dossiers_traites,
         'professeurs': professeurs,
-        'total_traites': total_traites,
-        'traites_ce_mois': traites_ce_mois,
-        'traites_ce_semaine': traites_ce_semaine,
+        'total_traites': stats_traites['total'],
+        'traites_ce_mois': stats_traites['ce_mois'],
+        'traites_ce_semaine': stats_traites['cette_semaine'],
     }
     return render(request, 'dossiers/dossiers_traites.html', context)
 
@@ -484,20 +568,17 @@ def gestion_dossiers(request):
     if date_filter:
         dossiers = dossiers.filter(date_reception=date_filter)
     
-    # Calcul des statistiques
-    total_dossiers = Dossier.objects.count()
-    non_traites = Dossier.objects.filter(statut='non_traite').count()
-    en_cours = Dossier.objects.filter(statut='en_cours').count()
-    traites = Dossier.objects.filter(statut='traite').count()
+    # Calcul des statistiques (une seule requête agrégée)
+    stats_dossiers = statistiques_dossiers()
     
     context = {
         'dossiers': dossiers,
         'professeurs': professeurs,
         'statuts': Dossier.STATUT_CHOICES,
-        'total_dossiers': total_dossiers,
-        'non_traites': non_traites,
-        'en_cours': en_cours,
-        'traites': traites,
+        'total_dossiers': stats_dossiers['total'],
+        'non_traites': stats_dossiers['non_traite'],
+        'en_cours': stats_dossiers['en_cours'],
+        'traites': stats_dossiers['traite'],
     }
     return render(request, 'dossiers/gestion_dossiers.html', context)
 
@@ -527,26 +608,15 @@ def ajouter_dossier(request):
             programme = request.FILES.get('programme')
             notes = request.FILES.get('notes')
             
+            # Une seule copie stockée par contenu ; aperçus générés en arrière-plan
             if diplome:
-                PieceJointe.objects.create(
-                    dossier=dossier,
-                    fichier=diplome,
-                    description="Diplôme"
-                )
+                enregistrer_piece_jointe(dossier, diplome, "Diplôme")
             
             if programme:
-                PieceJointe.objects.create(
-                    dossier=dossier,
-                    fichier=programme,
-                    description="Programme"
-                )
+                enregistrer_piece_jointe(dossier, programme, "Programme")
             
             if notes:
-                PieceJointe.objects.create(
-                    dossier=dossier,
-                    fichier=notes,
-                    description="Notes"
-                )
+                enregistrer_piece_jointe(dossier, notes, "Notes")
             
             messages.success(request, f"Dossier '{reference}' créé avec succès")
         except Exception as e:
@@ -570,19 +640,16 @@ def professeur_dossiers(request):
     if statut_filter:
         dossiers_attribues = dossiers_attribues.filter(statut=statut_filter)
     
-    # Calcul des statistiques
-    total_attribues = request.user.dossiers_attribues.count()
-    a_traiter = request.user.dossiers_attribues.filter(statut='non_traite').count()
-    en_cours = request.user.dossiers_attribues.filter(statut='en_cours').count()
-    termines = request.user.dossiers_attribues.filter(statut='traite').count()
+    # Calcul des statistiques (une seule requête agrégée)
+    stats_dossiers = statistiques_dossiers(request.user.dossiers_attribues.all())
     
     context = {
         'dossiers': dossiers_attribues,
         'statuts': Dossier.STATUT_CHOICES,
-        'total_attribues': total_attribues,
-        'a_traiter': a_traiter,
-        'en_cours': en_cours,
-        'termines': termines,
+        'total_attribues': stats_dossiers['total'],
+        'a_traiter': stats_dossiers['non_traite'],
+        'en_cours': stats_dossiers['en_cours'],
+        'termines': stats_dossiers['traite'],
         'notifications_recentes': request.user.notifications.filter(lu=False).order_by('-date_creation')[:3],
     }
     return render(request, 'dossiers/professeur_dashboard.html', context)
@@ -684,7 +751,7 @@ def affecter_dossier(request, dossier_id):
     
     if request.method == 'POST':
         professeur_ids = request.POST.getlist('professeurs')
-        professeurs = CustomUser.objects.filter(id__in=professeur_ids, role='professeur')
+        professeurs = list(CustomUser.objects.filter(id__in=professeur_ids, role='professeur'))
         
         dossier.professeurs.set(professeurs)
         dossier.statut = 'en_cours'
@@ -697,58 +764,35 @@ def affecter_dossier(request, dossier_id):
             action=f"Dossier affecté à {', '.join([p.username for p in professeurs])}"
         )
         
-        # Créer des notifications pour les professeurs
-        notifications_creees = 0
-        for professeur in professeurs:
-            try:
-                # Vérifier si une notification d'affectation existe déjà pour ce professeur et ce dossier
-                notification_existante = Notification.objects.filter(
-                    destinataire=professeur,
-                    dossier=dossier,
-                    type_notification='affectation'
-                ).first()
-                
-                if not notification_existante:
-                    creer_notification(
-                        destinataire=professeur,
-                        type_notification='affectation',
-                        titre=f"Nouveau dossier assigné",
-                        message=f"Le dossier '{dossier.titre}' vous a été assigné pour traitement.",
-                        dossier=dossier
-                    )
-                    notifications_creees += 1
-                else:
-                    # Mettre à jour la notification existante si nécessaire
-                    notification_existante.lu = False
-                    notification_existante.save()
-                    notifications_creees += 1
-                    
-            except Exception as e:
-                print(f"Erreur lors de la création de notification pour {professeur.username}: {e}")
-                # Continuer malgré l'erreur pour ne pas bloquer l'affectation
+        # Notifications d'affectation : réactiver celles qui existent déjà pour ce dossier,
+        # créer les autres en une seule insertion
+        notifications_existantes = Notification.objects.filter(
+            destinataire__in=professeurs,
+            dossier=dossier,
+            type_notification='affectation'
+        )
+        deja_notifies = set(notifications_existantes.values_list('destinataire_id', flat=True))
+        if deja_notifies:
+            notifications_existantes.update(lu=False)
+            Notification.invalider_compteurs(deja_notifies)
+        
+        creer_notifications_bulk(
+            [professeur for professeur in professeurs if professeur.pk not in deja_notifies],
+            type_notification='affectation',
+            titre=f"Nouveau dossier assigné",
+            message=f"Le dossier '{dossier.titre}' vous a été assigné pour traitement.",
+            dossier=dossier
+        )
         
         messages.success(request, f"Dossier affecté avec succès à {len(professeurs)} professeur(s).")
         return redirect('dossiers:dossier_detail', dossier_id=dossier.id)
     
-    # Calculer les statistiques des professeurs
-    professeurs = CustomUser.objects.filter(role='professeur')
-    professeurs_stats = []
-    
-    for professeur in professeurs:
-        dossiers_en_cours = professeur.dossiers_attribues.filter(statut='en_cours').count()
-        dossiers_traites = professeur.dossiers_attribues.filter(statut='traite').count()
-        total_dossiers = professeur.dossiers_attribues.count()
-        
-        professeurs_stats.append({
-            'professeur': professeur,
-            'dossiers_en_cours': dossiers_en_cours,
-            'dossiers_traites': dossiers_traites,
-            'total_dossiers': total_dossiers,
-        })
+    # Statistiques des professeurs (table dénormalisée ChargeProfesseur)
+    professeurs_stats = charges_professeurs()
     
     context = {
         'dossier': dossier,
-        'professeurs': professeurs,
+        'professeurs': [stat['professeur'] for stat in professeurs_stats],
         'professeurs_stats': professeurs_stats,
     }
     return render(request, 'dossiers/affecter_dossier.html', context)
@@ -846,6 +890,16 @@ def etat_dossier(request, dossier_id):
     }
     return render(request, 'dossiers/etat_dossier.html', context)
 
+def _admin_affecteur(dossier):
+    """Admin qui a affecté le dossier (historique), à défaut le premier administrateur"""
+    historique_affectation = HistoriqueAction.objects.filter(
+        dossier=dossier,
+        action__icontains='affecté'
+    ).select_related('utilisateur').order_by('-date_action').first()
+    if historique_affectation:
+        return historique_affectation.utilisateur
+    return CustomUser.objects.filter(role='admin').first()
+
 @login_required
 def consistance_academique(request, dossier_id):
     dossier = get_object_or_404(Dossier, id=dossier_id)
@@ -874,94 +928,10 @@ def consistance_academique(request, dossier_id):
         consistance = ConsistanceAcademique(candidat=candidat)
         consistance.save()  # Créer l'objet d'abord
     
-    # Récupérer la structure globale mise à jour par l'admin
-    try:
-        structure_globale = StructureEvaluationGlobale.objects.first()
-        if not structure_globale:
-            # Créer une structure par défaut si elle n'existe pas
-            structure_globale = StructureEvaluationGlobale.objects.create()
-        
-        # S'assurer que les champs JSON ne sont pas None
-        if structure_globale.competences_criteres_fixes is None:
-            structure_globale.competences_criteres_fixes = {}
-        if structure_globale.criteres_fixes_supprimes is None:
-            structure_globale.criteres_fixes_supprimes = []
-        if structure_globale.criteres_personnalises_globaux is None:
-            structure_globale.criteres_personnalises_globaux = []
-        
-        # Trier les critères personnalisés par ordre d'ajout (par ID) pour garantir l'ordre d'affichage
-        if structure_globale.criteres_personnalises_globaux:
-            structure_globale.criteres_personnalises_globaux.sort(key=lambda x: x.get('id', 0))
-        
-        # Initialiser les compétences par défaut si elles n'existent pas
-        if 'sciences_geodesiques' not in structure_globale.competences_criteres_fixes or not structure_globale.competences_criteres_fixes['sciences_geodesiques']:
-            structure_globale.competences_criteres_fixes['sciences_geodesiques'] = [
-                "Théorique et pratique de la géodésie",
-                "Mesures géodésiques", 
-                "Calculs géodésiques"
-            ]
-        if 'topographie' not in structure_globale.competences_criteres_fixes or not structure_globale.competences_criteres_fixes['topographie']:
-            structure_globale.competences_criteres_fixes['topographie'] = [
-                "Théorique et pratique de la topographie",
-                "Topométrique et instrumentation",
-                "Techniques de mensuration"
-            ]
-        if 'photogrammetrie' not in structure_globale.competences_criteres_fixes or not structure_globale.competences_criteres_fixes['photogrammetrie']:
-            structure_globale.competences_criteres_fixes['photogrammetrie'] = [
-                "Base et approfondie de la photogrammétrie",
-                "Mise en place des photographies aériennes",
-                "Aérotriangulation",
-                "Restitution photogrammétrique",
-                "Génération de produits dérivés (MNT/Ortho)",
-                "Drone"
-            ]
-        if 'cartographie' not in structure_globale.competences_criteres_fixes or not structure_globale.competences_criteres_fixes['cartographie']:
-            structure_globale.competences_criteres_fixes['cartographie'] = [
-                "Théorique et pratique de la cartographie",
-                "Techniques de cartographie",
-                "Produits cartographiques"
-            ]
-        if 'droit_foncier' not in structure_globale.competences_criteres_fixes or not structure_globale.competences_criteres_fixes['droit_foncier']:
-            structure_globale.competences_criteres_fixes['droit_foncier'] = [
-                "Droit foncier",
-                "Cadastre",
-                "Aménagements fonciers"
-            ]
-        if 'sig' not in structure_globale.competences_criteres_fixes or not structure_globale.competences_criteres_fixes['sig']:
-            structure_globale.competences_criteres_fixes['sig'] = [
-                "Systèmes d'Information Géographique",
-                "Applications SIG",
-                "Analyse spatiale"
-            ]
-        if 'teledetection' not in structure_globale.competences_criteres_fixes or not structure_globale.competences_criteres_fixes['teledetection']:
-            structure_globale.competences_criteres_fixes['teledetection'] = [
-                "Télédétection",
-                "Traitement d'images",
-                "Applications de télédétection"
-            ]
-            
-    except Exception as e:
-        print(f"Erreur lors de la récupération de la structure globale: {e}")
-        # Créer une structure temporaire par défaut
-        class StructureTemporaire:
-            def __init__(self):
-                self.sciences_geodesiques_note_max = 15
-                self.topographie_note_max = 16
-                self.photogrammetrie_note_max = 15
-                self.cartographie_note_max = 12
-                self.droit_foncier_note_max = 10
-                self.sig_note_max = 12
-                self.teledetection_note_max = 10
-                self.stages_note_max = 10
-                self.criteres_personnalises_globaux = []
-                self.competences_criteres_fixes = {}
-                self.criteres_fixes_supprimes = []
-                self.date_modification = timezone.now()
-        structure_globale = StructureTemporaire()
-        
-        # Trier les critères personnalisés par ordre d'ajout (par ID) pour garantir l'ordre d'affichage
-        if structure_globale.criteres_personnalises_globaux:
-            structure_globale.criteres_personnalises_globaux.sort(key=lambda x: x.get('id', 0))
+    # Structure globale mise à jour par l'admin, déjà normalisée (en cache jusqu'à sa prochaine modification)
+    structure_globale = structure_evaluation().affichage
+    # Consistance affichée dans le formulaire : la saisie refusée est réaffichée, sans être enregistrée
+    consistance_affichee = consistance
     
     if request.method == 'POST':
         # VÉRIFIER si c'est un retour à l'admin
@@ -969,24 +939,10 @@ def consistance_academique(request, dossier_id):
             # RETOUR À L'ADMIN : Traitement spécial sans toucher aux notes
             message_professeur = request.POST.get('message_professeur', '').strip()
             
-            # Créer notification directement et rediriger
-            historique_affectation = HistoriqueAction.objects.filter(
-                dossier=dossier,
-                action__icontains='affecté'
-            ).order_by('-date_action').first()
-            
-            if historique_affectation:
-                admin_affecteur = historique_affectation.utilisateur
-            else:
-                admins = CustomUser.objects.filter(role='admin')
-                admin_affecteur = admins.first() if admins.exists() else None
-            
+            admin_affecteur = _admin_affecteur(dossier)
             if admin_affecteur:
-                # Récupérer la note actuelle SANS la modifier
-                consistance_actuelle = ConsistanceAcademique.objects.get(candidat=candidat)
-                note_totale_actuelle = consistance_actuelle.note_totale
-                
-                message_base = f"Le professeur {request.user.get_full_name() or request.user.username} a terminé l'évaluation du dossier '{dossier.titre}' et demande la validation. Score total : {note_totale_actuelle}/100 points."
+                # Note actuelle SANS la modifier : le score stocké de la consistance déjà chargée
+                message_base = f"Le professeur {request.user.get_full_name() or request.user.username} a terminé l'évaluation du dossier '{dossier.titre}' et demande la validation. Score total : {consistance.note_totale}/100 points."
                 
                 if message_professeur:
                     message_base += f"\n\nMessage du professeur : {message_professeur}"
@@ -1002,409 +958,48 @@ def consistance_academique(request, dossier_id):
             
             return redirect('dossiers:dossier_detail', dossier_id=dossier_id)
         
-        # VALIDATION DES NOTES OBLIGATOIRES
-        notes_manquantes = []
-        
-        # Vérifier les critères fixes obligatoires
-        if 'sciences_geodesiques' not in structure_globale.criteres_fixes_supprimes:
-            if not request.POST.get('sciences_geodesiques_note') or not request.POST.get('sciences_geodesiques_note').strip():
-                notes_manquantes.append("Sciences géodésiques")
-        
-        if 'topographie' not in structure_globale.criteres_fixes_supprimes:
-            if not request.POST.get('topographie_note') or not request.POST.get('topographie_note').strip():
-                notes_manquantes.append("Topographie")
-        
-        if 'photogrammetrie' not in structure_globale.criteres_fixes_supprimes:
-            if not request.POST.get('photogrammetrie_note') or not request.POST.get('photogrammetrie_note').strip():
-                notes_manquantes.append("Photogrammétrie")
-        
-        if 'cartographie' not in structure_globale.criteres_fixes_supprimes:
-            if not request.POST.get('cartographie_note') or not request.POST.get('cartographie_note').strip():
-                notes_manquantes.append("Cartographie")
-        
-        if 'droit_foncier' not in structure_globale.criteres_fixes_supprimes:
-            if not request.POST.get('droit_foncier_note') or not request.POST.get('droit_foncier_note').strip():
-                notes_manquantes.append("Droit foncier")
-        
-        if 'sig' not in structure_globale.criteres_fixes_supprimes:
-            if not request.POST.get('sig_note') or not request.POST.get('sig_note').strip():
-                notes_manquantes.append("SIG")
-        
-        if 'teledetection' not in structure_globale.criteres_fixes_supprimes:
-            if not request.POST.get('teledetection_note') or not request.POST.get('teledetection_note').strip():
-                notes_manquantes.append("Télédétection")
-        
-        # Vérifier la note des stages
-        if not request.POST.get('stages_note') or not request.POST.get('stages_note').strip():
-            notes_manquantes.append("Stages")
-        
-        # Vérifier les notes des critères personnalisés
-        if structure_globale.criteres_personnalises_globaux:
-            for critere in structure_globale.criteres_personnalises_globaux:
-                critere_id = critere.get('id')
-                note_critere = request.POST.get(f'note_critere_personnalise_{critere_id}')
-                if not note_critere or not note_critere.strip():
-                    notes_manquantes.append(f"Critère personnalisé : {critere.get('nom')}")
-        
-        # Si des notes sont manquantes, afficher l'erreur et ne pas sauvegarder
-        if notes_manquantes:
-            messages.error(request, f"❌ ERREUR : Vous devez remplir TOUTES les notes obligatoires !\n\nNotes manquantes : {', '.join(notes_manquantes)}")
-            return render(request, 'dossiers/consistance_academique.html', context)
-        
-        # SAUVEGARDE NORMALE DES NOTES (seulement si pas de retour admin)
-        # Sciences géodésiques
-        sciences_geodesiques_note = request.POST.get('sciences_geodesiques_note')
-        consistance.sciences_geodesiques_contenus = request.POST.get('sciences_geodesiques_contenus', '')
-        consistance.sciences_geodesiques_commentaires = request.POST.get('sciences_geodesiques_commentaires', '')
-        
-        if sciences_geodesiques_note and sciences_geodesiques_note.strip():
-            try:
-                note_saisie = int(sciences_geodesiques_note)
-                note_max = structure_globale.sciences_geodesiques_note_max
-                if note_saisie < 0 or note_saisie > note_max:
-                    messages.error(request, f"❌ ERREUR : La note pour Sciences géodésiques doit être entre 0 et {note_max} (saisie: {note_saisie})")
-                    return render(request, 'dossiers/consistance_academique.html', context)
-                consistance.sciences_geodesiques_note = note_saisie
-            except ValueError:
-                messages.error(request, "❌ ERREUR : La note pour Sciences géodésiques doit être un nombre entier valide")
-                return render(request, 'dossiers/consistance_academique.html', context)
-        else:
-            consistance.sciences_geodesiques_note = None
-        
-        # Topographie
-        topographie_note = request.POST.get('topographie_note')
-        consistance.topographie_contenus = request.POST.get('topographie_contenus', '')
-        consistance.topographie_commentaires = request.POST.get('topographie_commentaires', '')
-        
-        if topographie_note and topographie_note.strip():
-            try:
-                note_saisie = int(topographie_note)
-                note_max = structure_globale.topographie_note_max
-                if note_saisie < 0 or note_saisie > note_max:
-                    messages.error(request, f"❌ ERREUR : La note pour Topographie doit être entre 0 et {note_max} (saisie: {note_saisie})")
-                    return render(request, 'dossiers/consistance_academique.html', context)
-                consistance.topographie_note = note_saisie
-            except ValueError:
-                messages.error(request, "❌ ERREUR : La note pour Topographie doit être un nombre entier valide")
-                return render(request, 'dossiers/consistance_academique.html', context)
-        else:
-            consistance.topographie_note = None
-
-        
-        # Photogrammétrie
-        consistance.photogrammetrie_contenus = request.POST.get('photogrammetrie_contenus', '')
-        consistance.photogrammetrie_commentaires = request.POST.get('photogrammetrie_commentaires', '')
-        photogrammetrie_note = request.POST.get('photogrammetrie_note')
-        
-        if photogrammetrie_note and photogrammetrie_note.strip():
-            try:
-                note_saisie = int(photogrammetrie_note)
-                note_max = structure_globale.photogrammetrie_note_max
-                if note_saisie < 0 or note_saisie > note_max:
-                    messages.error(request, f"❌ ERREUR : La note pour Photogrammétrie doit être entre 0 et {note_max} (saisie: {note_saisie})")
-                    return render(request, 'dossiers/consistance_academique.html', context)
-                consistance.photogrammetrie_note = note_saisie
-            except ValueError:
-                messages.error(request, "❌ ERREUR : La note pour Photogrammétrie doit être un nombre entier valide")
-                return render(request, 'dossiers/consistance_academique.html', context)
-        else:
-            consistance.photogrammetrie_note = None
-        
-        # Checkboxes Photogrammétrie
-        consistance.photogrammetrie_base_approfondie = 'photogrammetrie_base_approfondie' in request.POST
-        consistance.photogrammetrie_photographies_aeriennes = 'photogrammetrie_photographies_aeriennes' in request.POST
-        consistance.photogrammetrie_aerotriangulation = 'photogrammetrie_aerotriangulation' in request.POST
-        consistance.photogrammetrie_restitution = 'photogrammetrie_restitution' in request.POST
-        consistance.photogrammetrie_produits_derives = 'photogrammetrie_produits_derives' in request.POST
-        consistance.photogrammetrie_drone = 'photogrammetrie_drone' in request.POST
-        
-        # Cartographie
-        consistance.cartographie_contenus = request.POST.get('cartographie_contenus', '')
-        consistance.cartographie_commentaires = request.POST.get('cartographie_commentaires', '')
-        cartographie_note = request.POST.get('cartographie_note')
-        
-        if cartographie_note and cartographie_note.strip():
-            try:
-                note_saisie = int(cartographie_note)
-                note_max = structure_globale.cartographie_note_max
-                if note_saisie < 0 or note_saisie > note_max:
-                    messages.error(request, f"❌ ERREUR : La note pour Cartographie doit être entre 0 et {note_max} (saisie: {note_saisie})")
-                    return render(request, 'dossiers/consistance_academique.html', context)
-                consistance.cartographie_note = note_saisie
-            except ValueError:
-                messages.error(request, "❌ ERREUR : La note pour Cartographie doit être un nombre entier valide")
-                return render(request, 'dossiers/consistance_academique.html', context)
-        else:
-            consistance.cartographie_note = None
-        consistance.cartographie_drone = 'cartographie_drone' in request.POST
-        
-        # Droit foncier
-        consistance.droit_foncier_contenus = request.POST.get('droit_foncier_contenus', '')
-        consistance.droit_foncier_commentaires = request.POST.get('droit_foncier_commentaires', '')
-        droit_foncier_note = request.POST.get('droit_foncier_note')
-        
-        if droit_foncier_note and droit_foncier_note.strip():
-            try:
-                note_saisie = int(droit_foncier_note)
-                note_max = structure_globale.droit_foncier_note_max
-                if note_saisie < 0 or note_saisie > note_max:
-                    messages.error(request, f"❌ ERREUR : La note pour Droit foncier doit être entre 0 et {note_max} (saisie: {note_saisie})")
-                    return render(request, 'dossiers/consistance_academique.html', context)
-                consistance.droit_foncier_note = note_saisie
-            except ValueError:
-                messages.error(request, "❌ ERREUR : La note pour Droit foncier doit être un nombre entier valide")
-                return render(request, 'dossiers/consistance_academique.html', context)
-        else:
-            consistance.droit_foncier_note = None
-        
-        # SIG
-        consistance.sig_contenus = request.POST.get('sig_contenus', '')
-        consistance.sig_commentaires = request.POST.get('sig_commentaires', '')
-        sig_note = request.POST.get('sig_note')
-        
-        if sig_note and sig_note.strip():
-            try:
-                note_saisie = int(sig_note)
-                note_max = structure_globale.sig_note_max
-                if note_saisie < 0 or note_saisie > note_max:
-                    messages.error(request, f"❌ ERREUR : La note pour SIG doit être entre 0 et {note_max} (saisie: {note_saisie})")
-                    return render(request, 'dossiers/consistance_academique.html', context)
-                consistance.sig_note = note_saisie
-            except ValueError:
-                messages.error(request, "❌ ERREUR : La note pour SIG doit être un nombre entier valide")
-                return render(request, 'dossiers/consistance_academique.html', context)
-        else:
-            consistance.sig_note = None
-        
-        # Télédétection
-        consistance.teledetection_contenus = request.POST.get('teledetection_contenus', '')
-        consistance.teledetection_commentaires = request.POST.get('teledetection_commentaires', '')
-        teledetection_note = request.POST.get('teledetection_note')
-        
-        if teledetection_note and teledetection_note.strip():
-            try:
-                note_saisie = int(teledetection_note)
-                note_max = structure_globale.teledetection_note_max
-                if note_saisie < 0 or note_saisie > note_max:
-                    messages.error(request, f"❌ ERREUR : La note pour Télédétection doit être entre 0 et {note_max} (saisie: {note_saisie})")
-                    return render(request, 'dossiers/consistance_academique.html', context)
-                consistance.teledetection_note = note_saisie
-            except ValueError:
-                messages.error(request, "❌ ERREUR : La note pour Télédétection doit être un nombre entier valide")
-                return render(request, 'dossiers/consistance_academique.html', context)
-        else:
-            consistance.teledetection_note = None
-        
-        # Stages et professionnalisation
-        consistance.stages_contenus = request.POST.get('stages_contenus', '')
-        consistance.stages_commentaires = request.POST.get('stages_commentaires', '')
-        stages_note = request.POST.get('stages_note')
-        
-        if stages_note and stages_note.strip():
-            try:
-                note_saisie = int(stages_note)
-                note_max = structure_globale.stages_note_max
-                if note_saisie < 0 or note_saisie > note_max:
-                    messages.error(request, f"❌ ERREUR : La note pour Stages doit être entre 0 et {note_max} (saisie: {note_saisie})")
-                    return render(request, 'dossiers/consistance_academique.html', context)
-                consistance.stages_note = note_saisie
-            except ValueError:
-                messages.error(request, "❌ ERREUR : La note pour Stages doit être un nombre entier valide")
-                return render(request, 'dossiers/consistance_academique.html', context)
+        # Lecture et validation de toute la saisie en une passe : en cas d'erreur rien n'est enregistré
+        evaluation = structure_evaluation()
+        saisie = lire_formulaire_consistance(
+            request.POST, consistance, structure_globale, evaluation.bareme, est_admin=request.user.role == 'admin'
+        )
+        if saisie.erreurs:
+            for erreur in saisie.erreurs:
+                messages.error(request, erreur)
+            consistance_affichee = consistance_avec_saisie(consistance, saisie, request.POST, evaluation.bareme)
         else:
-            consistance.stages_note = None
-        
-        # Stages par défaut (seulement s'ils ne sont pas supprimés par l'admin)
-        if not hasattr(structure_globale, 'stages_defaut_supprimes') or structure_globale.stages_defaut_supprimes is None:
-            structure_globale.stages_defaut_supprimes = []
-            
-        if 'stage_conservation_fonciere' not in structure_globale.stages_defaut_supprimes:
-            consistance.stage_conservation_fonciere = 'stage_conservation_fonciere' in request.POST
-        if 'stage_cadastre' not in structure_globale.stages_defaut_supprimes:
-            consistance.stage_cadastre = 'stage_cadastre' in request.POST
-        if 'stage_topographie' not in structure_globale.stages_defaut_supprimes:
-            consistance.stage_topographie = 'stage_topographie' in request.POST
-        if 'stage_geodesie' not in structure_globale.stages_defaut_supprimes:
-            consistance.stage_geodesie = 'stage_geodesie' in request.POST
-        if 'stage_photogrammetrie' not in structure_globale.stages_defaut_supprimes:
-            consistance.stage_photogrammetrie = 'stage_photogrammetrie' in request.POST
-        consistance.stage_techniques_cadastrales = 'stage_techniques_cadastrales' in request.POST
-        
-        # Stages configurables
-        stages_configurables_cochees = []
-        if hasattr(structure_globale, 'stages_configurables') and structure_globale.stages_configurables:
-            for stage in structure_globale.stages_configurables:
-                if request.POST.get(f'stage_configurable_{stage["id"]}'):
-                    stages_configurables_cochees.append(stage["id"])
-        consistance.stages_configurables_cochees = stages_configurables_cochees
-        
-        # Gestion des boutons stages (nouveaux champs) - mutuellement exclusifs
-        stages_status = request.POST.get('stages_status')
-        consistance.stages_acheves = stages_status == 'acheves'
-        consistance.stages_non_acheves = stages_status == 'non_acheves'
-        consistance.message_stages_non_acheves = request.POST.get('message_stages_non_acheves', '')
-        
-        # Gestion des critères personnalisés (seuls les administrateurs peuvent ajouter/supprimer)
-        action_critere = request.POST.get('action_critere')
-        if action_critere == 'ajouter' and request.user.role == 'admin':
-            nom_critere = request.POST.get('nom_critere_personnalise', '').strip()
-            note_max_critere = request.POST.get('note_max_critere_personnalise', 0)
-            if nom_critere and note_max_critere:
-                try:
-                    note_max = int(note_max_critere)
-                    nouveau_critere = {
-                        'id': len(consistance.criteres_personnalises) + 1,
-                        'nom': nom_critere,
-                        'note_max': note_max,
-                        'note': None,
-                        'contenus': '',
-                        'commentaires': ''
-                    }
-                    consistance.criteres_personnalises.append(nouveau_critere)
-                    messages.success(request, f"Critère '{nom_critere}' ajouté avec succès.")
-                except ValueError:
-                    pass
-        elif action_critere == 'supprimer' and request.user.role == 'admin':
-            critere_id = request.POST.get('critere_id')
-            if critere_id:
-                try:
-                    critere_id = int(critere_id)
-                    critere_a_supprimer = None
-                    for critere in consistance.criteres_personnalises:
-                        if critere.get('id') == critere_id:
-                            critere_a_supprimer = critere
-                            break
-                    
-                    if critere_a_supprimer:
-                        consistance.criteres_personnalises = [
-                            c for c in consistance.criteres_personnalises 
-                            if c.get('id') != critere_id
-                        ]
-                        messages.success(request, f"Critère '{critere_a_supprimer.get('nom')}' supprimé avec succès.")
-                except ValueError:
-                    pass
-        
-        # Gestion des compétences pour chaque critère personnalisé (seuls les administrateurs peuvent ajouter/supprimer)
-        for critere in consistance.criteres_personnalises:
-            critere_id = critere.get('id')
-            # Initialisation des listes si absentes
-            if 'competences' not in critere:
-                critere['competences'] = []
-            if 'competences_cochees' not in critere:
-                critere['competences_cochees'] = []
-            
-            # Ajout d'une compétence (seuls les administrateurs)
-            if request.POST.get(f'ajouter_competence_{critere_id}') and request.user.role == 'admin':
-                nouvelle_comp = request.POST.get(f'nouvelle_competence_{critere_id}', '').strip()
-                if nouvelle_comp:
-                    critere['competences'].append(nouvelle_comp)
-                    messages.success(request, f"Compétence '{nouvelle_comp}' ajoutée au critère '{critere.get('nom')}'.")
-            
-            # Suppression d'une compétence (seuls les administrateurs)
-            for idx, comp in enumerate(critere['competences']):
-                if request.POST.get(f'supprimer_competence_{critere_id}_{idx}') and request.user.role == 'admin':
-                    critere['competences'].pop(idx)
-                    # On retire aussi l'index des cochées si besoin
-                    if idx in critere['competences_cochees']:
-                        critere['competences_cochees'].remove(idx)
-                    messages.success(request, f"Compétence '{comp}' supprimée du critère '{critere.get('nom')}'.")
-                    break
-            # Gestion des cases cochées
-            competences_cochees = []
-            for idx in range(len(critere['competences'])):
-                if request.POST.get(f'competence_{critere_id}_{idx}'):
-                    competences_cochees.append(idx)
-            critere['competences_cochees'] = competences_cochees
-            
-            # Récupération de la note saisie manuellement par le professeur
-            note_critere = request.POST.get(f'note_critere_personnalise_{critere_id}')
-            if note_critere and note_critere.strip():
-                try:
-                    note_saisie = int(note_critere)
-                    note_max = critere.get('note_max', 10)
-                    
-                    # Vérifier que la note ne dépasse pas la note maximale définie par l'admin
-                    if note_saisie < 0:
-                        messages.error(request, f"❌ ERREUR : La note pour '{critere.get('nom')}' ne peut pas être négative (saisie: {note_saisie})")
-                        return render(request, 'dossiers/consistance_academique.html', context)
-                    elif note_saisie > note_max:
-                        messages.error(request, f"❌ ERREUR : La note pour '{critere.get('nom')}' ne peut pas dépasser {note_max} (saisie: {note_saisie})")
-                        return render(request, 'dossiers/consistance_academique.html', context)
-                    else:
-                        critere['note'] = note_saisie
-                except ValueError:
-                    messages.error(request, f"❌ ERREUR : La note pour '{critere.get('nom')}' doit être un nombre entier valide")
-                    return render(request, 'dossiers/consistance_academique.html', context)
-            else:
-                critere['note'] = None
-        
-        # SAUVEGARDE DIRECTE ET SIMPLE
-        consistance.save()
-        
-        # Forcer une transaction commit
-        from django.db import transaction
-        transaction.commit()
-        
-        # Évaluer les critères obligatoires
-        evaluation_resultats = consistance.evaluer_criteres_obligatoires()
-        
-        # Vérifier si le dossier est complètement traité (au moins une note saisie)
-        notes_saisies = any([
-            consistance.sciences_geodesiques_note is not None,
-            consistance.topographie_note is not None,
-            consistance.photogrammetrie_note is not None,
-            consistance.cartographie_note is not None,
-            consistance.droit_foncier_note is not None,
-            consistance.sig_note is not None,
-            consistance.teledetection_note is not None,
-            consistance.stages_note is not None
-        ])
-        
-
-        
-        # Traitement normal des notifications après sauvegarde
-        if notes_saisies:
-            # Créer une notification pour l'admin qui a affecté le dossier
-            # Chercher l'admin qui a affecté le dossier via l'historique
-            historique_affectation = HistoriqueAction.objects.filter(
-                dossier=dossier,
-                action__icontains='affecté'
-            ).order_by('-date_action').first()
+            enregistrer_consistance(consistance, saisie)
+            for information in saisie.informations:
+                messages.success(request, information)
+            
+            # Vérifier si le dossier est complètement traité (au moins une note saisie)
+            notes_saisies = any(getattr(consistance, critere.champ_note) is not None for critere in evaluation.bareme.criteres)
             
-            # Si pas d'historique, chercher tous les admins
-            if historique_affectation:
-                admin_affecteur = historique_affectation.utilisateur
+            # Notifier l'admin qui a affecté le dossier, avec le score calculé à l'enregistrement
+            if notes_saisies:
+                admin_affecteur = _admin_affecteur(dossier)
+                if admin_affecteur:
+                    creer_notification(
+                        destinataire=admin_affecteur,
+                        type_notification='traitement',
+                        titre=f"Dossier prêt pour validation : {dossier.titre}",
+                        message=f"Le professeur {request.user.get_full_name() or request.user.username} a terminé l'évaluation du dossier '{dossier.titre}'. Score total : {consistance.note_totale}/100 points. Le dossier est prêt pour validation et transfert vers les dossiers traités.",
+                        dossier=dossier
+                    )
+                    
+                    messages.success(request, f"Consistance académique mise à jour avec succès. Notification envoyée à l'administrateur pour validation.")
+                else:
+                    messages.error(request, "Aucun administrateur trouvé pour recevoir la notification.")
             else:
-                # Fallback : chercher tous les admins
-                admins = CustomUser.objects.filter(role='admin')
-                admin_affecteur = admins.first() if admins.exists() else None
+                messages.success(request, "Consistance académique mise à jour avec succès.")
             
-            if admin_affecteur:
-                creer_notification(
-                    destinataire=admin_affecteur,
-                    type_notification='traitement',
-                    titre=f"Dossier prêt pour validation : {dossier.titre}",
-                    message=f"Le professeur {request.user.get_full_name() or request.user.username} a terminé l'évaluation du dossier '{dossier.titre}'. Score total : {consistance.note_totale}/100 points. Le dossier est prêt pour validation et transfert vers les dossiers traités.",
-                    dossier=dossier
-                )
-                
-                messages.success(request, f"Consistance académique mise à jour avec succès. Notification envoyée à l'administrateur pour validation.")
+            if consistance.criteres_obligatoires_acquis:
+                messages.success(request, "Tous les critères obligatoires sont acquis.")
             else:
-                messages.error(request, "Aucun administrateur trouvé pour recevoir la notification.")
-        else:
-            messages.success(request, "Consistance académique mise à jour avec succès.")
+                criteres_non_acquis = ", ".join(consistance.criteres_non_acquis)
+                messages.error(request, f"⚠️ CRITÈRES OBLIGATOIRES NON ACQUIS : {criteres_non_acquis}. Le dossier sera automatiquement jugé insuffisant même avec un score total élevé (76-100 points).")
             
-
-        
-        if evaluation_resultats['dossier_suffisant']:
-            messages.success(request, "Tous les critères obligatoires sont acquis.")
-        else:
-            criteres_non_acquis = ", ".join(evaluation_resultats['criteres_non_acquis'])
-            messages.error(request, f"⚠️ CRITÈRES OBLIGATOIRES NON ACQUIS : {criteres_non_acquis}. Le dossier sera automatiquement jugé insuffisant même avec un score total élevé (76-100 points).")
-        
-        # Plus de traitement de retour admin ici - déjà fait au début
-        
-        return redirect('dossiers:dossier_detail', dossier_id=dossier_id)
+            return redirect('dossiers:dossier_detail', dossier_id=dossier_id)
     
     # Évaluer les critères obligatoires pour l'affichage
     evaluation_resultats = consistance.evaluer_criteres_obligatoires()
@@ -1452,94 +1047,15 @@ def consistance_academique(request, dossier_id):
         "Applications de télédétection"
     ]
     
-    # Créer les listes de compétences cochées basées sur les champs booléens du modèle
-    sciences_geodesiques_competences_cochees = []
-    if consistance.sciences_geodesie_geometrique:
-        sciences_geodesiques_competences_cochees.append(0)
-    if consistance.sciences_astronomie_geodesie_spatiale:
-        sciences_geodesiques_competences_cochees.append(1)
-    if consistance.sciences_geodesie_physique:
-        sciences_geodesiques_competences_cochees.append(2)
-    if consistance.sciences_ajustements_compensations:
-        sciences_geodesiques_competences_cochees.append(3)
-    if consistance.sciences_systemes_referentiels:
-        sciences_geodesiques_competences_cochees.append(4)
-    if consistance.sciences_projections_cartographiques:
-        sciences_geodesiques_competences_cochees.append(5)
-    if consistance.sciences_geodesie_appliquee:
-        sciences_geodesiques_competences_cochees.append(6)
-    if consistance.sciences_gnss:
-        sciences_geodesiques_competences_cochees.append(7)
-    if consistance.sciences_micro_geodesie:
-        sciences_geodesiques_competences_cochees.append(8)
-
-    topographie_competences_cochees = []
-    if consistance.topographie_theorique_pratique:
-        topographie_competences_cochees.append(0)
-    if consistance.topographie_topometrique_instrumentation:
-        topographie_competences_cochees.append(1)
-    if consistance.topographie_techniques_mensuration:
-        topographie_competences_cochees.append(2)
-
-    photogrammetrie_competences_cochees = []
-    if consistance.photogrammetrie_base_approfondie:
-        photogrammetrie_competences_cochees.append(0)
-    if consistance.photogrammetrie_photographies_aeriennes:
-        photogrammetrie_competences_cochees.append(1)
-    if consistance.photogrammetrie_aerotriangulation:
-        photogrammetrie_competences_cochees.append(2)
-    if consistance.photogrammetrie_restitution:
-        photogrammetrie_competences_cochees.append(3)
-    if consistance.photogrammetrie_produits_derives:
-        photogrammetrie_competences_cochees.append(4)
-    if consistance.photogrammetrie_drone:
-        photogrammetrie_competences_cochees.append(5)
-
-    cartographie_competences_cochees = []
-    if consistance.cartographie_topographique:
-        cartographie_competences_cochees.append(0)
-    if consistance.cartographie_representation_cartographique:
-        cartographie_competences_cochees.append(1)
-    if consistance.cartographie_thematique:
-        cartographie_competences_cochees.append(2)
-    if consistance.cartographie_semiologie_langage:
-        cartographie_competences_cochees.append(3)
-    if consistance.cartographie_dao_cao:
-        cartographie_competences_cochees.append(4)
-    if consistance.cartographie_drone:
-        cartographie_competences_cochees.append(5)
-
-    droit_foncier_competences_cochees = []
-    if consistance.droit_foncier_droit:
-        droit_foncier_competences_cochees.append(0)
-    if consistance.droit_foncier_techniques_cadastrales:
-        droit_foncier_competences_cochees.append(1)
-    if consistance.droit_foncier_gestion_amenagement:
-        droit_foncier_competences_cochees.append(2)
-    if consistance.droit_foncier_reglementations:
-        droit_foncier_competences_cochees.append(3)
-
-    sig_competences_cochees = []
-    if consistance.sig_bases:
-        sig_competences_cochees.append(0)
-    if consistance.sig_gestion_analyse_donnees:
-        sig_competences_cochees.append(1)
-    if consistance.sig_bases_donnees_geographiques:
-        sig_competences_cochees.append(2)
-    if consistance.sig_web_mapping:
-        sig_competences_cochees.append(3)
-
-    teledetection_competences_cochees = []
-    if consistance.teledetection_bases_physiques:
-        teledetection_competences_cochees.append(0)
-    if consistance.teledetection_traitement_images:
-        teledetection_competences_cochees.append(1)
-    if consistance.teledetection_applications:
-        teledetection_competences_cochees.append(2)
-
+    # Créer les listes de compétences cochées basées sur les champs booléens du modèle (même table que la saisie)
+    competences_cochees = {
+        f'{cle}_competences_cochees': [index for index, champ in enumerate(champs) if getattr(consistance_affichee, champ)]
+        for cle, champs in COMPETENCES_FIXES.items()
+    }
+    
     context = {
         'dossier': dossier,
-        'consistance': consistance,
+        'consistance': consistance_affichee,
         'evaluation_resultats': evaluation_resultats,
         'user': request.user,
         'interpretation_globale': interpretation_globale,
@@ -1551,13 +1067,7 @@ def consistance_academique(request, dossier_id):
         'compétences_droit_foncier': compétences_droit_foncier,
         'compétences_sig': compétences_sig,
         'compétences_teledetection': compétences_teledetection,
-        'sciences_geodesiques_competences_cochees': sciences_geodesiques_competences_cochees,
-        'topographie_competences_cochees': topographie_competences_cochees,
-        'photogrammetrie_competences_cochees': photogrammetrie_competences_cochees,
-        'cartographie_competences_cochees': cartographie_competences_cochees,
-        'droit_foncier_competences_cochees': droit_foncier_competences_cochees,
-        'sig_competences_cochees': sig_competences_cochees,
-        'teledetection_competences_cochees': teledetection_competences_cochees,
+        **competences_cochees,
     }
     
     return render(request, 'dossiers/consistance_academique.html', context)
@@ -1616,15 +1126,13 @@ def traiter_dossier(request, dossier_id):
                     message_notification = f"Le dossier '{dossier.titre}' a été traité par {request.user.username}."
                     type_notif = 'traitement'
                 
-                admins = CustomUser.objects.filter(role='admin')
-                for admin in admins:
-                    creer_notification(
-                        destinataire=admin,
-                        type_notification=type_notif,
-                        titre=f"Dossier traité",
-                        message=message_notification,
-                        dossier=dossier
-                    )
+                creer_notifications_bulk(
+                    CustomUser.objects.filter(role='admin').values_list('id', flat=True),
+                    type_notification=type_notif,
+                    titre=f"Dossier traité",
+                    message=message_notification,
+                    dossier=dossier
+                )
             
             messages.success(request, "Statut du dossier mis à jour")
             return redirect('dossiers:dossier_detail', dossier_id=dossier.id)
@@ -1800,95 +1308,21 @@ def evaluation_equivalence(request, dossier_id):
         # Récupérer l'interprétation globale
         interpretation_globale = consistance.interpreter_resultats_globaux()
         
-        # Récupérer l'évaluation des critères obligatoires
-        evaluation_criteres = consistance.evaluer_criteres_obligatoires()
+        # Évaluation des critères avec le barème de la structure active (maxima et seuils configurés)
+        bareme = bareme_actif()
+        evaluation_criteres = consistance.evaluer_criteres_obligatoires(bareme)
         
         # Préparer les données pour l'affichage
         donnees_evaluation = []
-        
-        # REQUÊTE DIRECTE - Utiliser candidat_id pour être absolument sûr
-        from django.db import connection
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                SELECT sciences_geodesiques_note, topographie_note, photogrammetrie_note, 
-                       cartographie_note, droit_foncier_note, sig_note, teledetection_note, stages_note
-                FROM dossiers_consistanceacademique 
-                WHERE candidat_id = %s
-            """, [candidat.id])
-            
-            row = cursor.fetchone()
-            
-            if row:
-                sciences_note, topo_note, photo_note, carto_note, droit_note, sig_note, tele_note, stages_note = row
-            else:
-                sciences_note = topo_note = photo_note = carto_note = droit_note = sig_note = tele_note = stages_note = 0
-        
-
-        
-        # Utiliser les valeurs de la requête directe
-        donnees_evaluation.append({
-            'critere': 'Sciences géodésiques',
-            'note': sciences_note or 0,
-            'note_max': 16,
-            'commentaires': consistance.sciences_geodesiques_commentaires or '',
-            'acquis': (sciences_note or 0) >= 8  # 50% de 16
-        })
-        
-        donnees_evaluation.append({
-            'critere': 'Topographie', 
-            'note': topo_note or 0,
-            'note_max': 16,
-            'commentaires': consistance.topographie_commentaires or '',
-            'acquis': (topo_note or 0) >= 8
-        })
-        
-        donnees_evaluation.append({
-            'critere': 'Photogrammétrie',
-            'note': photo_note or 0,
-            'note_max': 16,
-            'commentaires': consistance.photogrammetrie_commentaires or '',
-            'acquis': (photo_note or 0) >= 8
-        })
-        
-        donnees_evaluation.append({
-            'critere': 'Cartographie',
-            'note': carto_note or 0,
-            'note_max': 16,
-            'commentaires': consistance.cartographie_commentaires or '',
-            'acquis': (carto_note or 0) >= 8
-        })
-        
-        donnees_evaluation.append({
-            'critere': 'Droit foncier',
-            'note': droit_note or 0,
-            'note_max': 10,
-            'commentaires': consistance.droit_foncier_commentaires or '',
-            'acquis': (droit_note or 0) >= 5
-        })
-        
-        donnees_evaluation.append({
-            'critere': 'SIG',
-            'note': sig_note or 0,
-            'note_max': 10,
-            'commentaires': consistance.sig_commentaires or '',
-            'acquis': True  # Non obligatoire
-        })
-        
-        donnees_evaluation.append({
-            'critere': 'Télédétection',
-            'note': tele_note or 0,
-            'note_max': 10,
-            'commentaires': consistance.teledetection_commentaires or '',
-            'acquis': True  # Non obligatoire
-        })
-        
-        donnees_evaluation.append({
-            'critere': 'Stages et professionnalisation',
-            'note': stages_note or 0,
-            'note_max': 10,
-            'commentaires': consistance.stages_commentaires or '',
-            'acquis': True  # Non obligatoire
-        })
+        for critere in bareme.criteres:
+            note = getattr(consistance, critere.champ_note) or 0
+            donnees_evaluation.append({
+                'critere': 'Stages et professionnalisation' if critere.cle == 'stages' else critere.libelle,
+                'note': note,
+                'note_max': critere.note_max,
+                'commentaires': getattr(consistance, f'{critere.cle}_commentaires') or '',
+                'acquis': note >= critere.note_min  # Toujours acquis pour les critères non obligatoires
+            })
         
         # Critères personnalisés
         for critere_perso in consistance.criteres_personnalises:
@@ -1901,13 +1335,7 @@ def evaluation_equivalence(request, dossier_id):
                     'acquis': True
                 })
         
-        # Recalculer la note totale depuis la DB
-        note_totale_reelle = (sciences_note or 0) + (topo_note or 0) + (photo_note or 0) + (carto_note or 0) + (droit_note or 0) + (sig_note or 0) + (tele_note or 0) + (stages_note or 0)
-        
-        # Ajouter les notes des critères personnalisés
-        for critere_perso in consistance.criteres_personnalises:
-            if critere_perso.get('note'):
-                note_totale_reelle += critere_perso.get('note', 0)
+        note_totale_reelle = consistance.note_totale
         
         # Récupérer la décision de la commission existante
         decision_commission = None
@@ -1936,12 +1364,7 @@ def evaluation_equivalence(request, dossier_id):
             pass
         
         # Récupérer la structure globale pour les stages configurables
-        try:
-            structure_globale = StructureEvaluationGlobale.objects.first()
-            if not structure_globale:
-                structure_globale = StructureEvaluationGlobale.objects.create()
-        except Exception:
-            structure_globale = None
+        structure_globale = structure_evaluation().structure
         
         context = {
             'dossier': dossier,
@@ -2045,210 +1468,84 @@ def creer_evaluation(request, dossier_id):
 @login_required
 def exporter_evaluation_pdf(request, dossier_id):
     """Exporter l'évaluation d'équivalence en PDF"""
-    dossier = get_object_or_404(Dossier, id=dossier_id)
+    dossier = get_object_or_404(Dossier.objects.select_related('candidat__decision'), id=dossier_id)
     
     try:
-        candidat = Candidat.objects.get(dossier=dossier)
-        try:
-            decision = DecisionCommission.objects.get(candidat=candidat)
-        except DecisionCommission.DoesNotExist:
-            messages.error(request, "Aucune décision trouvée pour ce dossier")
-            return redirect('dossiers:dossier_detail', dossier_id=dossier.id)
+        candidat = dossier.candidat
+        candidat.decision
     except Candidat.DoesNotExist:
         messages.error(request, "Aucune évaluation trouvée pour ce dossier")
         return redirect('dossiers:dossier_detail', dossier_id=dossier.id)
+    except DecisionCommission.DoesNotExist:
+        messages.error(request, "Aucune décision trouvée pour ce dossier")
+        return redirect('dossiers:dossier_detail', dossier_id=dossier.id)
     
-    candidat = dossier.candidat
-    decision = candidat.decision
-    
-    # Créer le PDF
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="evaluation_{candidat.nom}_{timezone.now().strftime("%Y%m%d")}.pdf"'
-    
-    # Créer le document PDF
-    doc = SimpleDocTemplate(response, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-    
-    # Titre
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=30,
-        alignment=1  # Centré
-    )
-    story.append(Paragraph("RAPPORT D'ÉVALUATION D'ÉQUIVALENCE", title_style))
-    story.append(Spacer(1, 20))
-    
-    # Informations du candidat
-    story.append(Paragraph("INFORMATIONS DU CANDIDAT", styles['Heading2']))
-    story.append(Spacer(1, 12))
-    
-    candidat_data = [
-        ['Nom:', candidat.nom],
-        ['Pays d\'origine:', candidat.pays_origine],
-        ['Date d\'arrivée:', candidat.date_arrivee.strftime("%d/%m/%Y")],
-        ['Dossier:', dossier.titre]
-    ]
+    # PDF déjà généré pour l'état actuel du candidat et de sa décision : envoi immédiat
+    chemin = pdf_en_cache(dossier)
+    if chemin:
+        return reponse_fichier(request, chemin, nom_fichier_pdf_evaluation(candidat), en_ligne=False)
     
-    candidat_table = Table(candidat_data, colWidths=[2*inch, 4*inch])
-    candidat_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.grey),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('BACKGROUND', (1, 0), (1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    story.append(candidat_table)
-    story.append(Spacer(1, 20))
-    
-    # Diplômes
-    if candidat.diplomes.exists():
-        story.append(Paragraph("DIPLÔMES", styles['Heading2']))
-        story.append(Spacer(1, 12))
-        
-        diplome_headers = ['Diplôme', 'Année', 'Université', 'Pays', 'Durée']
-        diplome_data = [diplome_headers]
-        
-        for diplome in candidat.diplomes.all():
-            diplome_data.append([
-                diplome.nom,
-                str(diplome.annee),
-                diplome.universite,
-                diplome.pays,
-                f"{diplome.duree} ans"
-            ])
-        
-        diplome_table = Table(diplome_data, colWidths=[1.5*inch, 0.8*inch, 1.5*inch, 1*inch, 0.8*inch])
-        diplome_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(diplome_table)
-        story.append(Spacer(1, 20))
-    
-    # Évaluations des compétences
-    if candidat.evaluations.exists():
-        story.append(Paragraph("ÉVALUATION DES COMPÉTENCES", styles['Heading2']))
-        story.append(Spacer(1, 12))
-        
-        eval_headers = ['Compétence', 'Poids', 'Note', 'Points obtenus', 'Commentaires']
-        eval_data = [eval_headers]
-        
-        for evaluation in candidat.evaluations.all():
-            eval_data.append([
-                evaluation.competence.nom,
-                str(evaluation.competence.poids),
-                str(evaluation.note),
-                str(evaluation.points_obtenus),
-                evaluation.commentaires[:50] + "..." if len(evaluation.commentaires) > 50 else evaluation.commentaires
-            ])
-        
-        eval_table = Table(eval_data, colWidths=[1.5*inch, 0.6*inch, 0.6*inch, 1*inch, 2*inch])
-        eval_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(eval_table)
-        story.append(Spacer(1, 20))
-    
-    # Résultats
-    story.append(Paragraph("RÉSULTATS", styles['Heading2']))
-    story.append(Spacer(1, 12))
-    
-    result_data = [
-        ['Score total:', f"{decision.score_total}/100"],
-        ['Interprétation:', decision.interpretation_score],
-        ['Décision:', dict(DecisionCommission.DECISION_CHOICES)[decision.decision]],
-        ['Date de décision:', decision.date_decision.strftime("%d/%m/%Y")]
-    ]
+    # Sinon génération en arrière-plan : le PDF sera téléchargeable depuis la page de suivi
+    tache = mettre_en_file('pdf_evaluation', request.user, parametres={'dossier_id': dossier.id})
+    return redirect('dossiers:suivi_tache', tache_id=tache.id)
+
+@login_required
+def exporter_evaluations_reunion(request):
+    """Dossier de séance : ZIP des PDF d'évaluation des décisions prises lors d'une réunion de la commission"""
+    if request.user.role != 'admin':
+        messages.error(request, "Accès non autorisé")
+        return redirect('dossiers:dashboard')
     
-    result_table = Table(result_data, colWidths=[2*inch, 4*inch])
-    result_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.grey),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-        ('BACKGROUND', (1, 0), (1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    story.append(result_table)
-    story.append(Spacer(1, 20))
-    
-    # Recommandations
-    if decision.recommandations:
-        story.append(Paragraph("RECOMMANDATIONS", styles['Heading2']))
-        story.append(Spacer(1, 12))
-        story.append(Paragraph(decision.recommandations, styles['Normal']))
-        story.append(Spacer(1, 20))
-    
-    # Commentaires
-    if decision.commentaires:
-        story.append(Paragraph("COMMENTAIRES", styles['Heading2']))
-        story.append(Spacer(1, 12))
-        story.append(Paragraph(decision.commentaires, styles['Normal']))
-    
-    # Générer le PDF
-    doc.build(story)
-    return response
+    if request.method == 'POST':
+        date_reunion = parse_date(request.POST.get('date_reunion') or '')
+        if date_reunion is None:
+            messages.error(request, "Date de réunion invalide.")
+            return redirect('dossiers:exporter_evaluations_reunion')
+        tache = mettre_en_file('pdf_evaluation_lot', request.user, parametres={'date_reunion': date_reunion.isoformat()})
+        return redirect('dossiers:suivi_tache', tache_id=tache.id)
+    
+    # Une réunion = les décisions enregistrées le même jour
+    reunions = DecisionCommission.objects.annotate(
+        jour=TruncDate('date_decision')
+    ).values('jour').annotate(nombre=Count('id')).order_by('-jour')
+    return render(request, 'dossiers/exporter_evaluations_reunion.html', {'reunions': reunions})
 
+@login_required
 def test_media_file(request):
     """Vue de test pour vérifier l'accès aux fichiers médias"""
+    if request.user.role != 'admin':
+        return HttpResponseForbidden("Accès non autorisé")
     file_path = os.path.join(settings.MEDIA_ROOT, 'pieces_jointes', 'ND-NP_AAAA_CANDIDAT_Pays.docx')
     
     if os.path.exists(file_path):
-        try:
-            with open(file_path, 'rb') as f:
-                response = HttpResponse(f.read(), content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-                response['Content-Disposition'] = 'inline; filename="ND-NP_AAAA_CANDIDAT_Pays.docx"'
-                return response
-        except Exception as e:
-            return HttpResponse(f"Erreur lors de la lecture du fichier: {str(e)}")
+        return reponse_fichier(request, file_path)
     else:
         return HttpResponse(f"Fichier non trouvé à: {file_path}")
 
+@login_required
 def serve_piece_jointe(request, filename):
     """Vue pour servir les pièces jointes avec l'URL personnalisée"""
-    file_path = os.path.join(settings.MEDIA_ROOT, 'pieces_jointes', filename)
-    
-    if os.path.exists(file_path):
-        try:
-            with open(file_path, 'rb') as f:
-                # Déterminer le type MIME basé sur l'extension
-                if filename.endswith('.docx'):
-                    content_type = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-                elif filename.endswith('.pdf'):
-                    content_type = 'application/pdf'
-                elif filename.endswith('.jpg') or filename.endswith('.jpeg'):
-                    content_type = 'image/jpeg'
-                elif filename.endswith('.png'):
-                    content_type = 'image/png'
-                else:
-                    content_type = 'application/octet-stream'
-                
-                response = HttpResponse(f.read(), content_type=content_type)
-                response['Content-Disposition'] = f'inline; filename="{filename}"'
-                return response
-        except Exception as e:
-            return HttpResponse(f"Erreur lors de la lecture du fichier: {str(e)}", status=500)
-    else:
+    pieces = PieceJointe.objects.filter(fichier=f'pieces_jointes/{filename}')
+    piece = pieces.first()
+    if piece is None or not os.path.exists(piece.fichier.path):
         return HttpResponse(f"Fichier non trouvé: {filename}", status=404)
+    
+    # Le fichier peut être partagé par plusieurs dossiers (contenu identique) : il suffit d'avoir accès à l'un d'eux
+    piece = pieces_accessibles(request.user, pieces).first()
+    if piece is None:
+        return HttpResponseForbidden("Accès non autorisé à ce dossier")
+    
+    return reponse_fichier(request, piece.fichier.path, piece.nom_affiche)
+
+@login_required
+def apercu_piece_jointe(request, piece_id):
+    """Image d'aperçu de la première page d'une pièce jointe"""
+    piece = get_object_or_404(PieceJointe.objects.select_related('dossier'), id=piece_id)
+    if not peut_acceder_dossier(request.user, piece.dossier):
+        return HttpResponseForbidden("Accès non autorisé à ce dossier")
+    if not piece.apercu or not os.path.exists(piece.apercu.path):
+        return HttpResponse("Aperçu non disponible", status=404)
+    return reponse_fichier(request, piece.apercu.path)
 
 @login_required
 def dossiers_traites_admin(request):
@@ -2257,8 +1554,10 @@ def dossiers_traites_admin(request):
         messages.error(request, "Accès non autorisé")
         return redirect('dossiers:dashboard')
     
-    # Récupérer tous les dossiers traités depuis DossierTraite (le bon modèle)
-    dossiers_traites = DossierTraite.objects.all().order_by('-date_creation')
+    # Récupérer tous les dossiers traités depuis DossierTraite (le bon modèle), avec leur nombre de réunions
+    dossiers_traites = DossierTraite.objects.annotate(
+        nombre_reunions_total=ReunionDossier.nombre_par_dossier()
+    ).order_by('-date_creation')
     
     # Filtrage
     recherche = request.GET.get('recherche', '')
@@ -2266,12 +1565,8 @@ def dossiers_traites_admin(request):
     universite_filter = request.GET.get('universite', '')
     
     if recherche:
-        dossiers_traites = dossiers_traites.filter(
-            Q(demandeur_candidat__icontains=recherche) |
-            Q(numero__icontains=recherche) |
-            Q(reference__icontains=recherche) |
-            Q(diplome__icontains=recherche)
-        )
+        # Index plein texte : préfixes, classement par pertinence
+        dossiers_traites = filtrer_dossiers_traites(dossiers_traites, recherche)
     
     if pays_filter:
         dossiers_traites = dossiers_traites.filter(pays__icontains=pays_filter)
@@ -2284,14 +1579,15 @@ def dossiers_traites_admin(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
-    # Statistiques
-    total_dossiers = DossierTraite.objects.count()
+    # Statistiques (lues dans les colonnes de notes, sans analyser le texte des avis)
+    statistiques = statistiques_archives()
     pays_uniques = DossierTraite.objects.values_list('pays', flat=True).distinct()
     universites_uniques = DossierTraite.objects.values_list('universite', flat=True).distinct()
     
     context = {
         'page_obj': page_obj,
-        'total_dossiers': total_dossiers,
+        'total_dossiers': statistiques['total'],
+        'statistiques': statistiques,
         'pays_uniques': pays_uniques,
         'universites_uniques': universites_uniques,
         'recherche': recherche,
@@ -2308,96 +1604,22 @@ def voir_details_traitement(request, dossier_traite_id):
         messages.error(request, "Accès non autorisé")
         return redirect('dossiers:dashboard')
     
-    dossier_traite = get_object_or_404(DossierTraite, id=dossier_traite_id)
-    
-    # Essayer de trouver le dossier original et sa consistance académique
-    dossier_original = None
-    consistance = None
-    candidat = None
+    # Dossier d'origine, candidat, consistance et état résolus par la clé étrangère en une requête
+    dossier_traite = get_object_or_404(
+        DossierTraite.objects.select_related(
+            'dossier__candidat__consistance_academique',
+            'dossier__candidat__etat_dossier',
+        ),
+        id=dossier_traite_id
+    )
     
-    try:
-        # Chercher le dossier original par le numéro (correspondance exacte)
-        dossier_original = Dossier.objects.filter(titre=dossier_traite.numero).first()
-        
-        # Si pas trouvé, essayer une recherche plus large
-        if not dossier_original:
-            # Chercher par numéro dans le titre
-            dossier_original = Dossier.objects.filter(titre__icontains=dossier_traite.numero).first()
-        
-        # Si toujours pas trouvé, essayer par le nom du candidat
-        if not dossier_original:
-            try:
-                candidat_temp = Candidat.objects.filter(nom__icontains=dossier_traite.demandeur_candidat).first()
-                if candidat_temp:
-                    dossier_original = candidat_temp.dossier
-            except:
-                pass
-        
-        # Si toujours pas trouvé, chercher dans tous les dossiers avec consistance
-        if not dossier_original:
-            try:
-                # Chercher tous les candidats avec consistance
-                candidats_avec_consistance = Candidat.objects.filter(
-                    consistance_academique__isnull=False
-                )
-                for candidat_temp in candidats_avec_consistance:
-                    if candidat_temp.nom and dossier_traite.demandeur_candidat:
-                        if candidat_temp.nom.lower() in dossier_traite.demandeur_candidat.lower() or dossier_traite.demandeur_candidat.lower() in candidat_temp.nom.lower():
-                            dossier_original = candidat_temp.dossier
-                            break
-            except Exception as e:
-                print(f"Erreur lors de la recherche par nom: {e}")
-        
-        print(f"Recherche dossier original: {dossier_traite.numero}")
-        print(f"Dossier trouvé: {dossier_original}")
-        
-        if dossier_original:
-            try:
-                candidat = Candidat.objects.get(dossier=dossier_original)
-                print(f"Candidat trouvé: {candidat.nom}")
-                try:
-                    consistance = ConsistanceAcademique.objects.get(candidat=candidat)
-                    print(f"Consistance trouvée: {consistance.note_totale}/100")
-                except ConsistanceAcademique.DoesNotExist:
-                    print(f"Aucune consistance académique trouvée pour le candidat {candidat.id}")
-            except Candidat.DoesNotExist:
-                print(f"Aucun candidat trouvé pour le dossier {dossier_original.id}")
-        else:
-            print(f"Aucun dossier original trouvé pour le numéro: {dossier_traite.numero}")
-            
-    except Exception as e:
-        print(f"Erreur lors de la récupération des détails : {e}")
+    dossier_original = dossier_traite.dossier
+    candidat = getattr(dossier_original, 'candidat', None) if dossier_original else None
+    consistance = getattr(candidat, 'consistance_academique', None) if candidat else None
     
-    # Si pas de consistance trouvée, essayer d'extraire les notes de l'avis de la commission
-    if not consistance and dossier_traite.avis_commission:
-        try:
-            # Créer un objet temporaire pour afficher les notes extraites de l'avis
-            class ConsistanceTemporaire:
-                def __init__(self, avis_commission):
-                    self.avis_commission = avis_commission
-                    self.note_totale = 0
-                    # Extraire les notes de l'avis
-                    import re
-                    notes = re.findall(r'(\w+): (\d+)/(\d+)', avis_commission)
-                    for critere, note, max_note in notes:
-                        setattr(self, f"{critere.lower()}_note", int(note))
-                        if critere.lower() in ['sciences', 'topographie', 'photogrammetrie', 'cartographie']:
-                            self.note_totale += int(note)
-                        elif critere.lower() in ['droit', 'sig', 'teledetection', 'stages']:
-                            self.note_totale += int(note)
-                    
-                    # Extraire le score total
-                    score_match = re.search(r'Score total : (\d+)/100', avis_commission)
-                    if score_match:
-                        self.note_totale = int(score_match.group(1))
-                
-                def __getattr__(self, name):
-                    return None
-            
-            consistance = ConsistanceTemporaire(dossier_traite.avis_commission)
-            print(f"Notes extraites de l'avis: {consistance.note_totale}/100")
-        except Exception as e:
-            print(f"Erreur lors de l'extraction des notes: {e}")
+    # Si pas de consistance trouvée, afficher les notes recopiées sur le dossier traité lors du transfert
+    if not consistance and dossier_traite.score_total is not None:
+        consistance = dossier_traite
     
     # Détecter si on doit afficher la décision antérieure ou les nouvelles notes
     afficher_decision_anterieure = False
@@ -2419,6 +1641,10 @@ def voir_details_traitement(request, dossier_traite_id):
     
     return render(request, 'dossiers/voir_details_traitement.html', context)
 
+def _avis_evaluation(consistance):
+    """Avis enregistré sur le dossier traité au transfert : note totale et notes détaillées de l'évaluation"""
+    return f"Évaluation terminée. Score total : {consistance.note_totale}/100 points. Notes détaillées : Sciences géodésiques: {consistance.sciences_geodesiques_note or 0}/16, Topographie: {consistance.topographie_note or 0}/16, Photogrammétrie: {consistance.photogrammetrie_note or 0}/16, Cartographie: {consistance.cartographie_note or 0}/16, Droit foncier: {consistance.droit_foncier_note or 0}/10, SIG: {consistance.sig_note or 0}/10, Télédétection: {consistance.teledetection_note or 0}/10, Stages: {consistance.stages_note or 0}/10."
+
 @login_required
 def valider_et_transferer_dossier(request, dossier_id):
     """Vue pour que l'admin valide et transfère un dossier vers les dossiers traités"""
@@ -2432,12 +1658,18 @@ def valider_et_transferer_dossier(request, dossier_id):
     
     if request.method == 'POST':
         try:
-            # Vérifier si un dossier traité existe déjà
-            dossier_traite_existant = DossierTraite.objects.filter(numero=dossier.titre).first()
+            # Vérifier si un dossier traité existe déjà : par le lien au dossier d'origine, et par le numéro
+            # seulement pour les dossiers traités pas encore liés (un dossier renommé ou une ligne importée
+            # portant le même titre ne doit pas être rattachée à ce dossier)
+            dossier_traite_existant = (
+                DossierTraite.objects.filter(dossier=dossier).first()
+                or DossierTraite.objects.filter(numero=dossier.titre, dossier__isnull=True).first()
+            )
             
             if not dossier_traite_existant:
-                # Créer le dossier traité avec les données de l'évaluation
-                dossier_traite = DossierTraite.objects.create(
+                # Créer le dossier traité avec les données de l'évaluation, lié à son dossier d'origine
+                dossier_traite = DossierTraite(
+                    dossier=dossier,
                     numero=dossier.titre,
                     demandeur_candidat=candidat.nom,
                     reference=dossier.titre,
@@ -2446,30 +1678,38 @@ def valider_et_transferer_dossier(request, dossier_id):
                     diplome="Diplôme évalué",
                     universite="autre",
                     pays=candidat.pays_origine,
-                    avis_commission=f"Évaluation terminée. Score total : {consistance.note_totale}/100 points. Notes détaillées : Sciences géodésiques: {consistance.sciences_geodesiques_note or 0}/16, Topographie: {consistance.topographie_note or 0}/16, Photogrammétrie: {consistance.photogrammetrie_note or 0}/16, Cartographie: {consistance.cartographie_note or 0}/16, Droit foncier: {consistance.droit_foncier_note or 0}/10, SIG: {consistance.sig_note or 0}/10, Télédétection: {consistance.teledetection_note or 0}/10, Stages: {consistance.stages_note or 0}/10.",
+                    avis_commission=_avis_evaluation(consistance),
                     date_avis=timezone.now().date(),
                     cree_par=request.user
                 )
+                dossier_traite.copier_notes(consistance)
+                dossier_traite.save()
                 
                 # Marquer le dossier comme traité
                 dossier.statut = 'traite'
                 dossier.save()
                 
                 # Notifier le professeur que le dossier a été validé
-                professeurs = dossier.professeurs.filter(role='professeur')
-                for professeur in professeurs:
-                    creer_notification(
-                        destinataire=professeur,
-                        type_notification='validation',
-                        titre=f"Dossier validé : {dossier.titre}",
-                        message=f"L'administrateur {request.user.get_full_name() or request.user.username} a validé et transféré votre évaluation du dossier '{dossier.titre}' vers les dossiers traités.",
-                        dossier=dossier
-                    )
+                creer_notifications_bulk(
+                    dossier.professeurs.filter(role='professeur').values_list('id', flat=True),
+                    type_notification='validation',
+                    titre=f"Dossier validé : {dossier.titre}",
+                    message=f"L'administrateur {request.user.get_full_name() or request.user.username} a validé et transféré votre évaluation du dossier '{dossier.titre}' vers les dossiers traités.",
+                    dossier=dossier
+                )
                 
                 messages.success(request, f"Dossier '{dossier.titre}' validé et transféré vers les dossiers traités avec succès.")
                 return redirect('dossiers:dossiers_traites_admin')
             else:
-                messages.warning(request, f"Le dossier '{dossier.titre}' était déjà dans les dossiers traités.")
+                # Dossier renvoyé puis revalidé, ou antérieur au lien : rattacher le dossier traité à ce dossier
+                # et reprendre les notes de sa dernière évaluation (les colonnes de notes ne restent pas périmées)
+                dossier_traite_existant.dossier = dossier
+                dossier_traite_existant.copier_notes(consistance)
+                dossier_traite_existant.avis_commission = _avis_evaluation(consistance)
+                dossier_traite_existant.save(
+                    update_fields=['dossier', 'score_total', 'avis_commission', 'date_modification'] + DossierTraite.CHAMPS_NOTES
+                )
+                messages.warning(request, f"Le dossier '{dossier.titre}' était déjà dans les dossiers traités : ses notes ont été mises à jour.")
                 return redirect('dossiers:dossiers_traites_admin')
                 
         except Exception as e:
@@ -2535,15 +1775,13 @@ def renvoyer_au_professeur(request, dossier_id):
         )
         
         # Notifier le professeur
-        professeurs = dossier.professeurs.filter(role='professeur')
-        for professeur in professeurs:
-            creer_notification(
-                destinataire=professeur,
-                type_notification='renvoi',
-                titre=f"Dossier renvoyé : {dossier.titre}",
-                message=f"L'administrateur {request.user.get_full_name() or request.user.username} a renvoyé le dossier '{dossier.titre}' pour traitement. Message : {message_admin}",
-                dossier=dossier
-            )
+        creer_notifications_bulk(
+            dossier.professeurs.filter(role='professeur').values_list('id', flat=True),
+            type_notification='renvoi',
+            titre=f"Dossier renvoyé : {dossier.titre}",
+            message=f"L'administrateur {request.user.get_full_name() or request.user.username} a renvoyé le dossier '{dossier.titre}' pour traitement. Message : {message_admin}",
+            dossier=dossier
+        )
         
         messages.success(request, f"Dossier '{dossier.titre}' renvoyé au professeur avec succès.")
         return redirect('dossiers:dossier_detail', dossier_id=dossier_id)
@@ -2594,15 +1832,13 @@ def renvoyer_dossier_traite_au_professeur(request, dossier_traite_id):
         )
         
         # Notifier les professeurs (tous les professeurs pour l'instant)
-        professeurs = CustomUser.objects.filter(role='professeur')
-        for professeur in professeurs:
-            creer_notification(
-                destinataire=professeur,
-                type_notification='affectation',
-                titre=f"Nouveau dossier pour réévaluation : {nouveau_dossier.titre}",
-                message=f"L'administrateur {request.user.get_full_name() or request.user.username} a créé un nouveau dossier pour réévaluation basé sur un dossier traité. Message : {message_admin}",
-                dossier=nouveau_dossier
-            )
+        creer_notifications_bulk(
+            CustomUser.objects.filter(role='professeur').values_list('id', flat=True),
+            type_notification='affectation',
+            titre=f"Nouveau dossier pour réévaluation : {nouveau_dossier.titre}",
+            message=f"L'administrateur {request.user.get_full_name() or request.user.username} a créé un nouveau dossier pour réévaluation basé sur un dossier traité. Message : {message_admin}",
+            dossier=nouveau_dossier
+        )
         
         messages.success(request, f"Nouveau dossier créé à partir du dossier traité '{dossier_traite.numero}' et renvoyé au professeur avec succès.")
         return redirect('dossiers:dossiers_traites_admin')
@@ -2686,12 +1922,14 @@ def ajouter_reunion_dossier(request, dossier_id):
     
     if request.method == 'POST':
         try:
-            date_reunion = request.POST.get('date_reunion')
-            participants = request.POST.get('participants')
-            ordre_du_jour = request.POST.get('ordre_du_jour')
-            decisions = request.POST.get('decisions')
+            date_reunion = parse_date(request.POST.get('date_reunion') or '')
+            if date_reunion is None:
+                raise ValueError("date de réunion invalide")
+            participants = request.POST.get('participants', '')
+            ordre_du_jour = request.POST.get('ordre_du_jour', '')
+            decisions = request.POST.get('decisions', '')
             
-            dossier.ajouter_reunion(date_reunion, participants, ordre_du_jour, decisions)
+            dossier.ajouter_reunion(date_reunion, participants, ordre_du_jour, decisions, cree_par=request.user)
             
             messages.success(request, "Réunion ajoutée avec succès")
             return redirect('dossiers:modifier_dossier_traite', dossier_id=dossier.id)
@@ -2710,12 +1948,28 @@ def voir_reunions_dossier(request, dossier_id):
     
     dossier = get_object_or_404(DossierTraite, id=dossier_id)
     
+    reunions = list(dossier.historique_reunions())
     context = {
         'dossier': dossier,
-        'reunions': dossier.reunions,
+        'reunions': reunions,
+        'nombre_reunions': len(reunions),
     }
     return render(request, 'dossiers/voir_reunions_dossier.html', context)
 
+@login_required
+def dossier_seance_reunion(request, reunion_id):
+    """Dossier de séance d'une réunion (ordre du jour, notes des candidats, relevé des décisions), généré en arrière-plan"""
+    if request.user.role != 'admin':
+        messages.error(request, "Accès non autorisé")
+        return redirect('dossiers:dashboard')
+    
+    reunion = get_object_or_404(Reunion, id=reunion_id)
+    if request.method != 'POST':
+        return redirect('dossiers:dossiers_traites_admin')
+    
+    tache = mettre_en_file('dossier_seance', request.user, parametres={'reunion_id': reunion.id})
+    return redirect('dossiers:suivi_tache', tache_id=tache.id)
+
 @login_required
 def import_excel_dossiers(request):
     """Importer des dossiers traités depuis un fichier Excel"""
@@ -2735,113 +1989,9 @@ def import_excel_dossiers(request):
                 messages.error(request, "Veuillez sélectionner un fichier Excel (.xlsx ou .xls)")
                 return render(request, 'dossiers/import_excel_dossiers.html')
             
-            # Lire le fichier Excel
-            df = pd.read_excel(excel_file, header=None)
-            
-            # Traiter les données
-            dossiers_importes = 0
-            dossiers_existants = 0
-            erreurs = []
-            
-            # Parcourir les lignes du fichier Excel
-            for index, row in df.iterrows():
-                try:
-                    # Ignorer les lignes vides, en-têtes ou non numériques
-                    if (pd.isna(row[0]) or 
-                        str(row[0]).strip() == '' or 
-                        str(row[0]).lower() in ['no.', 'nan', 'situation des dossiers'] or
-                        not str(row[0]).replace('.', '').replace('bis', '').isdigit()):
-                        continue
-                    
-                    # Extraire les données
-                    numero = str(row[0]).strip()
-                    
-                    # Vérifier si le dossier existe déjà
-                    if DossierTraite.objects.filter(numero=numero).exists():
-                        dossiers_existants += 1
-                        continue
-                    
-                    # Extraire les autres données avec gestion des valeurs manquantes
-                    demandeur = str(row[1]).strip() if not pd.isna(row[1]) else f"Candidat {numero}"
-                    reference = str(row[2]).strip() if not pd.isna(row[2]) else f"REF-{numero}"
-                    date_envoi = str(row[3]).strip() if not pd.isna(row[3]) else "Date non spécifiée"
-                    reference_reception = str(row[4]).strip() if not pd.isna(row[4]) else ""
-                    date_reception = str(row[5]).strip() if not pd.isna(row[5]) else "Date non spécifiée"
-                    universite = str(row[7]).strip() if not pd.isna(row[7]) else "Université non spécifiée"
-                    pays = str(row[8]).strip() if not pd.isna(row[8]) else "Pays non spécifié"
-                    date_avis = str(row[9]).strip() if not pd.isna(row[9]) else ""
-                    avis_commission = str(row[10]).strip() if not pd.isna(row[10]) else "Avis non spécifié"
-                    
-                    # Extraire les données de réunions depuis le fichier Excel
-                    reunions = []
-                    
-                    # Réunion du 24 mars 2025 (colonne 12) - données réelles du fichier
-                    if not pd.isna(row[12]) and str(row[12]).strip() != '':
-                        reunions.append({
-                            'date': '2025-03-24',
-                            'participants': 'Commission d\'équivalence',
-                            'ordre_du_jour': 'Examen du dossier d\'équivalence',
-                            'decisions': str(row[12]).strip(),  # Décision réelle du fichier Excel
-                            'date_ajout': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        })
-                    
-                    # Réunion du 13 mai 2025 (colonne 13) - données réelles du fichier
-                    if not pd.isna(row[13]) and str(row[13]).strip() != '':
-                        reunions.append({
-                            'date': '2025-05-13',
-                            'participants': 'Commission d\'équivalence',
-                            'ordre_du_jour': 'Examen du dossier d\'équivalence',
-                            'decisions': str(row[13]).strip(),  # Décision réelle du fichier Excel
-                            'date_ajout': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        })
-                    
-                    # Réunion du 16 juin 2025 (colonne 14) - données réelles du fichier
-                    if not pd.isna(row[14]) and str(row[14]).strip() != '':
-                        reunions.append({
-                            'date': '2025-06-16',
-                            'participants': 'Commission d\'équivalence',
-                            'ordre_du_jour': 'Examen du dossier d\'équivalence',
-                            'decisions': str(row[14]).strip(),  # Décision réelle du fichier Excel
-                            'date_ajout': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        })
-                    
-                    # Créer un nouveau dossier traité avec les vraies données
-                    dossier = DossierTraite(
-                        numero=numero,
-                        demandeur_candidat=demandeur,
-                        reference=reference,
-                        date_envoi=datetime.now().date(),  # On garde la date d'aujourd'hui pour l'import
-                        reference_reception=reference_reception,
-                        date_reception=datetime.now().date(),  # On garde la date d'aujourd'hui pour l'import
-                        diplome="Diplôme d'Ingénieur en Topographie",  # Diplôme par défaut
-                        universite=universite,
-                        pays=pays,
-                        date_avis=datetime.now().date() if date_avis else None,
-                        avis_commission=avis_commission,  # Avis réel de la commission depuis le fichier Excel
-                        reunions=reunions,  # Réunions réelles avec décisions du fichier Excel
-                        cree_par=request.user
-                    )
-                    
-                    dossier.save()
-                    dossiers_importes += 1
-                    
-                except Exception as e:
-                    erreurs.append(f"Ligne {index + 1}: {str(e)}")
-            
-            # Messages de résultat
-            if dossiers_importes > 0:
-                messages.success(request, f"✅ {dossiers_importes} dossiers importés avec succès")
-            
-            if dossiers_existants > 0:
-                messages.warning(request, f"⚠️ {dossiers_existants} dossiers déjà existants ignorés")
-            
-            if erreurs:
-                for erreur in erreurs[:5]:  # Afficher seulement les 5 premières erreurs
-                    messages.error(request, erreur)
-                if len(erreurs) > 5:
-                    messages.error(request, f"... et {len(erreurs) - 5} autres erreurs")
-            
-            return redirect('dossiers:dossiers_traites_admin')
+            tache = mettre_en_file('import_excel', request.user, fichier=excel_file)
+            messages.success(request, "Import Excel lancé en arrière-plan.")
+            return redirect('dossiers:suivi_tache', tache_id=tache.id)
             
         except Exception as e:
             messages.error(request, f"❌ Erreur lors de l'import: {str(e)}")
@@ -2863,111 +2013,9 @@ def import_excel_auto(request):
             messages.error(request, "❌ Fichier Excel non trouvé")
             return redirect('dossiers:import_excel_dossiers')
         
-        # Lire le fichier Excel
-        df = pd.read_excel(excel_path, header=None)
-        
-        # Traiter les données
-        dossiers_importes = 0
-        dossiers_existants = 0
-        erreurs = []
-        
-        # Parcourir les lignes du fichier Excel
-        for index, row in df.iterrows():
-            try:
-                # Ignorer les lignes vides, en-têtes ou non numériques
-                if (pd.isna(row[0]) or 
-                    str(row[0]).strip() == '' or 
-                    str(row[0]).lower() in ['no.', 'nan', 'situation des dossiers'] or
-                    not str(row[0]).replace('.', '').replace('bis', '').isdigit()):
-                    continue
-                
-                # Extraire les données
-                numero = str(row[0]).strip()
-                
-                # Vérifier si le dossier existe déjà
-                if DossierTraite.objects.filter(numero=numero).exists():
-                    dossiers_existants += 1
-                    continue
-                
-                # Extraire les autres données avec gestion des valeurs manquantes
-                demandeur = str(row[1]).strip() if not pd.isna(row[1]) else f"Candidat {numero}"
-                reference = str(row[2]).strip() if not pd.isna(row[2]) else f"REF-{numero}"
-                date_envoi = str(row[3]).strip() if not pd.isna(row[3]) else "Date non spécifiée"
-                reference_reception = str(row[4]).strip() if not pd.isna(row[4]) else ""
-                date_reception = str(row[5]).strip() if not pd.isna(row[5]) else "Date non spécifiée"
-                universite = str(row[7]).strip() if not pd.isna(row[7]) else "Université non spécifiée"
-                pays = str(row[8]).strip() if not pd.isna(row[8]) else "Pays non spécifié"
-                date_avis = str(row[9]).strip() if not pd.isna(row[9]) else ""
-                avis_commission = str(row[10]).strip() if not pd.isna(row[10]) else "Avis non spécifié"
-                
-                # Extraire les données de réunions depuis le fichier Excel
-                reunions = []
-                
-                # Réunion du 24 mars 2025 (colonne 12) - données réelles du fichier
-                if not pd.isna(row[12]) and str(row[12]).strip() != '':
-                    reunions.append({
-                        'date': '2025-03-24',
-                        'participants': 'Commission d\'équivalence',
-                        'ordre_du_jour': 'Examen du dossier d\'équivalence',
-                        'decisions': str(row[12]).strip(),  # Décision réelle du fichier Excel
-                        'date_ajout': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    })
-                
-                # Réunion du 13 mai 2025 (colonne 13) - données réelles du fichier
-                if not pd.isna(row[13]) and str(row[13]).strip() != '':
-                    reunions.append({
-                        'date': '2025-05-13',
-                        'participants': 'Commission d\'équivalence',
-                        'ordre_du_jour': 'Examen du dossier d\'équivalence',
-                        'decisions': str(row[13]).strip(),  # Décision réelle du fichier Excel
-                        'date_ajout': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    })
-                
-                # Réunion du 16 juin 2025 (colonne 14) - données réelles du fichier
-                if not pd.isna(row[14]) and str(row[14]).strip() != '':
-                    reunions.append({
-                        'date': '2025-06-16',
-                        'participants': 'Commission d\'équivalence',
-                        'ordre_du_jour': 'Examen du dossier d\'équivalence',
-                        'decisions': str(row[14]).strip(),  # Décision réelle du fichier Excel
-                        'date_ajout': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    })
-                
-                # Créer un nouveau dossier traité avec les vraies données
-                dossier = DossierTraite(
-                    numero=numero,
-                    demandeur_candidat=demandeur,
-                    reference=reference,
-                    date_envoi=datetime.now().date(),  # On garde la date d'aujourd'hui pour l'import
-                    reference_reception=reference_reception,
-                    date_reception=datetime.now().date(),  # On garde la date d'aujourd'hui pour l'import
-                    diplome="Diplôme d'Ingénieur en Topographie",  # Diplôme par défaut
-                    universite=universite,
-                    pays=pays,
-                    date_avis=datetime.now().date() if date_avis else None,
-                    avis_commission=avis_commission,  # Avis réel de la commission depuis le fichier Excel
-                    reunions=reunions,  # Réunions réelles avec décisions du fichier Excel
-                    cree_par=request.user
-                )
-                
-                dossier.save()
-                dossiers_importes += 1
-                
-            except Exception as e:
-                erreurs.append(f"Ligne {index + 1}: {str(e)}")
-        
-        # Messages de résultat
-        if dossiers_importes > 0:
-            messages.success(request, f"✅ {dossiers_importes} dossiers importés automatiquement")
-        
-        if dossiers_existants > 0:
-            messages.warning(request, f"⚠️ {dossiers_existants} dossiers déjà existants ignorés")
-        
-        if erreurs:
-            for erreur in erreurs[:5]:  # Afficher seulement les 5 premières erreurs
-                messages.error(request, erreur)
-            if len(erreurs) > 5:
-                messages.error(request, f"... et {len(erreurs) - 5} autres erreurs")
+        tache = mettre_en_file('import_excel', request.user, parametres={'chemin': excel_path})
+        messages.success(request, "Import automatique lancé en arrière-plan.")
+        return redirect('dossiers:suivi_tache', tache_id=tache.id)
         
     except Exception as e:
         messages.error(request, f"❌ Erreur lors de l'import automatique: {str(e)}")
@@ -3002,26 +2050,15 @@ def modifier_dossier(request, dossier_id):
             programme = request.FILES.get('programme')
             notes = request.FILES.get('notes')
             
+            # Une seule copie stockée par contenu ; aperçus générés en arrière-plan
             if diplome:
-                PieceJointe.objects.create(
-                    dossier=dossier,
-                    fichier=diplome,
-                    description="Diplôme"
-                )
+                enregistrer_piece_jointe(dossier, diplome, "Diplôme")
             
             if programme:
-                PieceJointe.objects.create(
-                    dossier=dossier,
-                    fichier=programme,
-                    description="Programme"
-                )
+                enregistrer_piece_jointe(dossier, programme, "Programme")
             
             if notes:
-                PieceJointe.objects.create(
-                    dossier=dossier,
-                    fichier=notes,
-                    description="Notes"
-                )
+                enregistrer_piece_jointe(dossier, notes, "Notes")
             
             messages.success(request, "Dossier modifié avec succès.")
             return redirect('dossiers:gestion_dossiers')
@@ -3137,79 +2174,82 @@ def controle_fiche_evaluation(request):
         messages.error(request, "Accès non autorisé. Seuls les administrateurs peuvent accéder à cette page.")
         return redirect('dossiers:dashboard')
     
-    # Créer la table si elle n'existe pas
-    try:
-        structure = StructureEvaluationGlobale.objects.filter(actif=True).latest('date_creation')
-        # S'assurer que les champs JSON sont correctement initialisés
-        if structure.criteres_personnalises_globaux is None:
-            structure.criteres_personnalises_globaux = []
-        if structure.competences_par_critere is None:
-            structure.competences_par_critere = {}
-        if not hasattr(structure, 'competences_criteres_fixes') or structure.competences_criteres_fixes is None:
-            structure.competences_criteres_fixes = {}
-        
-        print(f"DEBUG: Structure chargée - Critères: {structure.criteres_personnalises_globaux}")
-    except Exception:
-        # Créer la table automatiquement
-        from django.db import connection
-        from django.db.migrations.executor import MigrationExecutor
-        from django.db.migrations.autodetector import MigrationAutodetector
-        from django.db.migrations.writer import MigrationWriter
-        
+    # Affichage : structure active en cache ; modification : ligne relue depuis la base
+    structure = structure_evaluation().structure if request.method != 'POST' else None
+    if structure is None:
+        # Créer la table si elle n'existe pas
         try:
-            # Créer la table manuellement
-            with connection.cursor() as cursor:
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS dossiers_structureevaluationglobale (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        sciences_geodesiques_note_max INTEGER DEFAULT 16,
-                        topographie_note_max INTEGER DEFAULT 16,
-                        photogrammetrie_note_max INTEGER DEFAULT 16,
-                        cartographie_note_max INTEGER DEFAULT 16,
-                        droit_foncier_note_max INTEGER DEFAULT 10,
-                        sig_note_max INTEGER DEFAULT 10,
-                        teledetection_note_max INTEGER DEFAULT 10,
-                        stages_note_max INTEGER DEFAULT 10,
-                        criteres_personnalises_globaux TEXT DEFAULT '[]',
-                        competences_par_critere TEXT DEFAULT '{}',
-                        date_creation DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        date_modification DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        actif BOOLEAN DEFAULT 1
-                    )
-                """)
+            structure = StructureEvaluationGlobale.objects.filter(actif=True).latest('date_creation')
+            # S'assurer que les champs JSON sont correctement initialisés
+            if structure.criteres_personnalises_globaux is None:
+                structure.criteres_personnalises_globaux = []
+            if structure.competences_par_critere is None:
+                structure.competences_par_critere = {}
+            if not hasattr(structure, 'competences_criteres_fixes') or structure.competences_criteres_fixes is None:
+                structure.competences_criteres_fixes = {}
+        
+            print(f"DEBUG: Structure chargée - Critères: {structure.criteres_personnalises_globaux}")
+        except Exception:
+            # Créer la table automatiquement
+            from django.db import connection
+            from django.db.migrations.executor import MigrationExecutor
+            from django.db.migrations.autodetector import MigrationAutodetector
+            from django.db.migrations.writer import MigrationWriter
+        
+            try:
+                # Créer la table manuellement
+                with connection.cursor() as cursor:
+                    cursor.execute("""
+                        CREATE TABLE IF NOT EXISTS dossiers_structureevaluationglobale (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            sciences_geodesiques_note_max INTEGER DEFAULT 16,
+                            topographie_note_max INTEGER DEFAULT 16,
+                            photogrammetrie_note_max INTEGER DEFAULT 16,
+                            cartographie_note_max INTEGER DEFAULT 16,
+                            droit_foncier_note_max INTEGER DEFAULT 10,
+                            sig_note_max INTEGER DEFAULT 10,
+                            teledetection_note_max INTEGER DEFAULT 10,
+                            stages_note_max INTEGER DEFAULT 10,
+                            criteres_personnalises_globaux TEXT DEFAULT '[]',
+                            competences_par_critere TEXT DEFAULT '{}',
+                            date_creation DATETIME DEFAULT CURRENT_TIMESTAMP,
+                            date_modification DATETIME DEFAULT CURRENT_TIMESTAMP,
+                            actif BOOLEAN DEFAULT 1
+                        )
+                    """)
             
-            # Créer une structure par défaut
-            structure = StructureEvaluationGlobale.objects.create(
-                criteres_personnalises_globaux=[],
-                competences_par_critere={}
-            )
-            messages.success(request, "Table de structure d'évaluation créée automatiquement !")
+                # Créer une structure par défaut
+                structure = StructureEvaluationGlobale.objects.create(
+                    criteres_personnalises_globaux=[],
+                    competences_par_critere={}
+                )
+                messages.success(request, "Table de structure d'évaluation créée automatiquement !")
             
-        except Exception as e:
-            # Si la création échoue, utiliser une structure temporaire
-            class StructureTemporaire:
-                def __init__(self):
-                    self.sciences_geodesiques_note_max = 16
-                    self.topographie_note_max = 16
-                    self.photogrammetrie_note_max = 16
-                    self.cartographie_note_max = 16
-                    self.droit_foncier_note_max = 10
-                    self.sig_note_max = 10
-                    self.teledetection_note_max = 10
-                    self.stages_note_max = 10
-                    self.criteres_personnalises_globaux = []
-                    self.competences_par_critere = {}
-                    self.competences_criteres_fixes = {}
-                    self.criteres_fixes_supprimes = []
-                    self.date_creation = timezone.now()
-                    self.date_modification = timezone.now()
-                    self.actif = True
+            except Exception as e:
+                # Si la création échoue, utiliser une structure temporaire
+                class StructureTemporaire:
+                    def __init__(self):
+                        self.sciences_geodesiques_note_max = 16
+                        self.topographie_note_max = 16
+                        self.photogrammetrie_note_max = 16
+                        self.cartographie_note_max = 16
+                        self.droit_foncier_note_max = 10
+                        self.sig_note_max = 10
+                        self.teledetection_note_max = 10
+                        self.stages_note_max = 10
+                        self.criteres_personnalises_globaux = []
+                        self.competences_par_critere = {}
+                        self.competences_criteres_fixes = {}
+                        self.criteres_fixes_supprimes = []
+                        self.date_creation = timezone.now()
+                        self.date_modification = timezone.now()
+                        self.actif = True
                 
-                def save(self, force_update=False):
-                    pass
+                    def save(self, force_update=False):
+                        pass
             
-            structure = StructureTemporaire()
-            messages.warning(request, f"Mode temporaire : Impossible de créer la table automatiquement. Erreur : {str(e)}")
+                structure = StructureTemporaire()
+                messages.warning(request, f"Mode temporaire : Impossible de créer la table automatiquement. Erreur : {str(e)}")
     
     if request.method == 'POST':
         print(f"DEBUG: POST data keys: {list(request.POST.keys())}")
@@ -3676,20 +2716,13 @@ def creer_reunion_multiple(request):
                 
                 decisions = f"Réunion créée le {timezone.now().strftime('%d/%m/%Y à %H:%M')} pour traiter {len(dossiers)} dossier(s)."
                 
-                reunions_creees = 0
-                for dossier in dossiers:
-                    try:
-                        dossier.ajouter_reunion(
-                            date_reunion=date_reunion_obj,
-                            participants=participants,
-                            ordre_du_jour=ordre_du_jour,
-                            decisions=decisions
-                        )
-                        reunions_creees += 1
-                    except Exception as e:
-                        print(f"Erreur lors de l'ajout de réunion pour le dossier {dossier.id}: {e}")
+                # Une réunion et un examen par dossier (insertion groupée)
+                Reunion.creer(
+                    dossiers, date_reunion_obj, participants=participants, ordre_du_jour=ordre_du_jour,
+                    decisions=decisions, titre=titre, cree_par=request.user
+                )
                 
-                messages.success(request, f"Réunion '{titre}' créée avec succès pour {reunions_creees} dossier(s).")
+                messages.success(request, f"Réunion '{titre}' créée avec succès pour {len(dossiers)} dossier(s).")
             else:
                 messages.error(request, "Aucun dossier valide trouvé.")
                 
@@ -3741,24 +2774,12 @@ def creer_reunion_multiple(request):
             
             decisions = f"Réunion créée le {timezone.now().strftime('%d/%m/%Y à %H:%M')} pour traiter {len(dossiers)} dossier(s)."
             
-            # Ajouter la réunion à tous les dossiers sélectionnés
-            reunions_creees = 0
-            for dossier in dossiers:
-                try:
-                    dossier.ajouter_reunion(
-                        date_reunion=date_reunion_obj,
-                        participants=participants,
-                        ordre_du_jour=ordre_du_jour,
-                        decisions=decisions
-                    )
-                    reunions_creees += 1
-                except Exception as e:
-                    print(f"Erreur lors de l'ajout de réunion pour le dossier {dossier.id}: {e}")
-            
-            if reunions_creees > 0:
-                messages.success(request, f"Réunion '{titre}' créée avec succès pour {reunions_creees} dossier(s).")
-            else:
-                messages.error(request, "Aucune réunion n'a pu être créée.")
+            # Une réunion partagée par tous les dossiers sélectionnés (insertion groupée des examens)
+            Reunion.creer(
+                dossiers, date_reunion_obj, participants=participants, ordre_du_jour=ordre_du_jour,
+                decisions=decisions, titre=titre, cree_par=request.user
+            )
+            messages.success(request, f"Réunion '{titre}' créée avec succès pour {len(dossiers)} dossier(s).")
             
         except ValueError as e:
             messages.error(request, f"Erreur dans les données : {str(e)}")
@@ -3839,35 +2860,22 @@ def creer_reunion_form(request):
             if description:
                 ordre_du_jour += f"\nDescription générale: {description}"
             
-            # Ajouter la réunion avec décision individuelle pour chaque dossier
-            reunions_creees = 0
+            # Une réunion pour tous les dossiers, avec la décision individuelle de chacun sur son examen
+            decisions_par_dossier = {}
             for dossier in dossiers:
-                try:
-                    # Récupérer la décision spécifique pour ce dossier
-                    decision_key = f'decision_{dossier.id}'
-                    decision_individuelle = request.POST.get(decision_key, '').strip()
-                    
-                    # Créer les décisions spécifiques pour ce dossier
-                    decisions_dossier = f"Réunion '{titre}' du {date_reunion_obj.strftime('%d/%m/%Y à %H:%M')}\n\n"
-                    decisions_dossier += f"Décision pour {dossier.demandeur_candidat} ({dossier.numero}):\n"
-                    decisions_dossier += f"{decision_individuelle}\n\n"
-                    decisions_dossier += f"Validé par: {request.user.get_full_name() or request.user.username}"
-                    
-                    dossier.ajouter_reunion(
-                        date_reunion=date_reunion_obj,
-                        participants=participants,
-                        ordre_du_jour=ordre_du_jour,
-                        decisions=decisions_dossier
-                    )
-                    reunions_creees += 1
-                except Exception as e:
-                    print(f"Erreur lors de l'ajout de réunion pour le dossier {dossier.id}: {e}")
-            
-            if reunions_creees > 0:
-                messages.success(request, f"Réunion '{titre}' créée avec succès pour {reunions_creees} dossier(s) avec décisions individuelles.")
-                return redirect('dossiers:dossiers_traites_admin')
-            else:
-                messages.error(request, "Aucune réunion n'a pu être créée.")
+                decision_individuelle = request.POST.get(f'decision_{dossier.id}', '').strip()
+                decisions_dossier = f"Réunion '{titre}' du {date_reunion_obj.strftime('%d/%m/%Y à %H:%M')}\n\n"
+                decisions_dossier += f"Décision pour {dossier.demandeur_candidat} ({dossier.numero}):\n"
+                decisions_dossier += f"{decision_individuelle}\n\n"
+                decisions_dossier += f"Validé par: {request.user.get_full_name() or request.user.username}"
+                decisions_par_dossier[dossier.id] = decisions_dossier
+            
+            Reunion.creer(
+                dossiers, date_reunion_obj, participants=participants, ordre_du_jour=ordre_du_jour,
+                decisions_par_dossier=decisions_par_dossier, titre=titre, cree_par=request.user
+            )
+            messages.success(request, f"Réunion '{titre}' créée avec succès pour {len(dossiers)} dossier(s) avec décisions individuelles.")
+            return redirect('dossiers:dossiers_traites_admin')
             
         except ValueError as e:
             messages.error(request, f"Erreur dans la date : {str(e)}")
@@ -63,6 +63,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'dossiers.context_processors.notifications_non_lues',
             ],
         },
     },
@@ -134,3 +135,22 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Tâches en arrière-plan (imports, exports, PDF)
+# Exécutées par un pool de threads du processus web et/ou par `python manage.py executer_taches`
+TACHES_EN_PROCESSUS = True
+TACHES_THREADS = 2
+# Secondes après lesquelles une tâche restée « en cours » est considérée interrompue (passée en échec par executer_taches)
+TACHES_DELAI_EXPIRATION = 3600
+# Processus utilisés pour rendre les lots de PDF d'évaluation (par défaut : jusqu'à 4 selon les CPU)
+PDF_EVALUATION_PROCESSUS = None
+
+# Envoi des pièces jointes : None (Django envoie le fichier, avec prise en charge de Range et des ETag),
+# 'x-sendfile' (Apache mod_xsendfile, lighttpd) ou 'x-accel' (nginx : location interne
+# FICHIERS_X_ACCEL_PREFIXE pointant sur MEDIA_ROOT)
+FICHIERS_SENDFILE = None
+FICHIERS_X_ACCEL_PREFIXE = '/media-protege/'
+
+# Répertoire surveillé par l'import automatique (fichiers CSV et Excel de suivi déposés)
+# Synchronisé par `python manage.py importer_repertoire` ou depuis la page des dossiers traités
+IMPORT_AUTO_REPERTOIRE = BASE_DIR / 'imports_auto'
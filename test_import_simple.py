@@ -46,8 +46,7 @@ def test_import():
                 universite=str(row[7]).strip() if not pd.isna(row[7]) else "Université non spécifiée",
                 pays=str(row[8]).strip() if not pd.isna(row[8]) else "Pays non spécifié",
                 date_avis=str(row[9]).strip() if not pd.isna(row[9]) else "",
-                avis_commission=str(row[10]).strip() if not pd.isna(row[10]) else "Avis non spécifié",
-                reunions=[]
+                avis_commission=str(row[10]).strip() if not pd.isna(row[10]) else "Avis non spécifié"
             )
             print(f"Dossier créé avec succès: {dossier.numero}")
             